@@ -0,0 +1,329 @@
+# async_api.py
+
+import asyncio
+import logging
+import uuid
+
+from basket import BasketOrder
+from order_tracker import OrderTracker
+from script import FyersAPI, fyersModel
+
+
+class AsyncFyersAPI(FyersAPI):
+    """
+    Asyncio counterpart of FyersAPI with the same method names.
+
+    Broker calls go through ``FyersModel(is_async=True)``, whose methods are
+    awaitables over the SDK's pooled HTTP session, so a single event loop can
+    keep many users' orders in flight without a thread per order. Instrument
+    lookups (get_fyers_token_details, expiries_for, ...) and the quote cache
+    are shared with FyersAPI. Async methods await the instrument load on a
+    cold start (warm_async) rather than blocking the loop; call it before
+    using the synchronous lookups from a coroutine.
+    """
+
+    # In-flight LTP fetches shared by every instance, keyed by (loop, symbol)
+    _ltp_flights = {}
+    # Instrument loads awaited on each event loop, see warm_async
+    _warm_flights = {}
+
+    def __init__(self, session_token, app_id, app_secret, order_source=None):
+        """
+        Initialize AsyncFyersAPI with credentials and start loading instrument data.
+
+        Args:
+            order_source (OrderUpdateSource): Push feed of order updates; without
+                one, order status is polled from the orderbook
+        """
+        self.session_token = session_token
+        self.app_id = app_id
+        self.app_secret = app_secret
+        self.obj = fyersModel.FyersModel(
+            token=self.session_token,
+            is_async=True,
+            client_id=self.app_id,
+            log_path=""
+        )
+        # Push updates only; one task polls on the event loop, see _ensure_poller
+        self.order_tracker = OrderTracker(source=order_source)
+        self._poll_task = None
+        self.warm(wait=False)
+
+    @classmethod
+    async def warm_async(cls):
+        """
+        Await the instruments load without blocking the event loop; see warm.
+
+        Every coroutine on a loop waits on one executor thread, so a cold start
+        delays lookups but never the loop's other work.
+
+        Raises:
+            Exception: If loading failed or timed out
+        """
+        if FyersAPI.snapshot is not None:
+            return
+        loop = asyncio.get_running_loop()
+        flight = cls._warm_flights.get(loop)
+        if flight is None:
+            flight = cls._warm_flights[loop] = loop.run_in_executor(None, cls.warm)
+            flight.add_done_callback(lambda _: cls._warm_flights.pop(loop, None))
+        await asyncio.shield(flight)
+
+    async def _snapshot_async(self):
+        """Get the snapshot to serve a lookup from, awaiting the load on a cold start."""
+        await self.warm_async()
+        return self._current_snapshot()
+
+    async def _call(self, endpoint, **kwargs):
+        """Await a FyersModel endpoint once the request scheduler allows it."""
+        if self.scheduler is not None:
+            with self.metrics.timer('rate_limit_wait', endpoint=endpoint):
+                await self.scheduler.acquire_async(endpoint, account=self.session_token)
+        try:
+            with self.metrics.timer('broker_round_trip', endpoint=endpoint):
+                return await getattr(self.obj, endpoint)(**kwargs)
+        except Exception:
+            self.metrics.increment('broker_errors', endpoint=endpoint)
+            raise
+
+    async def get_funds(self):
+        """Fetch available funds from the account."""
+        try:
+            if self.funds_view is not None:
+                response = await self.funds_view.refresh_async(self.session_token, lambda: self._call('funds'))
+            else:
+                response = await self._call('funds')
+            funds = response.get('fund_limit', [{}])[0]
+            return funds.get('equityAmount', 0)
+        except Exception as e:
+            logging.error(f"Error in fetching funds: {e}")
+            return 0
+
+    async def get_ltp(self, exchange_code, symbol_token):
+        """Get Last Traded Price for a given token."""
+        try:
+            snapshot = await self._snapshot_async()
+            if not snapshot.contains(symbol_token):
+                logging.error(f"No data found for token {symbol_token}")
+                return 0
+
+            symbol = snapshot.symbol_ticker(symbol_token, self.LTP_INSTRUMENT_TYPES.get(exchange_code))
+            if symbol is None:
+                logging.error(f"No matching instrument found for {exchange_code}:{symbol_token}")
+                return 0
+
+            ltp = self._streamed_ltp(symbol)
+            if ltp is not None:
+                return ltp
+            if self.quote_cache is None:
+                return await self._fetch_ltp(symbol)
+            ltp = self.quote_cache.lookup(symbol)
+            if ltp is not None:
+                return ltp
+
+            # Single-flight: concurrent callers for a symbol await one fetch
+            key = (asyncio.get_running_loop(), symbol)
+            flight = self._ltp_flights.get(key)
+            if flight is None:
+                self.quote_cache.count('misses')
+                flight = asyncio.ensure_future(self._fetch_ltp(symbol))
+                self._ltp_flights[key] = flight
+                flight.add_done_callback(lambda _: self._ltp_flights.pop(key, None))
+            else:
+                self.quote_cache.count('coalesced')
+            ltp = await asyncio.shield(flight)
+            self.quote_cache.put(symbol, ltp)
+            return ltp
+        except Exception as e:
+            logging.error(f"Error in fetching LTP: {e}")
+            return 0
+
+    async def _fetch_ltp(self, symbol):
+        """Fetch the LTP of a Symbol ticker from the quotes endpoint."""
+        response = await self._call('quotes', data={"symbols": symbol, "ohlcv_flag": 1})
+        return response.get('d', [{}])[0].get('v', {}).get('lp', 0)
+
+    async def get_ltp_many(self, pairs):
+        """
+        Get Last Traded Prices for many tokens with batched quotes calls.
+
+        Args:
+            pairs (list): (exchange_code, symbol_token) tuples
+
+        Returns:
+            dict: symbol_token -> lp; tokens that cannot be resolved or quoted map to 0
+        """
+        snapshot = await self._snapshot_async()
+        ltps = {}
+        tokens_by_symbol = {}
+        for exchange_code, symbol_token in pairs:
+            ltps[symbol_token] = 0
+            symbol = snapshot.symbol_ticker(symbol_token, self.LTP_INSTRUMENT_TYPES.get(exchange_code))
+            if symbol is None:
+                logging.error(f"No matching instrument found for {exchange_code}:{symbol_token}")
+                continue
+            tokens_by_symbol.setdefault(symbol, []).append(symbol_token)
+
+        symbols = []
+        for symbol, symbol_tokens in tokens_by_symbol.items():
+            ltp = self._streamed_ltp(symbol)
+            if ltp is None and self.quote_cache is not None:
+                ltp = self.quote_cache.get(symbol)
+            if ltp is None:
+                symbols.append(symbol)
+                continue
+            for symbol_token in symbol_tokens:
+                ltps[symbol_token] = ltp
+
+        chunks = [symbols[i:i + self.QUOTES_BATCH_SIZE] for i in range(0, len(symbols), self.QUOTES_BATCH_SIZE)]
+        responses = await asyncio.gather(
+            *(self._call('quotes', data={"symbols": ",".join(chunk), "ohlcv_flag": 1}) for chunk in chunks),
+            return_exceptions=True
+        )
+        for response in responses:
+            if isinstance(response, Exception):
+                logging.error(f"Error in fetching LTP batch: {response}")
+                continue
+            for quote in response.get('d', []):
+                ltp = quote.get('v', {}).get('lp', 0)
+                if self.quote_cache is not None:
+                    self.quote_cache.put(quote.get('n'), ltp)
+                for symbol_token in tokens_by_symbol.get(quote.get('n'), []):
+                    ltps[symbol_token] = ltp
+        return ltps
+
+    async def cancel_order_on_broker(self, order_id):
+        try:
+            response = await self._call('cancel_order', data={"id": order_id})
+            self.metrics.increment('order_cancels')
+            return response
+        except Exception as e:
+            print(f"Error in canceling order: {e}")
+            return None
+
+    async def place_order_on_broker(self, symbol_token, symbol, qty, exchange_code, buy_sell, order_type, price, is_paper=False, is_overnight=False):
+        try:
+            order_params = self._order_params(symbol, qty, exchange_code, order_type, price, is_overnight, buy_sell)
+
+            average_price = 0
+            if not is_paper:
+                ltp = self._known_ltp(symbol) if self._needs_margin_ltp(order_params) else None
+                required = self._margin_required(order_params, ltp)
+                if required:
+                    ok, available = await self.funds_view.check_async(
+                        self.session_token, required, lambda: self._call('funds')
+                    )
+                    if not ok:
+                        return None, None, self._margin_rejection(required, available)
+
+                response = await self._call('place_order', data=order_params)
+                if not response or response.get('Success') == 'None':
+                    error = response.get('emsg', 'Unknown error') if response else 'Unknown error'
+                    print(f"Order placement failed: {error}")
+                    self.metrics.increment('order_failures')
+                    return None, None, f"Order placement failed: {error}"
+                order_id = response.get('id')
+                if not order_id:
+                    return None, None, "Order placement failed - No order ID returned."
+                print(f"Order placed successfully with Order ID: {order_id}")
+                self.metrics.increment('orders_placed')
+                if required:
+                    self.funds_view.reserve(self.session_token, required)
+
+                average_price, status, error_message = await self.handle_order_status(order_id)
+                if self.funds_view is not None:
+                    self.funds_view.invalidate(self.session_token)
+                if not average_price:
+                    return None, None, "Order placement failed - No order ID returned."
+            elif self.paper_engine is None:
+                order_id = 'Paper' + str(uuid.uuid4())
+                print(f"Paper trade created with ID: {order_id}")
+            else:
+                ltp = self._paper_price(symbol)
+                if ltp is None:
+                    ltp = await self.get_ltp(exchange_code, symbol_token)
+                order_id, average_price, error = self._submit_paper_order(symbol, order_params, ltp)
+                if error:
+                    return None, None, f"Order placement failed: {error}"
+
+            if average_price == 0:
+                with self.metrics.timer('ltp_fallback'):
+                    average_price = await self.get_ltp(exchange_code, symbol_token)
+
+            order_params['ltp'] = average_price
+            order_params['transactiontype'] = buy_sell
+            order_params['tradingsymbol'] = symbol
+            order_params['quantity'] = qty
+            order_params['symboltoken'] = str(symbol_token)
+            return order_id, order_params, "Order placed successfully"
+
+        except Exception as e:
+            if "insufficient funds" in str(e).lower():
+                print("Order placement failed due to insufficient funds.")
+                return None, None, "Order placement failed due to insufficient funds."
+            print(f"Order placement failed: {e}")
+            return None, None, str(e)
+
+    async def place_basket(self, legs, is_paper=False, is_overnight=False, timeout=1.5, rollback=True):
+        """Place several legs as one basket; see FyersAPI.place_basket."""
+        return await BasketOrder(self, legs, is_paper, is_overnight).execute_async(timeout, rollback)
+
+    async def _fetch_orderbook(self):
+        """Fetch every order of the account from the orderbook."""
+        response = await self._call('orderbook')
+        if not response or 'orderBook' not in response:
+            return []
+        return response.get('orderBook', [])
+
+    def _ensure_poller(self):
+        """Start the orderbook polling task shared by every pending order, unless it is running."""
+        loop = asyncio.get_running_loop()
+        task = self._poll_task
+        if task is None or task.done() or task.get_loop() is not loop:
+            self._poll_task = loop.create_task(self.order_tracker.poll_async(self._fetch_orderbook))
+
+    async def fetch_order_status(self, order_id, retries=3, delay=0.5):
+        """
+        Wait for an order to reach a final status.
+
+        Push updates resolve the wait immediately; meanwhile one task polls the
+        orderbook for all pending orders with the tracker's backoff. After
+        ``retries * delay`` seconds the latest entry seen (or None) is returned.
+        """
+        tracker = self.order_tracker
+        loop = asyncio.get_running_loop()
+        future = asyncio.wrap_future(tracker.track(order_id))
+        started = loop.time()
+        try:
+            self._ensure_poller()
+            await asyncio.wait({future}, timeout=retries * delay)
+            if future.done():
+                return future.result()
+            self.metrics.increment('status_timeouts')
+            return tracker.latest(order_id)
+        except Exception as e:
+            logging.error(f"Error fetching order status: {e}")
+            return None
+        finally:
+            self.metrics.observe('status_polling', loop.time() - started)
+            tracker.forget(order_id)
+            future.cancel()
+
+    async def handle_order_status(self, order_id):
+        try:
+            latest_order = await self.fetch_order_status(order_id)
+            if not latest_order:
+                await self.cancel_order_on_broker(order_id)
+                return None, None, "Failed to fetch order status during polling"
+            status = latest_order.get('status', 0)
+            if status == 2:
+                return latest_order.get('tradedPrice', 0), 'Completed', None
+            if status == 5:
+                return self.handle_rejection(latest_order)
+            if status in [3, 6]:
+                return None, None, f"Order {status}"
+            await self.cancel_order_on_broker(order_id)
+            return None, None, "Order was canceled due to timeout."
+        except Exception as e:
+            logging.error(f"Error handling order status: {e}")
+            return None, None, f"Error handling order status: {str(e)}"
@@ -0,0 +1,307 @@
+# basket.py
+
+import asyncio
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+
+from order_tracker import TERMINAL_STATUSES
+
+
+class BasketOrder:
+    """
+    Multi-leg order placed as one unit.
+
+    All legs are resolved before anything is sent, submitted concurrently and
+    their fills tracked together. If any leg fails, or is still open when the
+    wait times out, the legs that are still open are cancelled. A leg is
+    reported Cancelled only once the broker confirms the cancel; the
+    orderbook is then read once more so a leg that filled meanwhile is
+    reported Completed. Legs the broker accepts reserve their estimated
+    margin in the API's FundsView, and the account's cached funds are
+    invalidated once the basket is done.
+
+    Paper baskets go through the API's PaperExecutionEngine the same way,
+    so their legs show up in its orderbook and positions.
+
+    Each leg is a dict with either ``symbol_token``/``symbol`` or the
+    get_fyers_token_details arguments (``exch_seg``, ``symbol``,
+    ``strike_price``, ``is_pe``, ``expiry``, ``instrumenttype``), plus ``qty``
+    or ``lots``, ``buy_sell``, ``order_type`` and ``price``.
+    """
+
+    # Seconds between checks of paper legs that have not filled yet
+    PAPER_POLL = 0.01
+
+    def __init__(self, api, legs, is_paper=False, is_overnight=False):
+        self.api = api
+        self.legs = [dict(leg) for leg in legs]
+        self.is_paper = is_paper
+        self.is_overnight = is_overnight
+        self.results = [
+            {"symbol_token": None, "symbol": None, "qty": None, "order_id": None,
+             "status": "Pending", "average_price": 0, "message": None}
+            for _ in self.legs
+        ]
+
+    def resolve(self):
+        """Resolve every leg to a token, symbol and quantity; False if any leg fails."""
+        resolved = True
+        for leg, result in zip(self.legs, self.results):
+            exch_seg = leg.get("exch_seg", "NSE")
+            if leg.get("symbol_token") is not None:
+                token, symbol, lot_size = leg["symbol_token"], leg["symbol"], 1
+            else:
+                details = self.api.get_fyers_token_details(
+                    exch_seg, leg["symbol"], leg.get("strike_price"), leg.get("is_pe", 1),
+                    leg.get("expiry", "W"), leg.get("instrumenttype")
+                )
+                token, symbol = details[0], details[1]
+                lot_size = details[2] if len(details) > 2 else None
+            if token is None:
+                result["status"] = "Failed"
+                result["message"] = f"No token found for leg {leg.get('symbol')}"
+                resolved = False
+                continue
+            result["symbol_token"] = token
+            result["symbol"] = symbol
+            result["qty"] = leg.get("qty") or int(leg.get("lots", 1)) * int(lot_size or 1)
+            leg["exch_seg"] = exch_seg
+        if not resolved:
+            for result in self.results:
+                if result["status"] == "Pending":
+                    result["status"] = "Failed"
+                    result["message"] = "Basket not placed: another leg could not be resolved"
+        return resolved
+
+    def _order_params(self, leg, result):
+        return self.api._order_params(
+            result["symbol"], result["qty"], leg["exch_seg"], leg.get("order_type", "MARKET"),
+            leg.get("price", 0), self.is_overnight, leg.get("buy_sell", "BUY")
+        )
+
+    @staticmethod
+    def _record_submission(result, response):
+        """Record the broker's answer to a place_order call; return the order id or None."""
+        if isinstance(response, Exception) or not response or response.get("Success") == "None" or not response.get("id"):
+            error = response if isinstance(response, Exception) else (response or {}).get("emsg", "No order ID returned")
+            result["status"] = "Failed"
+            result["message"] = f"Order placement failed: {error}"
+            return None
+        result["order_id"] = response["id"]
+        result["status"] = "Open"
+        return result["order_id"]
+
+    @staticmethod
+    def _record_final(result, order):
+        """Record a leg's latest orderbook entry."""
+        if not order:
+            return
+        status = order.get("status")
+        if status == 2:
+            result["status"] = "Completed"
+            result["average_price"] = order.get("tradedPrice", 0)
+        elif status == 5:
+            result["status"] = "Rejected"
+            result["message"] = order.get("message", "Unknown reason")
+        elif status in TERMINAL_STATUSES:
+            result["status"] = "Cancelled"
+
+    @staticmethod
+    def _record_cancel(result, response):
+        """Record the broker's answer to a rollback cancel; a leg stays Open unless it is confirmed."""
+        if isinstance(response, dict) and response.get("s") == "ok":
+            result["status"] = "Cancelled"
+            result["message"] = "Cancelled by basket rollback"
+        else:
+            error = response.get("message", "Unknown error") if isinstance(response, dict) else response or "No response"
+            result["message"] = f"Rollback cancel failed: {error}"
+
+    def _reconcile(self, results, orderbook):
+        """Update rolled-back legs from one orderbook read, e.g. a leg that filled before its cancel."""
+        orders = {order.get("id"): order for order in orderbook}
+        for result in results:
+            order = orders.get(result["order_id"])
+            if not order or order.get("status") not in TERMINAL_STATUSES:
+                continue
+            self._record_final(result, order)
+            if result["status"] == "Completed":
+                result["message"] = "Filled before the rollback cancel"
+
+    def _reserve_funds(self, params):
+        """Reserve the estimated margin of every leg the broker accepted, as single orders do."""
+        funds_view = self.api.funds_view
+        if funds_view is None:
+            return
+        for result, order_params in zip(self.results, params):
+            if not result["order_id"]:
+                continue
+            price = order_params.get("limitPrice") if order_params.get("type") == 1 else None
+            funds_view.reserve(self.api.session_token, funds_view.estimate_margin(
+                order_params["symbol"], order_params["qty"], price or self.api._known_ltp(order_params["symbol"]),
+                order_params.get("side"), order_params.get("productType")
+            ))
+
+    def _invalidate_funds(self):
+        """Mark the account's cached funds as changed once any leg reached the broker."""
+        if self.api.funds_view is not None and any(result["order_id"] for result in self.results):
+            self.api.funds_view.invalidate(self.api.session_token)
+
+    def _open_results(self):
+        return [result for result in self.results if result["status"] == "Open"]
+
+    def _needs_rollback(self):
+        return any(result["status"] != "Completed" for result in self.results)
+
+    def _paper_pairs(self):
+        """Get the (exch_seg, token) pairs to quote for paper legs; with an engine, only unpriced ones."""
+        return [
+            (leg["exch_seg"], result["symbol_token"]) for leg, result in zip(self.legs, self.results)
+            if self.api.paper_engine is None or self.api._paper_price(result["symbol"]) is None
+        ]
+
+    def _paper_submit(self, ltps):
+        """Submit every leg to the paper engine, or without one mint ids filled at ``ltps``."""
+        engine = self.api.paper_engine
+        for leg, result in zip(self.legs, self.results):
+            if engine is None:
+                result["order_id"] = 'Paper' + str(uuid.uuid4())
+                result["status"] = "Completed"
+                result["average_price"] = ltps.get(result["symbol_token"], 0)
+                continue
+            ltp = ltps.get(result["symbol_token"]) or self.api._paper_price(result["symbol"])
+            order_id, _, error = self.api._submit_paper_order(result["symbol"], self._order_params(leg, result), ltp)
+            if self._record_submission(result, {"id": order_id} if order_id else {"emsg": error}):
+                self._record_final(result, engine.order(order_id))
+
+    def _paper_update(self):
+        """Record paper legs that have filled since they were submitted."""
+        for result in self._open_results():
+            self._record_final(result, self.api.paper_engine.order(result["order_id"]))
+
+    def _paper_rollback(self):
+        """Cancel still-open paper legs on the engine and reconcile them with its orderbook."""
+        engine = self.api.paper_engine
+        open_results = self._open_results()
+        for result in open_results:
+            self._record_cancel(result, engine.cancel_order(result["order_id"]))
+        self._reconcile(open_results, engine.orderbook(self.api.session_token))
+
+    def _paper_execute(self, timeout, rollback):
+        self._paper_submit(self.api.get_ltp_many(self._paper_pairs()))
+        if self.api.paper_engine is None:
+            return self.results
+        # Legs inside the simulated latency or resting on a limit fill on later prices
+        deadline = time.monotonic() + timeout
+        while self._open_results() and time.monotonic() < deadline:
+            time.sleep(self.PAPER_POLL)
+            self._paper_update()
+        if rollback and self._needs_rollback():
+            self._paper_rollback()
+        return self.results
+
+    async def _paper_execute_async(self, timeout, rollback):
+        self._paper_submit(await self.api.get_ltp_many(self._paper_pairs()))
+        if self.api.paper_engine is None:
+            return self.results
+        deadline = time.monotonic() + timeout
+        while self._open_results() and time.monotonic() < deadline:
+            await asyncio.sleep(self.PAPER_POLL)
+            self._paper_update()
+        if rollback and self._needs_rollback():
+            self._paper_rollback()
+        return self.results
+
+    def execute(self, timeout=1.5, rollback=True):
+        """
+        Place the basket and wait for every leg.
+
+        Args:
+            timeout (float): Seconds to wait for fills
+            rollback (bool): Cancel still-open legs if the basket did not fully fill
+
+        Returns:
+            list: One result dict per leg, in leg order
+        """
+        if not self.resolve():
+            return self.results
+        if self.is_paper:
+            return self._paper_execute(timeout, rollback)
+
+        tracker = self.api.order_tracker
+        params = [self._order_params(leg, result) for leg, result in zip(self.legs, self.results)]
+        with ThreadPoolExecutor(max_workers=len(self.legs)) as pool:
+            submissions = [pool.submit(self.api._call, 'place_order', data=data) for data in params]
+        futures = {}
+        for result, submission in zip(self.results, submissions):
+            try:
+                response = submission.result()
+            except Exception as e:
+                response = e
+            order_id = self._record_submission(result, response)
+            if order_id:
+                futures[order_id] = tracker.track(order_id)
+        self._reserve_funds(params)
+
+        wait_futures(list(futures.values()), timeout=timeout)
+        for result in self._open_results():
+            order_id = result["order_id"]
+            future = futures[order_id]
+            self._record_final(result, future.result() if future.done() else tracker.latest(order_id))
+            tracker.forget(order_id)
+
+        if rollback and self._needs_rollback():
+            open_results = self._open_results()
+            if open_results:
+                logging.info(f"Basket incomplete, cancelling {len(open_results)} open legs")
+                with ThreadPoolExecutor(max_workers=len(open_results)) as pool:
+                    responses = list(pool.map(lambda result: self.api.cancel_order_on_broker(result["order_id"]), open_results))
+                for result, response in zip(open_results, responses):
+                    self._record_cancel(result, response)
+                try:
+                    self._reconcile(open_results, self.api._fetch_orderbook())
+                except Exception as e:
+                    logging.error(f"Error reading orderbook after basket rollback: {e}")
+        self._invalidate_funds()
+        return self.results
+
+    async def execute_async(self, timeout=1.5, rollback=True):
+        """Place the basket on an AsyncFyersAPI; same contract as execute."""
+        # Legs resolve through the instrument index; never block the loop on its load
+        await self.api.warm_async()
+        if not self.resolve():
+            return self.results
+        if self.is_paper:
+            return await self._paper_execute_async(timeout, rollback)
+
+        params = [self._order_params(leg, result) for leg, result in zip(self.legs, self.results)]
+        responses = await asyncio.gather(
+            *(self.api._call('place_order', data=data) for data in params),
+            return_exceptions=True
+        )
+        order_ids = [self._record_submission(result, response) for result, response in zip(self.results, responses)]
+        self._reserve_funds(params)
+        orders = await asyncio.gather(
+            *(self.api.fetch_order_status(order_id, retries=1, delay=timeout) for order_id in order_ids if order_id)
+        )
+        for result, order in zip([r for r, o in zip(self.results, order_ids) if o], orders):
+            self._record_final(result, order)
+
+        if rollback and self._needs_rollback():
+            open_results = self._open_results()
+            if open_results:
+                logging.info(f"Basket incomplete, cancelling {len(open_results)} open legs")
+                responses = await asyncio.gather(
+                    *(self.api.cancel_order_on_broker(result["order_id"]) for result in open_results),
+                    return_exceptions=True
+                )
+                for result, response in zip(open_results, responses):
+                    self._record_cancel(result, response)
+                try:
+                    self._reconcile(open_results, await self.api._fetch_orderbook())
+                except Exception as e:
+                    logging.error(f"Error reading orderbook after basket rollback: {e}")
+        self._invalidate_funds()
+        return self.results
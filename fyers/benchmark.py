@@ -0,0 +1,161 @@
+# benchmark.py
+"""
+Benchmarks for instrument loading, symbol resolution and order flow.
+
+Runs against a synthetic symbol master and FakeFyersModel, so no credentials
+or network are needed. Example:
+
+    python benchmark.py --underlyings 200 --strikes 80 --latency 0.02
+"""
+
+import argparse
+import contextlib
+import io
+import logging
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from download import FyersInstruments
+from fake_broker import FakeFyersModel, synthetic_instruments
+from instrument_index import InstrumentIndex, InstrumentSnapshot
+from script import FyersAPI
+
+
+def measure(fn, calls):
+    """Call ``fn`` once per argument tuple; return per-call durations in seconds."""
+    durations = np.empty(len(calls))
+    for i, args in enumerate(calls):
+        start = time.perf_counter()
+        fn(*args)
+        durations[i] = time.perf_counter() - start
+    return durations
+
+
+def report(name, durations):
+    """Print throughput and latency percentiles of one benchmark."""
+    p50, p90, p99 = np.percentile(durations, [50, 90, 99])
+    print(
+        f"{name:<32} n={len(durations):<7} {len(durations) / durations.sum():>12,.0f} ops/s   "
+        f"p50 {p50 * 1e6:>10,.1f}us   p90 {p90 * 1e6:>10,.1f}us   "
+        f"p99 {p99 * 1e6:>10,.1f}us   max {durations.max() * 1e6:>10,.1f}us"
+    )
+
+
+def bench_loading(file_path, repeat):
+    """Cold (CSV parse + cache write) and warm (memory-mapped cache) loads."""
+    cache_path = FyersInstruments.cache_path(file_path)
+
+    def cold():
+        shutil.rmtree(cache_path, ignore_errors=True)
+        FyersInstruments.load_instruments(file_path)
+
+    report("load_instruments (csv)", measure(cold, [()] * repeat))
+    report("load_instruments (cache)", measure(lambda: FyersInstruments.load_instruments(file_path), [()] * repeat))
+
+    df = FyersInstruments.load_instruments(file_path)
+    segments = FyersInstruments.split_segments(df)
+    build = lambda: InstrumentSnapshot({segment: InstrumentIndex(frame) for segment, frame in segments.items()})
+    report("snapshot build", measure(build, [()] * repeat))
+    FyersAPI.snapshot = build()
+    return df
+
+
+def option_requests(df, n, rng):
+    """Random (symbol, strike, is_pe, expiry, instrumenttype) lookups of listed options."""
+    options = df[df["Option type"].isin(["CE", "PE"])]
+    rows = options.iloc[rng.integers(0, len(options), size=n)]
+    instrument_types = {14: "OPTIDX", 15: "OPTSTK"}
+    codes = rng.choice(["W", "NW", "M"], size=n)
+    return [
+        (symbol, float(strike), int(option_type == "PE"), str(code), instrument_types[int(instrument_type)])
+        for symbol, strike, option_type, instrument_type, code in zip(
+            rows["Underlying symbol"], rows["Strike price"], rows["Option type"],
+            rows["Exchange Instrument type"], codes
+        )
+    ]
+
+
+def bench_lookups(api, df, iterations, rng):
+    tokens = df["Scrip code"].to_numpy()[rng.integers(0, len(df), size=iterations)]
+    report("get_details_from_csv", measure(api.get_details_from_csv, [(token,) for token in tokens]))
+
+    requests = option_requests(df, iterations, rng)
+    with contextlib.redirect_stdout(io.StringIO()):
+        durations = measure(
+            lambda *request: FyersAPI.get_fyers_token_details("NFO", *request),
+            requests
+        )
+    report("get_fyers_token_details", durations)
+
+    frame = [
+        {"exch_seg": "NFO", "symbol": symbol, "strike_price": strike, "is_pe": is_pe,
+         "expiry": expiry, "instrumenttype": instrumenttype}
+        for symbol, strike, is_pe, expiry, instrumenttype in requests
+    ]
+    durations = measure(FyersAPI.resolve_many, [(frame,)] * 5)
+    report(f"resolve_many ({iterations} rows)", durations)
+
+    frames = [
+        FyersAPI.filter_fno_instruments(df, "NFO", symbol, strike, "PE" if is_pe else "CE", instrumenttype)
+        for symbol, strike, is_pe, _, instrumenttype in requests[:min(iterations, 200)]
+    ]
+    codes = [random.Random(i).choice(["W", "NW", "M", "NM"]) for i in range(len(frames))]
+    report("filter_by_expiry", measure(FyersAPI.filter_by_expiry, list(zip(frames, codes))))
+
+
+def bench_orders(api, df, orders, rng):
+    tokens = df[df["Exchange Instrument type"] == 0]
+    rows = tokens.iloc[rng.integers(0, len(tokens), size=orders)]
+    calls = [
+        (token, symbol, 1, "NSE", "BUY", "MARKET", 0)
+        for token, symbol in zip(rows["Scrip code"], rows["Symbol ticker"])
+    ]
+    with contextlib.redirect_stdout(io.StringIO()):
+        durations = measure(api.place_order_on_broker, calls)
+    report("place_order_on_broker", durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--underlyings", type=int, default=100, help="F&O underlyings in the synthetic master")
+    parser.add_argument("--expiries", type=int, default=8, help="Weekly expiries per underlying")
+    parser.add_argument("--strikes", type=int, default=60, help="Strikes per expiry and option type")
+    parser.add_argument("--equities", type=int, default=2000, help="Cash instruments")
+    parser.add_argument("--iterations", type=int, default=5000, help="Lookups per lookup benchmark")
+    parser.add_argument("--orders", type=int, default=200, help="Orders for the order flow benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per loading benchmark")
+    parser.add_argument("--latency", type=float, default=0.0, help="Fake broker latency per call, seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random fake broker latency, seconds")
+    parser.add_argument("--fill-delay", type=float, default=0.0, help="Seconds before fake orders fill")
+    parser.add_argument("--rate-limit", action="store_true", help="Keep the broker request scheduler on")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    rng = np.random.default_rng(args.seed)
+    df = synthetic_instruments(args.underlyings, args.expiries, args.strikes, args.equities, args.seed)
+    print(f"Synthetic master: {len(df):,} instruments")
+
+    work_dir = tempfile.mkdtemp(prefix="fyers-bench-")
+    try:
+        file_path = os.path.join(work_dir, "fyers_instruments.csv")
+        df.to_csv(file_path, index=False)
+        FyersAPI.shared_store = None
+        loaded = bench_loading(file_path, args.repeat)
+
+        if not args.rate_limit:
+            FyersAPI.scheduler = None
+        api = FyersAPI("fake-token", "FAKE-100", "fake-secret")
+        api.obj = FakeFyersModel(latency=args.latency, jitter=args.jitter, fill_delay=args.fill_delay, seed=args.seed)
+        bench_lookups(api, loaded, args.iterations, rng)
+        bench_orders(api, loaded, args.orders, rng)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
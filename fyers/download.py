@@ -1,11 +1,19 @@
 # fyers_instruments.py
 
+import json
 import logging
 import os
+import shutil
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 
-import pandas as pd
+from lazy import lazy_import
+from metrics import Metrics
 
-logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
 
 class FyersInstruments:
     HEADERS = [
@@ -41,6 +49,19 @@ class FyersInstruments:
         "https://public.fyers.in/sym_details/MCX_COM.csv"  # MCX - Commodity
     ]
 
+    # (Exchange, Segment) codes of the rows in each symbol master file
+    SEGMENT_CODES = {
+        "NSE_CD": (10, 12),
+        "NSE_FO": (10, 11),
+        "NSE_CM": (10, 10),
+        "BSE_CM": (12, 10),
+        "BSE_FO": (12, 11),
+        "MCX_COM": (11, 20)
+    }
+
+    # Seconds to wait on a symbol master server before giving up
+    DOWNLOAD_TIMEOUT = 60
+
     # Data types for CSV columns
     DTYPES = {
         "Fytoken": str,
@@ -50,40 +71,299 @@ class FyersInstruments:
         "Minimum lot size": int
     }
 
+    # Column layout of the binary instrument cache; reserved columns are dropped.
+    # Numeric columns are stored as .npy files and memory-mapped on load, string
+    # columns as category codes plus a JSON list of categories.
+    CACHE_COLUMNS = {
+        "Fytoken": "int64",
+        "Symbol Details": "category",
+        "Exchange Instrument type": "int16",
+        "Minimum lot size": "int32",
+        "Tick size": "float32",
+        "ISIN": "category",
+        "Trading Session": "category",
+        "Last update date": "category",
+        "Expiry date": "int64",
+        "Symbol ticker": "category",
+        "Exchange": "int16",
+        "Segment": "int16",
+        "Scrip code": "int64",
+        "Underlying symbol": "category",
+        "Underlying scrip code": "category",
+        "Strike price": "float32",
+        "Option type": "category",
+        "Underlying FyToken": "category"
+    }
+
+    # Load timings, shared with FyersAPI
+    metrics = Metrics.shared()
+
+    @staticmethod
+    def segments_path(file_path):
+        """Get the directory holding the raw segment files behind an instruments CSV."""
+        return os.path.splitext(file_path)[0] + ".segments"
+
+    @staticmethod
+    def segment_name(url):
+        """Get the segment name (e.g. NSE_FO) of a symbol master URL."""
+        return os.path.splitext(os.path.basename(url))[0]
+
+    @classmethod
+    def _fetch_segment(cls, url, segments_dir, validators):
+        """
+        Stream one segment file to disk unless the server reports it unchanged.
+
+        Args:
+            url (str): Symbol master URL
+            segments_dir (str): Directory holding the segment files
+            validators (dict): ETag/Last-Modified seen on the previous download
+
+        Returns:
+            tuple: (changed, validators) for the segment
+        """
+        path = os.path.join(segments_dir, f"{cls.segment_name(url)}.csv")
+        headers = {}
+        if os.path.exists(path):
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+
+        try:
+            request = urllib.request.Request(url, headers=headers)
+            with urllib.request.urlopen(request, timeout=cls.DOWNLOAD_TIMEOUT) as response:
+                part_path = f"{path}.part"
+                with open(part_path, "wb") as f:
+                    shutil.copyfileobj(response, f, 1 << 20)
+                os.replace(part_path, path)
+                return True, {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified")
+                }
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return False, validators
+            raise
+
+    @classmethod
+    def download_segments(cls, segments_dir="fyers_instruments.segments"):
+        """
+        Download the symbol master files concurrently, skipping unchanged ones.
+
+        Each file is streamed to ``segments_dir``; ETag/Last-Modified values are
+        kept in ``validators.json`` there and sent back as conditional headers.
+
+        Args:
+            segments_dir (str): Directory holding the segment files
+
+        Returns:
+            dict: Segment name -> True if downloaded, False if unchanged, for every
+                segment with a usable file on disk
+        """
+        os.makedirs(segments_dir, exist_ok=True)
+        validators_file = os.path.join(segments_dir, "validators.json")
+        validators = {}
+        if os.path.exists(validators_file):
+            with open(validators_file) as f:
+                validators = json.load(f)
+
+        def fetch(url):
+            segment = cls.segment_name(url)
+            logging.info(f"Downloading from {url}")
+            return segment, cls._fetch_segment(url, segments_dir, validators.get(segment, {}))
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=len(cls.URLS)) as pool:
+            futures = {url: pool.submit(fetch, url) for url in cls.URLS}
+            for url, future in futures.items():
+                segment = cls.segment_name(url)
+                try:
+                    _, (changed, segment_validators) = future.result()
+                    validators[segment] = segment_validators
+                    results[segment] = changed
+                    if not changed:
+                        logging.info(f"{segment} unchanged, skipping download")
+                except Exception as e:
+                    logging.error(f"Error downloading from {url}: {e}")
+                    # Fall back to the copy from the previous download, if any
+                    if os.path.exists(os.path.join(segments_dir, f"{segment}.csv")):
+                        results[segment] = False
+
+        validators_tmp = f"{validators_file}.tmp"
+        with open(validators_tmp, "w") as f:
+            json.dump(validators, f)
+        os.replace(validators_tmp, validators_file)
+        return results
+
+    @classmethod
+    def read_segment(cls, segments_dir, segment):
+        """Parse one downloaded segment file into a DataFrame with the HEADERS columns."""
+        df = pd.read_csv(os.path.join(segments_dir, f"{segment}.csv"), header=0)
+        df.columns = cls.HEADERS
+        return df
+
     @classmethod
-    def download_instruments(cls):
+    def download_instruments(cls, file_path="fyers_instruments.csv"):
         """Download and save instrument data from Fyers."""
         try:
+            segments_dir = cls.segments_path(file_path)
+            results = cls.download_segments(segments_dir)
+            if not results:
+                raise Exception("No data downloaded successfully")
+
+            if not any(results.values()) and cls._is_current(file_path, segments_dir, results):
+                logging.info(f"All segments unchanged, keeping {file_path}")
+                cached_df = cls.read_cache(cls.cache_path(file_path), source_path=file_path)
+                if cached_df is not None:
+                    return cached_df
+
             dfs = []
-            for url in cls.URLS:
+            for segment in results:
                 try:
-                    logging.info(f"Downloading from {url}")
-                    df = pd.read_csv(url, header=0)
-                    df.columns = cls.HEADERS
-                    dfs.append(df)
+                    dfs.append(cls.read_segment(segments_dir, segment))
                 except Exception as e:
-                    logging.error(f"Error downloading from {url}: {e}")
+                    logging.error(f"Error reading {segment}: {e}")
 
             if not dfs:
                 raise Exception("No data downloaded successfully")
 
-            combined_df = pd.concat(dfs, sort=False)
-            
-            # Save to CSV
-            output_file = "fyers_instruments.csv"
-            combined_df.to_csv(output_file, index=False)
-            logging.info(f"Saved combined data to {output_file}")
-            
-            return combined_df
+            return cls._write_combined(dfs, file_path)
 
         except Exception as e:
             logging.error(f"Error in download_instruments: {e}")
             return None
 
+    @classmethod
+    def _write_combined(cls, dfs, file_path):
+        """Save segment frames as the combined CSV and refresh its binary cache."""
+        combined_df = pd.concat(dfs, sort=False)
+        tmp_path = f"{file_path}.tmp-{os.getpid()}"
+        combined_df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, file_path)
+        logging.info(f"Saved combined data to {file_path}")
+        cls.write_cache(combined_df, cls.cache_path(file_path), source_path=file_path)
+        return combined_df
+
+    @classmethod
+    def _is_current(cls, file_path, segments_dir, segments):
+        """Check that a combined CSV exists and is at least as new as every segment file behind it."""
+        if not os.path.exists(file_path):
+            return False
+        built_at = os.path.getmtime(file_path)
+        return all(
+            os.path.getmtime(os.path.join(segments_dir, f"{segment}.csv")) <= built_at
+            for segment in segments
+        )
+
+    @staticmethod
+    def cache_path(file_path):
+        """Get the binary cache directory that belongs to an instruments CSV."""
+        return os.path.splitext(file_path)[0] + ".cache"
+
+    @staticmethod
+    def _source_stamp(source_path):
+        """Identify a version of the source CSV by its size and mtime."""
+        if not source_path or not os.path.exists(source_path):
+            return None
+        stat = os.stat(source_path)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    @staticmethod
+    def _cache_file(cache_path, column, suffix):
+        return os.path.join(cache_path, column.lower().replace(" ", "_") + suffix)
+
+    @classmethod
+    def write_cache(cls, df, cache_path, source_path=None):
+        """
+        Write instruments data to the binary cache.
+
+        Args:
+            df (pd.DataFrame): Instruments data with the HEADERS columns
+            cache_path (str): Cache directory to (re)create
+            source_path (str): CSV the data came from, used to detect a stale cache
+
+        Returns:
+            bool: True if the cache was written
+        """
+        tmp_path = f"{cache_path}.tmp-{os.getpid()}"
+        try:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            os.makedirs(tmp_path)
+            columns = {}
+            for column, kind in cls.CACHE_COLUMNS.items():
+                values = df[column]
+                if kind != "category":
+                    numeric = pd.to_numeric(values, errors="coerce")
+                    if numeric.isna().sum() == values.isna().sum():
+                        np.save(cls._cache_file(tmp_path, column, ".npy"), numeric.fillna(0).to_numpy(kind))
+                        columns[column] = kind
+                        continue
+                    # Non-numeric values present; keep the column as strings
+                    kind = "category"
+                codes, categories = pd.factorize(values.astype(object).where(values.notna(), None))
+                codes_dtype = np.int8 if len(categories) < 127 else np.int16 if len(categories) < 32767 else np.int32
+                np.save(cls._cache_file(tmp_path, column, ".codes.npy"), codes.astype(codes_dtype))
+                with open(cls._cache_file(tmp_path, column, ".categories.json"), "w") as f:
+                    json.dump([str(c) for c in categories], f)
+                columns[column] = kind
+
+            with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+                json.dump({"rows": len(df), "columns": columns, "source": cls._source_stamp(source_path)}, f)
+
+            # Swap the new cache in, then drop the old one
+            old_path = f"{cache_path}.old-{os.getpid()}"
+            if os.path.exists(cache_path):
+                os.rename(cache_path, old_path)
+            os.rename(tmp_path, cache_path)
+            shutil.rmtree(old_path, ignore_errors=True)
+            logging.info(f"Saved instruments cache to {cache_path}")
+            return True
+
+        except Exception as e:
+            logging.error(f"Error writing instruments cache: {e}")
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return False
+
+    @classmethod
+    def read_cache(cls, cache_path, source_path=None):
+        """
+        Load instruments data from the binary cache.
+
+        Numeric columns and category codes are memory-mapped read-only.
+
+        Args:
+            cache_path (str): Cache directory written by write_cache
+            source_path (str): CSV the cache must match; None accepts any cache
+
+        Returns:
+            pd.DataFrame: Instruments data, or None if the cache is missing or stale
+        """
+        meta_file = os.path.join(cache_path, "meta.json")
+        if not os.path.exists(meta_file):
+            return None
+        with open(meta_file) as f:
+            meta = json.load(f)
+        source = cls._source_stamp(source_path)
+        if source is not None and meta.get("source") != source:
+            logging.info(f"Instruments cache at {cache_path} is stale")
+            return None
+
+        columns = {}
+        for column, kind in meta["columns"].items():
+            if kind == "category":
+                codes = np.load(cls._cache_file(cache_path, column, ".codes.npy"), mmap_mode="r")
+                with open(cls._cache_file(cache_path, column, ".categories.json")) as f:
+                    categories = json.load(f)
+                columns[column] = pd.Categorical.from_codes(codes, categories=pd.Index(categories, dtype=object))
+            else:
+                values = np.load(cls._cache_file(cache_path, column, ".npy"), mmap_mode="r")
+                columns[column] = pd.Series(values, copy=False)
+        return pd.DataFrame(columns, copy=False)
+
     @classmethod
     def load_instruments(cls, file_path="fyers_instruments.csv"):
         """
-        Load instruments data from CSV file.
+        Load instruments data, preferring the binary cache over the CSV file.
         
         Args:
             file_path (str): Path to the instruments CSV file
@@ -97,13 +377,23 @@ class FyersInstruments:
         try:
             if not os.path.exists(file_path):
                 logging.info(f"Instrument file not found at {file_path}. Downloading...")
-                return cls.download_instruments()
+                if cls.download_instruments(file_path) is None:
+                    raise Exception("Download failed")
 
-            instruments_df = pd.read_csv(
-                file_path,
-                dtype=cls.DTYPES,
-                low_memory=False
-            )
+            start = time.perf_counter()
+            cache_path = cls.cache_path(file_path)
+            instruments_df = cls.read_cache(cache_path, source_path=file_path)
+            source = "cache"
+            if instruments_df is None:
+                source = "csv"
+                instruments_df = pd.read_csv(
+                    file_path,
+                    dtype=cls.DTYPES,
+                    low_memory=False
+                )
+                if cls.write_cache(instruments_df, cache_path, source_path=file_path):
+                    instruments_df = cls.read_cache(cache_path)
+            cls.metrics.observe("instrument_load", time.perf_counter() - start, segment="ALL", source=source)
             
             # Validate required columns
             required_columns = ["Fytoken", "Exchange", "Exchange Instrument type", "Symbol ticker", "Underlying symbol"]
@@ -118,6 +408,105 @@ class FyersInstruments:
             logging.error(f"Error loading instruments data: {e}")
             raise Exception("Failed to load instruments data")
 
+    @classmethod
+    def _load_segment(cls, segments_dir, segment):
+        """Load one segment from its binary cache, rebuilding the cache if stale."""
+        start = time.perf_counter()
+        source_path = os.path.join(segments_dir, f"{segment}.csv")
+        cache_path = os.path.join(segments_dir, f"{segment}.cache")
+        df = cls.read_cache(cache_path, source_path=source_path)
+        source = "cache"
+        if df is None:
+            source = "csv"
+            df = cls.read_segment(segments_dir, segment)
+            if cls.write_cache(df, cache_path, source_path=source_path):
+                df = cls.read_cache(cache_path)
+        cls.metrics.observe("instrument_load", time.perf_counter() - start, segment=segment, source=source)
+        return df
+
+    @classmethod
+    def split_segments(cls, df):
+        """Split a combined instruments frame into segments by (Exchange, Segment) codes."""
+        names = {codes: name for name, codes in cls.SEGMENT_CODES.items()}
+        groups = df.groupby([df["Exchange"].to_numpy(), df["Segment"].to_numpy()], sort=False).indices
+        segments = {}
+        for codes, positions in groups.items():
+            codes = tuple(int(code) for code in codes)
+            segments[names.get(codes, f"{codes[0]}_{codes[1]}")] = df.iloc[positions].reset_index(drop=True)
+        return segments
+
+    @classmethod
+    def load_segments(cls, file_path="fyers_instruments.csv"):
+        """
+        Load instruments data per segment from the segment caches.
+
+        Falls back to splitting the combined CSV when no segment files have been
+        downloaded yet, and downloads them when neither exists.
+
+        Args:
+            file_path (str): Path to the instruments CSV file
+
+        Returns:
+            dict: Segment name -> pd.DataFrame, in URLS order
+
+        Raises:
+            Exception: If loading fails
+        """
+        try:
+            segments_dir = cls.segments_path(file_path)
+            names = [cls.segment_name(url) for url in cls.URLS]
+            available = [name for name in names if os.path.exists(os.path.join(segments_dir, f"{name}.csv"))]
+            if not available:
+                if os.path.exists(file_path):
+                    return cls.split_segments(cls.load_instruments(file_path))
+                logging.info(f"Instrument segments not found at {segments_dir}. Downloading...")
+                available = list(cls.download_segments(segments_dir))
+                if not available:
+                    raise Exception("No data downloaded successfully")
+
+            segments = {name: cls._load_segment(segments_dir, name) for name in available}
+            logging.info("Successfully loaded instruments data")
+            return segments
+
+        except Exception as e:
+            logging.error(f"Error loading instruments data: {e}")
+            raise Exception("Failed to load instruments data")
+
+    @classmethod
+    def refresh_segments(cls, file_path="fyers_instruments.csv"):
+        """
+        Re-download the symbol master and load only the segments that changed.
+
+        When any segment changed, the combined CSV and its cache are rebuilt
+        too, so load_instruments and download_instruments see the new data.
+
+        Args:
+            file_path (str): Path to the instruments CSV file
+
+        Returns:
+            dict: Segment name -> pd.DataFrame for each changed segment
+        """
+        segments_dir = cls.segments_path(file_path)
+        results = cls.download_segments(segments_dir)
+        changed = {}
+        for segment, is_changed in results.items():
+            if not is_changed:
+                continue
+            try:
+                changed[segment] = cls._load_segment(segments_dir, segment)
+            except Exception as e:
+                logging.error(f"Error reading {segment}: {e}")
+        if changed:
+            try:
+                dfs = [
+                    changed[segment] if segment in changed else cls._load_segment(segments_dir, segment)
+                    for segment in results
+                ]
+                cls._write_combined(dfs, file_path)
+            except Exception as e:
+                logging.error(f"Error rebuilding {file_path}: {e}")
+        return changed
+
     @classmethod
     def get_instruments(cls, file_path="fyers_instruments.csv"):
         """
@@ -136,6 +525,7 @@ class FyersInstruments:
             return None
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
     print("Starting Fyers instrument download...")
     df = FyersInstruments.download_instruments()
     if df is not None:
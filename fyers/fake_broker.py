@@ -0,0 +1,191 @@
+# fake_broker.py
+
+import asyncio
+import itertools
+import random
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from download import FyersInstruments
+
+
+class FakeFyersModel:
+    """
+    Local stand-in for fyersModel.FyersModel.
+
+    Answers funds, quotes, place_order, cancel_order, orderbook and
+    get_profile with Fyers-shaped responses after ``latency`` seconds (plus up
+    to ``jitter`` more). Orders show as pending in the orderbook until
+    ``fill_delay`` seconds after placement, then as traded at the current
+    price, or as rejected with probability ``reject_rate``. With
+    ``is_async=True`` every method returns an awaitable, like the SDK.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, fill_delay=0.0, reject_rate=0.0,
+                 price=100.0, funds=1_000_000.0, is_async=False, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.fill_delay = fill_delay
+        self.reject_rate = reject_rate
+        self.price = price
+        self.available_funds = funds
+        self.is_async = is_async
+        self.calls = {}
+        self._orders = {}
+        self._ids = itertools.count(1)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _delay(self):
+        return self.latency + (self._random.random() * self.jitter if self.jitter else 0.0)
+
+    def _reply(self, endpoint, respond, delay=None):
+        with self._lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        delay = self._delay() if delay is None else delay
+        if self.is_async:
+            async def reply():
+                await asyncio.sleep(delay)
+                return respond()
+            return reply()
+        if delay:
+            time.sleep(delay)
+        return respond()
+
+    def funds(self):
+        return self._reply("funds", lambda: {
+            "s": "ok",
+            "fund_limit": [{"id": 10, "title": "Available Balance", "equityAmount": self.available_funds}]
+        })
+
+    def quotes(self, data):
+        symbols = [symbol for symbol in data["symbols"].split(",") if symbol]
+        return self._reply("quotes", lambda: {
+            "s": "ok",
+            "d": [{"n": symbol, "s": "ok", "v": {"lp": self.price, "symbol": symbol}} for symbol in symbols]
+        })
+
+    def place_order(self, data):
+        def respond():
+            order_id = f"FAKE{next(self._ids)}"
+            with self._lock:
+                rejected = self._random.random() < self.reject_rate
+                self._orders[order_id] = {
+                    "id": order_id,
+                    "symbol": data.get("symbol"),
+                    "qty": data.get("qty"),
+                    "side": data.get("side"),
+                    "placed_at": time.monotonic(),
+                    "final_status": 5 if rejected else 2
+                }
+            return {"s": "ok", "code": 1101, "id": order_id}
+        return self._reply("place_order", respond)
+
+    def cancel_order(self, data):
+        def respond():
+            with self._lock:
+                order = self._orders.get(data.get("id"))
+                if order is None:
+                    return {"s": "error", "code": -50, "message": "Invalid order id"}
+                order["final_status"] = 1
+                order["placed_at"] = -float("inf")
+            return {"s": "ok", "code": 1103, "id": data.get("id")}
+        return self._reply("cancel_order", respond)
+
+    def _entry(self, order, now):
+        status = order["final_status"] if now - order["placed_at"] >= self.fill_delay else 6
+        entry = {"id": order["id"], "symbol": order["symbol"], "qty": order["qty"], "side": order["side"], "status": status}
+        if status == 2:
+            entry["tradedPrice"] = self.price
+        elif status == 5:
+            entry["message"] = "RMS:Rule: Check circuit limit"
+        return entry
+
+    def orderbook(self):
+        def respond():
+            now = time.monotonic()
+            with self._lock:
+                return {"s": "ok", "orderBook": [self._entry(order, now) for order in self._orders.values()]}
+        return self._reply("orderbook", respond)
+
+    def get_profile(self):
+        return self._reply("get_profile", lambda: {"s": "ok", "data": {"fy_id": "FAKE0001", "name": "Fake User"}})
+
+
+def synthetic_instruments(underlyings=50, expiries=8, strikes=60, equities=2000, seed=0):
+    """
+    Build a symbol master in the FyersInstruments.HEADERS schema.
+
+    Each F&O underlying gets ``expiries`` weekly expiries (one future per
+    month-end expiry) with ``strikes`` CE and PE strikes each, listed under
+    NSE_FO; ``equities`` cash instruments are listed under NSE_CM.
+
+    Returns:
+        pd.DataFrame: Instruments with the HEADERS columns
+    """
+    rng = np.random.default_rng(seed)
+    today = pd.Timestamp.now().normalize()
+    # Weekly expiries on upcoming Thursdays, 15:30 IST
+    first = today + pd.Timedelta(days=(3 - today.weekday()) % 7 or 7)
+    expiry_dates = np.array([
+        int((first + pd.Timedelta(weeks=week, hours=10)).timestamp()) for week in range(expiries)
+    ])
+    months = expiry_dates.astype("datetime64[s]").astype("datetime64[M]")
+    monthly = expiry_dates[np.append(months[1:] != months[:-1], True)]
+
+    names = [f"SYN{i:04d}" for i in range(underlyings)]
+    if underlyings:
+        names[0] = "NIFTY"
+    steps = rng.choice([5.0, 10.0, 50.0, 100.0], size=underlyings)
+    # Keep the lowest strike above zero
+    spots = np.maximum(rng.uniform(100, 25000, size=underlyings).round(-1), steps * (strikes // 2 + 1))
+    spots[0] = 22000.0
+    steps[0] = 50.0
+
+    columns = {header: [] for header in dict.fromkeys(FyersInstruments.HEADERS)}
+    scrip = itertools.count(35000)
+
+    def add(instrument_type, lot, expiry, ticker, segment, underlying, strike, option_type):
+        code = next(scrip)
+        columns["Fytoken"].append(f"10{segment:02d}{expiry or 0:010d}{code}")
+        columns["Symbol Details"].append(ticker.split(":")[1])
+        columns["Exchange Instrument type"].append(instrument_type)
+        columns["Minimum lot size"].append(lot)
+        columns["Tick size"].append(0.05)
+        columns["ISIN"].append("")
+        columns["Trading Session"].append("0915-1530|1815-1915:")
+        columns["Last update date"].append(today.strftime("%Y-%m-%d"))
+        columns["Expiry date"].append(expiry)
+        columns["Symbol ticker"].append(ticker)
+        columns["Exchange"].append(10)
+        columns["Segment"].append(segment)
+        columns["Scrip code"].append(code)
+        columns["Underlying symbol"].append(underlying)
+        columns["Underlying scrip code"].append(0)
+        columns["Strike price"].append(strike)
+        columns["Option type"].append(option_type)
+        columns["Underlying FyToken"].append("")
+        columns["Reserved column"].append("")
+        columns["Reserved column int"].append(0)
+
+    for i, name in enumerate(names):
+        lot = int(rng.choice([25, 50, 75, 250, 500]))
+        instrument_type = 14 if i == 0 else 15
+        for expiry in expiry_dates:
+            tag = pd.Timestamp(int(expiry), unit="s").strftime("%y%b").upper()
+            if expiry in monthly:
+                add(11 if i == 0 else 13, lot, int(expiry), f"NSE:{name}{tag}FUT", 11, name, -1.0, "XX")
+            for k in range(strikes):
+                strike = float(spots[i] + (k - strikes // 2) * steps[i])
+                for option_type in ("CE", "PE"):
+                    add(instrument_type, lot, int(expiry), f"NSE:{name}{tag}{strike:g}{option_type}", 11, name, strike, option_type)
+    for i in range(equities):
+        name = names[i] if 0 < i < underlyings else f"EQ{i:05d}"
+        add(0, 1, 0, f"NSE:{name}-EQ", 10, name, -1.0, "XX")
+
+    # HEADERS repeats "Reserved column", as the downloaded files do
+    df = pd.DataFrame({i: columns[header] for i, header in enumerate(FyersInstruments.HEADERS)})
+    df.columns = FyersInstruments.HEADERS
+    return df
@@ -0,0 +1,277 @@
+# funds.py
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# fund_limit ids in the funds response
+TOTAL_BALANCE = 1
+UTILIZED_AMOUNT = 2
+AVAILABLE_BALANCE = 10
+
+
+class AccountFunds:
+    """Last fetched funds of one account, plus margin reserved by orders sent since."""
+
+    __slots__ = ("limits", "fetched_at", "stale", "reservations")
+
+    def __init__(self, limits, fetched_at):
+        self.limits = limits  # fund_limit id -> equityAmount
+        self.fetched_at = fetched_at
+        self.stale = False
+        self.reservations = []  # (reserved_at, amount)
+
+    @property
+    def available(self):
+        """Available balance less margin reserved since the fetch."""
+        available = self.limits.get(AVAILABLE_BALANCE, self.limits.get(TOTAL_BALANCE, 0))
+        return available - sum(amount for _, amount in self.reservations)
+
+
+class FundsView:
+    """
+    Cached funds and margin per account for pre-trade checks.
+
+    ``check`` compares an order's estimated margin with the cached available
+    balance without calling the broker. An account is fetched inline the
+    first time it is checked, once for all checks that arrive meanwhile;
+    after that, an entry older than ``ttl`` seconds
+    or invalidated (e.g. after a fill) is still used and is refetched in the
+    background. Margin of orders sent since the last fetch is reserved so
+    back-to-back orders cannot each spend the same balance.
+
+    Estimates are lower bounds: an order that passes may still be rejected by
+    the broker, but one that fails would have been.
+    """
+
+    # Margin as a fraction of order value
+    OPTION_BUY_RATE = 1.0  # Premium
+    FUTURES_RATE = 0.1
+    INTRADAY_RATE = 0.2  # Cash, INTRADAY product
+    DELIVERY_RATE = 1.0  # Cash, CASH product
+
+    def __init__(self, ttl=5.0):
+        """
+        Args:
+            ttl (float): Seconds before an account's funds are refetched
+        """
+        self.ttl = ttl
+        self._accounts = {}
+        self._refreshing = set()
+        # First fetches in progress, which concurrent checks of the account wait on
+        self._first_fetches = {}
+        self._tasks = set()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @classmethod
+    def estimate_margin(cls, symbol, qty, price, side, product):
+        """
+        Estimate the margin an order blocks.
+
+        Sells are not estimated: they either close a position or need exchange
+        margin that cannot be derived from the price alone.
+
+        Args:
+            symbol (str): Symbol ticker, e.g. NSE:NIFTY24JUN23000CE
+            qty (int): Quantity in units (lots times lot size)
+            price (float): Limit price or LTP
+            side (int): 1 buy, -1 sell
+            product (str): INTRADAY, MARGIN or CASH
+
+        Returns:
+            float: Estimated margin, or 0 if the order is not estimated
+        """
+        if side != 1 or not price or not qty:
+            return 0.0
+        if symbol.endswith(("CE", "PE")):
+            rate = cls.OPTION_BUY_RATE
+        elif symbol.endswith("FUT"):
+            rate = cls.FUTURES_RATE
+        elif product == 'INTRADAY':
+            rate = cls.INTRADAY_RATE
+        else:
+            rate = cls.DELIVERY_RATE
+        return float(qty) * float(price) * rate
+
+    def update(self, account, response, requested_at=None):
+        """
+        Store a funds response for an account.
+
+        Reservations made before the request was sent are dropped, since the
+        fetched balance already accounts for them.
+
+        Returns:
+            AccountFunds: The new entry, or None if the response has no fund_limit
+        """
+        limits = {item.get('id'): item.get('equityAmount', 0) for item in (response or {}).get('fund_limit', [])}
+        if not limits:
+            logging.error(f"Funds response without fund_limit for account: {response}")
+            return None
+        now = time.monotonic()
+        requested_at = now if requested_at is None else requested_at
+        entry = AccountFunds(limits, now)
+        with self._lock:
+            previous = self._accounts.get(account)
+            if previous is not None:
+                entry.reservations = [r for r in previous.reservations if r[0] >= requested_at]
+            self._accounts[account] = entry
+        return entry
+
+    def get(self, account):
+        """Get the cached AccountFunds of an account, or None."""
+        return self._accounts.get(account)
+
+    def reserve(self, account, amount):
+        """Reserve margin for an order sent to the broker."""
+        if not amount:
+            return
+        with self._lock:
+            entry = self._accounts.get(account)
+            if entry is not None:
+                entry.reservations.append((time.monotonic(), amount))
+
+    def invalidate(self, account):
+        """Mark an account's funds as changed, e.g. after a fill, so they are refetched."""
+        entry = self._accounts.get(account)
+        if entry is not None:
+            entry.stale = True
+
+    def _needs_refresh(self, entry):
+        return entry.stale or time.monotonic() - entry.fetched_at > self.ttl
+
+    def _claim(self, account):
+        with self._lock:
+            if account in self._refreshing:
+                return False
+            self._refreshing.add(account)
+            return True
+
+    def refresh(self, account, fetch):
+        """
+        Fetch an account's funds now.
+
+        Args:
+            fetch (callable): Returns a funds response
+
+        Returns:
+            dict: The funds response
+        """
+        requested_at = time.monotonic()
+        response = fetch()
+        self.update(account, response, requested_at)
+        return response
+
+    async def refresh_async(self, account, fetch):
+        """Fetch an account's funds now; ``fetch`` returns an awaitable funds response."""
+        requested_at = time.monotonic()
+        response = await fetch()
+        self.update(account, response, requested_at)
+        return response
+
+    def _fetch_first(self, account, fetch):
+        """Fetch an account's funds once for every concurrent caller without an entry."""
+        with self._lock:
+            entry = self._accounts.get(account)
+            if entry is not None:
+                return entry
+            done = self._first_fetches.get(account)
+            leader = done is None
+            if leader:
+                done = self._first_fetches[account] = threading.Event()
+
+        if not leader:
+            done.wait()
+            return self._accounts.get(account)
+        try:
+            self.refresh(account, fetch)
+        except Exception as e:
+            logging.error(f"Error fetching funds: {e}")
+        finally:
+            with self._lock:
+                self._first_fetches.pop(account, None)
+            done.set()
+        return self._accounts.get(account)
+
+    async def _fetch_first_async(self, account, fetch):
+        """Awaitable _fetch_first; callers on one event loop share the fetch."""
+        key = (asyncio.get_running_loop(), account)
+        with self._lock:
+            entry = self._accounts.get(account)
+            if entry is not None:
+                return entry
+            flight = self._first_fetches.get(key)
+            if flight is None:
+                flight = asyncio.ensure_future(self.refresh_async(account, fetch))
+                self._first_fetches[key] = flight
+                flight.add_done_callback(lambda _: self._first_fetches.pop(key, None))
+        try:
+            await asyncio.shield(flight)
+        except Exception as e:
+            logging.error(f"Error fetching funds: {e}")
+        return self._accounts.get(account)
+
+    def _refresh_in_background(self, account, fetch):
+        try:
+            self.refresh(account, fetch)
+        except Exception as e:
+            logging.error(f"Error refreshing funds: {e}")
+        finally:
+            self._refreshing.discard(account)
+
+    async def _refresh_task(self, account, fetch):
+        try:
+            await self.refresh_async(account, fetch)
+        except Exception as e:
+            logging.error(f"Error refreshing funds: {e}")
+        finally:
+            self._refreshing.discard(account)
+
+    def check(self, account, required, fetch):
+        """
+        Check whether an account's cached funds cover ``required``.
+
+        Args:
+            account: Key of the account
+            required (float): Estimated margin of the order
+            fetch (callable): Returns a funds response; used on first sight or when stale.
+                Concurrent first checks of an account share one fetch
+
+        Returns:
+            tuple: (ok, available); ok is True when funds are unknown
+        """
+        entry = self._accounts.get(account)
+        if entry is None:
+            entry = self._fetch_first(account, fetch)
+        elif self._needs_refresh(entry) and self._claim(account):
+            if self._executor is None:
+                with self._lock:
+                    if self._executor is None:
+                        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="funds-refresh")
+            self._executor.submit(self._refresh_in_background, account, fetch)
+        return self._verdict(entry, required)
+
+    async def check_async(self, account, required, fetch):
+        """Awaitable check; ``fetch`` returns an awaitable funds response."""
+        entry = self._accounts.get(account)
+        if entry is None:
+            entry = await self._fetch_first_async(account, fetch)
+        elif self._needs_refresh(entry) and self._claim(account):
+            task = asyncio.ensure_future(self._refresh_task(account, fetch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return self._verdict(entry, required)
+
+    @staticmethod
+    def _verdict(entry, required):
+        if entry is None:
+            return True, None
+        available = entry.available
+        return required <= available, available
+
+    def reset(self):
+        """Drop every cached account."""
+        with self._lock:
+            self._accounts.clear()
@@ -0,0 +1,523 @@
+# instrument_index.py
+
+import json
+import os
+
+from lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+
+class ExpiryCalendar:
+    """
+    Sorted expiry dates of one option chain.
+
+    ``expiries`` holds every expiry (the weekly series) and ``monthly`` the
+    last expiry of each calendar month, both as Unix timestamps.
+    """
+
+    # Expiry code -> (monthly series?, offset into the series)
+    CODES = {
+        "W": (False, 0),
+        "NW": (False, 1),
+        "M": (True, 0),
+        "NM": (True, 1),
+        "NNM": (True, 2)
+    }
+
+    def __init__(self, expiry_dates):
+        expiries = np.unique(np.asarray(expiry_dates, dtype=np.int64))
+        self.expiries = expiries[expiries > 0]
+        months = self.expiries.astype("datetime64[s]").astype("datetime64[M]")
+        last_in_month = np.append(months[1:] != months[:-1], True)[:len(months)]
+        self.monthly = self.expiries[last_in_month]
+
+    def next(self, n=0, monthly=False):
+        """
+        Get the n-th upcoming expiry.
+
+        Args:
+            n (int): 0 for the nearest expiry, 1 for the one after, ...
+            monthly (bool): Count monthly expiries only
+
+        Returns:
+            int: Expiry date as a Unix timestamp, or None if there are not enough
+        """
+        series = self.monthly if monthly else self.expiries
+        return int(series[n]) if 0 <= n < len(series) else None
+
+    def resolve(self, expiry):
+        """Resolve an expiry code (W/NW/M/NM/NNM) to a Unix timestamp, or None."""
+        if expiry not in self.CODES:
+            return None
+        monthly, n = self.CODES[expiry]
+        return self.next(n, monthly)
+
+
+class OptionChain:
+    """
+    Contracts of one (Exchange, Underlying symbol, Exchange Instrument type)
+    group, sorted by option type, then expiry, then strike.
+
+    All arrays are aligned; ``positions`` are row positions into the DataFrame
+    of the owning ``index`` and ``expiry_dates`` are Unix timestamps.
+    """
+
+    # Strikes closer than this match; below half the smallest strike step (0.0025)
+    STRIKE_TOLERANCE = 5e-4
+
+    def __init__(self, index, positions, option_types, expiry_dates, strikes):
+        self.index = index
+        self.positions = positions
+        self.option_types = option_types
+        self.expiry_dates = expiry_dates
+        self.strikes = strikes
+        self._expiries = None
+        self._slices = None
+        self._calendar = None
+        self._expiry_strikes = {}
+
+    @property
+    def expiries(self):
+        """Distinct expiry dates of the chain, built on first use."""
+        if self._expiries is None:
+            self._expiries = np.unique(self.expiry_dates)
+        return self._expiries
+
+    @property
+    def calendar(self):
+        """ExpiryCalendar of the chain, built on first use."""
+        if self._calendar is None:
+            self._calendar = ExpiryCalendar(self.expiries)
+        return self._calendar
+
+    def _slice_table(self):
+        """(option type, expiry) -> strike-sorted slice of the chain arrays."""
+        if self._slices is None:
+            changed = np.flatnonzero(
+                (self.option_types[1:] != self.option_types[:-1]) |
+                (self.expiry_dates[1:] != self.expiry_dates[:-1])
+            ) + 1
+            starts = [0] + changed.tolist()
+            stops = changed.tolist() + [len(self.positions)]
+            self._slices = {
+                (self.option_types[start], int(self.expiry_dates[start])): slice(start, stop)
+                for start, stop in zip(starts, stops)
+                if len(self.positions)
+            }
+        return self._slices
+
+    def _slice(self, option_type, expiry):
+        """Get the strike-sorted slice for one option type and expiry."""
+        return self._slice_table().get((option_type, int(expiry)))
+
+    def find(self, expiry, strike, option_type):
+        """
+        Binary search one contract by expiry, strike and option type.
+
+        Args:
+            expiry (int): Expiry date as a Unix timestamp
+            strike (float): Strike price
+            option_type (str): CE/PE
+
+        Returns:
+            int: Row position, or None if there is no such contract
+        """
+        if expiry is None or strike is None:
+            return None
+        bounds = self._slice(option_type, expiry)
+        if bounds is None:
+            return None
+        strikes = self.strikes[bounds]
+        i = np.searchsorted(strikes, strike - self.STRIKE_TOLERANCE)
+        if i < len(strikes) and abs(strikes[i] - strike) <= self.STRIKE_TOLERANCE:
+            return int(self.positions[bounds][i])
+        return None
+
+    def find_many(self, expiry, strikes, option_type):
+        """
+        Binary search many strikes of one expiry and option type at once.
+
+        Args:
+            expiry (int): Expiry date as a Unix timestamp
+            strikes (array-like): Strike prices
+            option_type (str): CE/PE
+
+        Returns:
+            np.ndarray: Row positions, -1 where there is no such contract
+        """
+        strikes = np.asarray(strikes, dtype=np.float64)
+        found = np.full(len(strikes), -1, dtype=np.int64)
+        bounds = self._slice(option_type, expiry) if expiry is not None else None
+        if bounds is None:
+            return found
+        chain_strikes = self.strikes[bounds]
+        i = np.searchsorted(chain_strikes, strikes - self.STRIKE_TOLERANCE)
+        hit = i < len(chain_strikes)
+        hit[hit] = np.abs(chain_strikes[i[hit]] - strikes[hit]) <= self.STRIKE_TOLERANCE
+        found[hit] = self.positions[bounds][i[hit]]
+        return found
+
+    def expiry_strikes(self, expiry):
+        """Get the sorted distinct strikes of an expiry, built on first use."""
+        expiry = int(expiry)
+        strikes = self._expiry_strikes.get(expiry)
+        if strikes is None:
+            parts = [
+                self.strikes[bounds]
+                for (_, slice_expiry), bounds in self._slice_table().items()
+                if slice_expiry == expiry
+            ]
+            strikes = np.unique(np.concatenate(parts)) if parts else np.empty(0)
+            self._expiry_strikes[expiry] = strikes
+        return strikes
+
+    def nearest_strikes(self, expiry, price, n=0):
+        """
+        Get the strike nearest to a price and the n strikes either side of it.
+
+        Args:
+            expiry (int): Expiry date as a Unix timestamp
+            price (float): Spot or reference price
+            n (int): Strikes to include below and above the nearest one
+
+        Returns:
+            tuple: (nearest strike, np.ndarray of up to 2n+1 sorted strikes);
+                (None, empty array) if the expiry has no strikes
+        """
+        strikes = self.expiry_strikes(expiry) if expiry is not None else np.empty(0)
+        if not len(strikes):
+            return None, strikes
+        i = int(np.searchsorted(strikes, price))
+        # Ties go to the lower strike
+        if i == len(strikes) or (i > 0 and price - strikes[i - 1] <= strikes[i] - price):
+            i -= 1
+        return float(strikes[i]), strikes[max(i - n, 0):i + n + 1]
+
+    def arrays(self, expiry, columns=()):
+        """
+        Get every contract of an expiry as aligned arrays, by option type then strike.
+
+        Args:
+            expiry (int): Expiry date as a Unix timestamp
+            columns (iterable): Extra DataFrame columns to include
+
+        Returns:
+            dict: Column name -> np.ndarray, always with "Option type" and "Strike price"
+        """
+        bounds = [
+            np.arange(bounds.start, bounds.stop)
+            for (_, slice_expiry), bounds in self._slice_table().items()
+            if slice_expiry == int(expiry)
+        ]
+        chain_rows = np.concatenate(bounds) if bounds else np.empty(0, dtype=np.intp)
+        positions = self.positions[chain_rows]
+        arrays = {
+            "Option type": self.option_types[chain_rows],
+            "Strike price": self.strikes[chain_rows]
+        }
+        for column in columns:
+            arrays[column] = self.index.df[column].iloc[positions].to_numpy()
+        return arrays
+
+    def row(self, position):
+        """Get the instrument row at a position returned by find/first."""
+        return self.index.df.iloc[position]
+
+    def first(self, expiry):
+        """Get the row position of the first contract of an expiry, or None."""
+        if expiry is None:
+            return None
+        found = np.flatnonzero(self.expiry_dates == expiry)
+        return int(self.positions[found[0]]) if len(found) else None
+
+
+class InstrumentIndex:
+    """
+    Lookup tables built once over a loaded instruments DataFrame.
+
+    Positions stored in the index are row positions (``iloc``) into the
+    DataFrame the index was built from, so lookups never copy or rescan it.
+    The tables are flat arrays (sorted keys and the row positions they map
+    to), so ``save`` can write them next to a binary cache and ``load`` can
+    memory-map them in another process instead of rebuilding them.
+    """
+
+    # Files written by save, beside the cache columns of the same frame
+    FILE_PREFIX = "index."
+    ARRAYS = (
+        "scrip_keys", "scrip_positions", "scrip_types", "symbol_tickers",
+        "chain_positions", "chain_option_types", "chain_expiries", "chain_strikes", "chain_bounds"
+    )
+
+    def __init__(self, df, arrays=None, chain_keys=None):
+        """
+        Args:
+            df (pd.DataFrame): Instruments data
+            arrays (dict): Prebuilt tables from load; built from ``df`` if None
+            chain_keys (list): (Exchange, Underlying symbol, Exchange Instrument type)
+                per chain, aligned with ``arrays["chain_bounds"]``
+        """
+        self.df = df
+        if arrays is None:
+            arrays, chain_keys = self._build(df)
+        self.arrays = arrays
+        self.chain_keys = chain_keys
+        # Fixed-width strings in file order, mapped like the other tables
+        self.symbol_tickers = arrays["symbol_tickers"]
+        self._scrip_keys = arrays["scrip_keys"]
+        self._numeric_keys = self._scrip_keys.dtype.kind == "i"
+        self.chains = {
+            key: OptionChain(
+                self,
+                arrays["chain_positions"][start:stop],
+                arrays["chain_option_types"][start:stop],
+                arrays["chain_expiries"][start:stop],
+                arrays["chain_strikes"][start:stop]
+            )
+            for key, (start, stop) in zip(chain_keys, arrays["chain_bounds"].tolist())
+        }
+
+    @staticmethod
+    def _build(df):
+        """Build the lookup arrays of a DataFrame."""
+        # Scrip code -> rows, sorted by code and then row position (codes repeat across exchanges)
+        codes = pd.to_numeric(df["Scrip code"], errors="coerce").to_numpy(np.float64)
+        if np.isfinite(codes).all() and (codes == np.round(codes)).all():
+            codes = codes.astype(np.int64)
+        else:
+            codes = df["Scrip code"].astype(str).to_numpy().astype(str)
+        instrument_types = pd.to_numeric(df["Exchange Instrument type"], errors="coerce").fillna(-1).to_numpy(np.int64)
+        scrip_order = np.argsort(codes, kind="stable")
+
+        # One sort for all (Exchange, Underlying symbol, Exchange Instrument type)
+        # groups; each chain is a run of it
+        keys = pd.MultiIndex.from_arrays([
+            df["Exchange"].to_numpy(),
+            df["Underlying symbol"].to_numpy(),
+            df["Exchange Instrument type"].to_numpy()
+        ])
+        key_codes, key_values = pd.factorize(keys)
+        option_types = df["Option type"].astype(object).fillna("").to_numpy().astype(str)
+        option_codes, _ = pd.factorize(option_types)
+        expiry_dates = pd.to_numeric(df["Expiry date"], errors="coerce").fillna(0).to_numpy(np.int64)
+        # Strikes come back as float32 from the binary cache; round so that
+        # they compare equal to the float64 strikes callers pass in
+        strikes = np.round(pd.to_numeric(df["Strike price"], errors="coerce").to_numpy(np.float64), 4)
+        chain_order = np.lexsort((strikes, expiry_dates, option_codes, key_codes))
+        sorted_keys = key_codes[chain_order]
+        changed = np.flatnonzero(sorted_keys[1:] != sorted_keys[:-1]) + 1
+        starts = np.concatenate(([0], changed)) if len(chain_order) else np.empty(0, dtype=np.int64)
+        stops = np.append(changed, len(chain_order)) if len(chain_order) else np.empty(0, dtype=np.int64)
+        key_values = key_values.tolist()
+        chain_keys = [
+            tuple(value.item() if hasattr(value, "item") else value for value in key_values[sorted_keys[start]])
+            for start in starts
+        ]
+        arrays = {
+            "scrip_keys": codes[scrip_order],
+            "scrip_positions": scrip_order.astype(np.int64),
+            "scrip_types": instrument_types[scrip_order],
+            "symbol_tickers": df["Symbol ticker"].astype(object).fillna("").to_numpy().astype(str),
+            "chain_positions": chain_order.astype(np.int64),
+            "chain_option_types": option_types[chain_order],
+            "chain_expiries": expiry_dates[chain_order],
+            "chain_strikes": strikes[chain_order],
+            "chain_bounds": np.stack([starts, stops], axis=1).astype(np.int64).reshape(-1, 2)
+        }
+        return arrays, chain_keys
+
+    def save(self, path):
+        """
+        Write the lookup arrays into a directory, e.g. the frame's cache directory.
+
+        Args:
+            path (str): Existing directory
+        """
+        for name in self.ARRAYS:
+            np.save(os.path.join(path, f"{self.FILE_PREFIX}{name}.npy"), self.arrays[name])
+        with open(os.path.join(path, f"{self.FILE_PREFIX}chain_keys.json"), "w") as f:
+            json.dump([list(key) for key in self.chain_keys], f)
+
+    @classmethod
+    def load(cls, df, path):
+        """
+        Memory-map lookup arrays written by save for the same DataFrame.
+
+        Returns:
+            InstrumentIndex: The index, or None if ``path`` holds no saved index
+        """
+        keys_file = os.path.join(path, f"{cls.FILE_PREFIX}chain_keys.json")
+        files = {name: os.path.join(path, f"{cls.FILE_PREFIX}{name}.npy") for name in cls.ARRAYS}
+        if not os.path.exists(keys_file) or not all(os.path.exists(file) for file in files.values()):
+            return None
+        # Plain ndarray views of the mappings; slicing np.memmap objects is slow
+        arrays = {name: np.load(file, mmap_mode="r").view(np.ndarray) for name, file in files.items()}
+        if len(arrays["scrip_positions"]) != len(df):
+            return None
+        with open(keys_file) as f:
+            chain_keys = [tuple(key) for key in json.load(f)]
+        return cls(df, arrays, chain_keys)
+
+    def _scrip_range(self, scrip_code):
+        """Get the (start, stop) run of a Scrip code in the sorted scrip arrays."""
+        if self._numeric_keys:
+            try:
+                key = int(scrip_code)
+            except (TypeError, ValueError):
+                return 0, 0
+        else:
+            key = str(scrip_code)
+        keys = self._scrip_keys
+        return keys.searchsorted(key, "left"), keys.searchsorted(key, "right")
+
+    def positions(self, scrip_code):
+        """
+        Get the row positions for a Scrip code.
+
+        Args:
+            scrip_code: Exchange token, as str or int
+
+        Returns:
+            np.ndarray: Row positions in file order, empty if the code is unknown
+        """
+        start, stop = self._scrip_range(scrip_code)
+        return self.arrays["scrip_positions"][start:stop]
+
+    def position(self, scrip_code, instrument_type):
+        """
+        Get the first row position for a Scrip code of a given instrument type.
+
+        Args:
+            scrip_code: Exchange token, as str or int
+            instrument_type (int): Exchange Instrument type
+
+        Returns:
+            int: Row position, or None if there is no such instrument
+        """
+        start, stop = self._scrip_range(scrip_code)
+        if start == stop:
+            return None
+        found = np.flatnonzero(self.arrays["scrip_types"][start:stop] == instrument_type)
+        return int(self.arrays["scrip_positions"][start + found[0]]) if len(found) else None
+
+    def rows(self, scrip_code):
+        """Get the instrument rows for a Scrip code as a DataFrame."""
+        return self.df.iloc[self.positions(scrip_code)]
+
+    def chain(self, exchange, underlying, instrument_type):
+        """Get the OptionChain for a group, or None if there is none."""
+        return self.chains.get((exchange, underlying, instrument_type))
+
+    def first_position(self, exchange, underlying, instrument_types):
+        """Get the first row position (in file order) over several instrument types."""
+        found = [
+            chain.positions.min()
+            for chain in (self.chain(exchange, underlying, t) for t in instrument_types)
+            if chain is not None
+        ]
+        return int(min(found)) if found else None
+
+
+def concat_frames(frames):
+    """Concatenate instrument frames, keeping category columns categorical."""
+    frames = list(frames)
+    if not frames:
+        return pd.DataFrame()
+    columns = {}
+    for column in frames[0].columns:
+        parts = [frame[column] for frame in frames]
+        if all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            columns[column] = pd.api.types.union_categoricals(parts, ignore_order=True)
+        else:
+            columns[column] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+class InstrumentSnapshot:
+    """
+    Immutable, per-segment view of the instrument master.
+
+    Each segment (NSE_FO, MCX_COM, ...) has its own InstrumentIndex, so a
+    refresh rebuilds only the segments that changed and reuses the others.
+    Readers take one reference to a snapshot and use it for a whole lookup;
+    a refresh publishes a new snapshot rather than mutating this one.
+    """
+
+    def __init__(self, indexes, generation=0):
+        self.indexes = indexes
+        self.generation = generation
+        self._df = None
+
+        # Merge chain lookups; earlier segments win, matching file order
+        self.chains = {}
+        for index in reversed(list(indexes.values())):
+            self.chains.update(index.chains)
+
+    @property
+    def df(self):
+        """
+        Combined DataFrame of every segment, built on first use.
+
+        Lookups never need it; with several segments it is a private copy of
+        every column, so code serving traffic should go through the indexes.
+        """
+        if self._df is None:
+            frames = [index.df for index in self.indexes.values()]
+            self._df = frames[0] if len(frames) == 1 else concat_frames(frames)
+        return self._df
+
+    def contains(self, scrip_code):
+        """Check whether any segment has a Scrip code."""
+        return any(len(index.positions(scrip_code)) for index in self.indexes.values())
+
+    def rows(self, scrip_code):
+        """Get the instrument rows for a Scrip code across segments as a DataFrame."""
+        frames = [index.rows(scrip_code) for index in self.indexes.values()]
+        found = [frame for frame in frames if len(frame)]
+        if not found:
+            return frames[0] if frames else pd.DataFrame()
+        return found[0] if len(found) == 1 else pd.concat(found, ignore_index=True)
+
+    def symbol_ticker(self, scrip_code, instrument_type=None):
+        """
+        Get the Symbol ticker for a Scrip code.
+
+        Args:
+            scrip_code: Exchange token, as str or int
+            instrument_type (int): Exchange Instrument type; None takes the first row
+
+        Returns:
+            str: Symbol ticker, or None if there is no such instrument
+        """
+        index, position = self._locate(scrip_code, instrument_type)
+        return str(index.symbol_tickers[position]) if index is not None else None
+
+    def value(self, scrip_code, column, instrument_type=None):
+        """Get one column (e.g. Fytoken) of the row symbol_ticker would pick, or None."""
+        index, position = self._locate(scrip_code, instrument_type)
+        return index.df[column].iloc[position] if index is not None else None
+
+    def _locate(self, scrip_code, instrument_type):
+        for index in self.indexes.values():
+            if instrument_type is None:
+                positions = index.positions(scrip_code)
+                position = positions[0] if len(positions) else None
+            else:
+                position = index.position(scrip_code, instrument_type)
+            if position is not None:
+                return index, position
+        return None, None
+
+    def chain(self, exchange, underlying, instrument_type):
+        """Get the OptionChain for a group, or None if there is none."""
+        return self.chains.get((exchange, underlying, instrument_type))
+
+    def first_row(self, exchange, underlying, instrument_types):
+        """Get the first row (in file order) over several instrument types, or None."""
+        for index in self.indexes.values():
+            position = index.first_position(exchange, underlying, instrument_types)
+            if position is not None:
+                return index.df.iloc[position]
+        return None
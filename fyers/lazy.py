@@ -0,0 +1,32 @@
+# lazy.py
+
+import importlib.util
+import sys
+
+
+def lazy_import(name):
+    """
+    Import a module on first attribute access instead of now.
+
+    Keeps heavy dependencies (pandas, numpy, the Fyers SDK) out of module
+    import time; the module is executed the first time anything is looked up
+    on it. Modules that are already imported are returned as they are.
+
+    Args:
+        name (str): Absolute module name, e.g. pandas or fyers_api.fyersModel
+
+    Returns:
+        module: The (possibly not yet executed) module
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
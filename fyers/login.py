@@ -3,6 +3,7 @@ import json
 
 from flask import redirect, request
 from fyers_api import accessToken, fyersModel  # type: ignore
+from session_pool import FyersSessionPool
 
 
 class FyersLogin:
@@ -37,9 +38,8 @@ class FyersLogin:
                 print(e, response)
                 return {'Message': 'Missing access token'}
 
-            fyers = fyersModel.FyersModel(token=access_token, is_async=False, client_id=app_id, log_path="")
-            data = fyers.get_profile()['data']
-            client_id = data['fy_id']
+            # Keep the session for the user's later requests instead of a throwaway client
+            client_id, fyers, data = FyersSessionPool.shared().login(access_token, app_id, app_secret)
             user_broker_details = UserBrokerDetails.getUserBrokerDetailsByClientId(client_id)
             tusta_user_id = user_broker_details['user_id']
             
@@ -0,0 +1,257 @@
+# market_data.py
+
+import logging
+import threading
+import time
+
+from lazy import lazy_import
+
+np = lazy_import("numpy")
+
+
+class TickTable:
+    """
+    Latest tick per subscribed symbol in preallocated arrays.
+
+    Each symbol gets a slot on subscription; ``lp``, ``volume`` and
+    ``timestamp`` are aligned arrays indexed by slot. Writes come from one
+    feed thread; readers index the arrays without taking a lock.
+    """
+
+    def __init__(self, capacity=1024):
+        self.lp = np.zeros(capacity, dtype=np.float64)
+        self.volume = np.zeros(capacity, dtype=np.int64)
+        self.timestamp = np.zeros(capacity, dtype=np.float64)
+        self.slots = {}  # Symbol ticker -> slot
+        self.fytoken_slots = {}  # Fytoken -> slot
+        self.fytokens = {}  # Symbol ticker -> Fytoken
+        self._lock = threading.Lock()
+
+    def add(self, symbol, fytoken=None):
+        """Get the slot of a symbol, allocating one if needed."""
+        slot = self.slots.get(symbol)
+        if slot is not None:
+            return slot
+        with self._lock:
+            slot = self.slots.get(symbol)
+            if slot is None:
+                slot = len(self.slots)
+                if slot == len(self.lp):
+                    self._grow()
+                self.slots[symbol] = slot
+            if fytoken is not None:
+                self.fytoken_slots[str(fytoken)] = slot
+                self.fytokens[symbol] = str(fytoken)
+        return slot
+
+    def _grow(self):
+        # Readers holding the old arrays keep reading valid, if stale, values
+        size = len(self.lp) * 2
+        for name in ("lp", "volume", "timestamp"):
+            old = getattr(self, name)
+            new = np.zeros(size, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def update(self, symbol, lp, volume=0, timestamp=None):
+        """Write a tick for a subscribed symbol; ticks for other symbols are dropped."""
+        slot = self.slots.get(symbol)
+        if slot is None:
+            return False
+        self.lp[slot] = lp
+        self.volume[slot] = volume
+        self.timestamp[slot] = timestamp if timestamp is not None else time.time()
+        return True
+
+    def get(self, symbol, max_age=None):
+        """
+        Get the latest (lp, volume, timestamp) of a symbol.
+
+        Returns:
+            tuple: The tick, or None if the symbol is not subscribed, has no
+                tick yet, or its tick is older than ``max_age`` seconds
+        """
+        return self._read(self.slots.get(symbol), max_age)
+
+    def get_by_fytoken(self, fytoken, max_age=None):
+        """Get the latest tick of a symbol by Fytoken; see get."""
+        return self._read(self.fytoken_slots.get(str(fytoken)), max_age)
+
+    def _read(self, slot, max_age):
+        if slot is None:
+            return None
+        timestamp = self.timestamp[slot]
+        if not timestamp or (max_age is not None and time.time() - timestamp > max_age):
+            return None
+        return float(self.lp[slot]), int(self.volume[slot]), float(timestamp)
+
+
+class FeedTransport:
+    """
+    Source of raw market data messages.
+
+    Subclasses connect to a feed and pass every message to the callback
+    given to ``connect``; MarketDataFeed decodes them.
+    """
+
+    def connect(self, on_message):
+        """Start delivering messages to ``on_message``."""
+        self._on_message = on_message
+
+    def subscribe(self, symbols):
+        """Start receiving ticks for Symbol tickers."""
+
+    def unsubscribe(self, symbols):
+        """Stop receiving ticks for Symbol tickers."""
+
+    def close(self):
+        """Disconnect from the feed."""
+
+
+class LocalTransport(FeedTransport):
+    """In-process transport; ``push`` delivers a message, e.g. from a replay or a test."""
+
+    def __init__(self):
+        self._on_message = None
+        self.subscribed = set()
+
+    def subscribe(self, symbols):
+        self.subscribed.update(symbols)
+
+    def unsubscribe(self, symbols):
+        self.subscribed.difference_update(symbols)
+
+    def push(self, message):
+        if self._on_message is not None:
+            self._on_message(message)
+
+
+class FyersDataSocketTransport(FeedTransport):
+    """Market data from the Fyers data websocket."""
+
+    def __init__(self, app_id, access_token):
+        self.app_id = app_id
+        self.access_token = access_token
+        self._socket = None
+        self._on_message = None
+
+    def connect(self, on_message):
+        from fyers_api.Websocket import ws  # type: ignore
+
+        self._on_message = on_message
+        self._socket = ws.FyersSocket(
+            access_token=f"{self.app_id}:{self.access_token}",
+            run_background=True,
+            log_path=""
+        )
+        self._socket.websocket_data = on_message
+
+    def subscribe(self, symbols):
+        if self._socket is not None and symbols:
+            self._socket.subscribe(symbol=list(symbols), data_type="symbolData")
+
+    def unsubscribe(self, symbols):
+        if self._socket is not None and symbols:
+            try:
+                self._socket.unsubscribe(symbol=list(symbols))
+            except Exception as e:
+                logging.error(f"Error unsubscribing from data socket: {e}")
+
+    def close(self):
+        if self._socket is not None:
+            try:
+                self._socket.stop_running()
+            except Exception as e:
+                logging.error(f"Error stopping data socket: {e}")
+            self._socket = None
+
+
+class MarketDataFeed:
+    """
+    Streaming ticks decoded into a TickTable.
+
+    Messages are Fyers symbolData payloads: a dict or a list of dicts with
+    ``symbol``, ``ltp``, ``vol_traded_today`` and ``timestamp`` (a ``d`` key
+    wrapping them is also accepted). Every decoded tick is also passed to
+    ``listeners`` as ``(symbol, lp)``, e.g. PaperExecutionEngine.on_price,
+    and to ``tick_listeners`` as ``(symbol, lp, volume, timestamp, fytoken)``,
+    e.g. Recorder.record_tick; fytoken is None unless given to subscribe.
+    """
+
+    def __init__(self, transport, table=None, max_age=5.0):
+        """
+        Args:
+            transport (FeedTransport): Where messages come from
+            table (TickTable): Table to write to; a new one by default
+            max_age (float): Seconds after which a tick no longer counts as the LTP
+        """
+        self.transport = transport
+        self.table = table if table is not None else TickTable()
+        self.max_age = max_age
+        self.listeners = []
+        self.tick_listeners = []
+        self.ticks = 0
+        self._started = False
+
+    def start(self):
+        if not self._started:
+            self.transport.connect(self.on_message)
+            self._started = True
+            if self.table.slots:
+                self.transport.subscribe(list(self.table.slots))
+
+    def stop(self):
+        self.transport.close()
+        self._started = False
+
+    def subscribe(self, symbols, fytokens=None):
+        """
+        Subscribe to Symbol tickers.
+
+        Args:
+            symbols (list): Symbol tickers, e.g. NSE:SBIN-EQ
+            fytokens (list): Matching Fytokens, to also index the table by them
+        """
+        fytokens = fytokens if fytokens is not None else [None] * len(symbols)
+        new = [symbol for symbol in symbols if symbol not in self.table.slots]
+        for symbol, fytoken in zip(symbols, fytokens):
+            self.table.add(symbol, fytoken)
+        if self._started and new:
+            self.transport.subscribe(new)
+
+    def is_subscribed(self, symbol):
+        return symbol in self.table.slots
+
+    def ltp(self, symbol):
+        """Get the streamed LTP of a subscribed symbol, or None if absent or stale."""
+        tick = self.table.get(symbol, self.max_age)
+        return tick[0] if tick is not None else None
+
+    @staticmethod
+    def decode(message):
+        """Yield (symbol, lp, volume, timestamp) from a symbolData message."""
+        if isinstance(message, dict):
+            message = message.get("d", message)
+        for tick in message if isinstance(message, list) else [message]:
+            if not isinstance(tick, dict) or "symbol" not in tick or tick.get("ltp") is None:
+                continue
+            yield (
+                tick["symbol"],
+                float(tick["ltp"]),
+                int(tick.get("vol_traded_today") or 0),
+                float(tick["timestamp"]) if tick.get("timestamp") else None
+            )
+
+    def on_message(self, message):
+        try:
+            for symbol, lp, volume, timestamp in self.decode(message):
+                if self.table.update(symbol, lp, volume, timestamp):
+                    self.ticks += 1
+                    for listener in self.listeners:
+                        listener(symbol, lp)
+                    if self.tick_listeners:
+                        fytoken = self.table.fytokens.get(symbol)
+                        for listener in self.tick_listeners:
+                            listener(symbol, lp, volume, timestamp, fytoken)
+        except Exception as e:
+            logging.error(f"Error decoding market data: {e}")
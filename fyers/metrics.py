@@ -0,0 +1,221 @@
+# metrics.py
+
+import logging
+import math
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Histogram:
+    """
+    Latency histogram with logarithmic buckets.
+
+    Each bucket is ``GROWTH`` times wider than the previous one, so any
+    percentile is accurate to within that relative error however wide the
+    range of values, at a fixed cost per observation.
+    """
+
+    # Smallest resolvable value, in seconds, and relative bucket width
+    LOWEST = 1e-6
+    GROWTH = 1.02
+
+    def __init__(self):
+        self._counts = {}
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, value):
+        bucket = int(math.log(max(value, self.LOWEST) / self.LOWEST, self.GROWTH))
+        self._counts[bucket] = self._counts.get(bucket, 0) + 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, q):
+        """Get the q-th percentile (0-100), or None if nothing was recorded."""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for bucket in sorted(self._counts):
+            seen += self._counts[bucket]
+            if seen >= rank:
+                # Upper edge of the bucket, capped by the largest value seen
+                return min(self.LOWEST * self.GROWTH ** (bucket + 1), self.max)
+        return self.max
+
+    def summary(self, quantiles=(50, 90, 99)):
+        summary = {"count": self.count, "sum": self.sum, "min": self.min, "max": self.max}
+        for q in quantiles:
+            summary[f"p{q}"] = self.percentile(q)
+        return summary
+
+
+class MetricsSink:
+    """
+    Receiver of every observation made on a Metrics registry.
+
+    Push-based exporters (statsd, ...) subclass this; pull-based ones read
+    the registry instead, see ``Metrics.prometheus_text``.
+    """
+
+    def observe(self, name, labels, seconds):
+        """Receive one timing, in seconds."""
+
+    def increment(self, name, labels, value):
+        """Receive one counter increment."""
+
+
+class StatsdSink(MetricsSink):
+    """Send timings and counters to a statsd daemon over UDP."""
+
+    def __init__(self, host="127.0.0.1", port=8125, prefix="fyers"):
+        self.address = (host, port)
+        self.prefix = prefix
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def _name(self, name, labels):
+        return ".".join([self.prefix, name] + [str(value) for _, value in labels])
+
+    def _send(self, line):
+        try:
+            self._socket.sendto(line.encode(), self.address)
+        except OSError as e:
+            logging.debug(f"Error sending to statsd: {e}")
+
+    def observe(self, name, labels, seconds):
+        self._send(f"{self._name(name, labels)}:{seconds * 1000:.3f}|ms")
+
+    def increment(self, name, labels, value):
+        self._send(f"{self._name(name, labels)}:{value}|c")
+
+
+class Metrics:
+    """
+    Registry of stage timings and counters.
+
+    Timings are kept as histograms per (name, labels) and counters as plain
+    totals. Read them in process with ``snapshot``, scrape them with
+    ``prometheus_text``, or attach sinks to forward every observation.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, sinks=None, enabled=True):
+        """
+        Args:
+            sinks (list): MetricsSink instances receiving every observation
+            enabled (bool): Record anything at all
+        """
+        self.sinks = list(sinks or [])
+        self.enabled = enabled
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        """Get the registry shared by the whole process."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def observe(self, name, seconds, **labels):
+        """Record a timing in seconds."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.record(seconds)
+        for sink in self.sinks:
+            sink.observe(name, key[1], seconds)
+
+    def increment(self, name, value=1, **labels):
+        """Add to a counter."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        for sink in self.sinks:
+            sink.increment(name, key[1], value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Time the body of a ``with`` block, exceptions included."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    @staticmethod
+    def _label_text(labels):
+        return ",".join(f"{key}={value}" for key, value in labels)
+
+    def snapshot(self):
+        """
+        Get every timing summary and counter.
+
+        Returns:
+            dict: {"timings": {key: summary}, "counters": {key: total}}, keyed
+                by ``name`` or ``name{label=value,...}``
+        """
+        with self._lock:
+            return {
+                "timings": {
+                    name + (f"{{{self._label_text(labels)}}}" if labels else ""): histogram.summary()
+                    for (name, labels), histogram in self._histograms.items()
+                },
+                "counters": {
+                    name + (f"{{{self._label_text(labels)}}}" if labels else ""): total
+                    for (name, labels), total in self._counters.items()
+                }
+            }
+
+    def prometheus_text(self, prefix="fyers", quantiles=(0.5, 0.9, 0.99)):
+        """Render every metric in the Prometheus text exposition format."""
+        def labels_text(labels, *extra):
+            pairs = [f'{key}="{value}"' for key, value in list(labels) + list(extra)]
+            return "{" + ",".join(pairs) + "}" if pairs else ""
+
+        lines = []
+        with self._lock:
+            timings = {}
+            for (name, labels), histogram in self._histograms.items():
+                timings.setdefault(name, []).append((labels, histogram))
+            counters = {}
+            for (name, labels), total in self._counters.items():
+                counters.setdefault(name, []).append((labels, total))
+
+            for name, series in sorted(timings.items()):
+                metric = f"{prefix}_{name}_seconds"
+                lines.append(f"# TYPE {metric} summary")
+                for labels, histogram in series:
+                    for q in quantiles:
+                        value = histogram.percentile(q * 100)
+                        lines.append(f"{metric}{labels_text(labels, ('quantile', q))} {value:.6f}")
+                    lines.append(f"{metric}_sum{labels_text(labels)} {histogram.sum:.6f}")
+                    lines.append(f"{metric}_count{labels_text(labels)} {histogram.count}")
+            for name, series in sorted(counters.items()):
+                metric = f"{prefix}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for labels, total in series:
+                    lines.append(f"{metric}{labels_text(labels)} {total}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """Drop every recorded timing and counter."""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
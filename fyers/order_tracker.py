@@ -0,0 +1,243 @@
+# order_tracker.py
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+# Fyers order statuses after which an order no longer changes:
+# 1 cancelled, 2 traded, 5 rejected, 7 expired
+TERMINAL_STATUSES = {1, 2, 5, 7}
+
+
+class OrderUpdateSource:
+    """
+    Push feed of order updates.
+
+    Subclasses call ``emit`` with each update, shaped like an orderbook entry
+    (``id``, ``status``, ``tradedPrice``, ...). A test can drive a tracker by
+    calling ``emit`` directly.
+    """
+
+    def __init__(self):
+        self._callbacks = []
+
+    def subscribe(self, callback):
+        """Register a callable to receive every order update."""
+        self._callbacks.append(callback)
+
+    def emit(self, order):
+        """Deliver one order update to every subscriber."""
+        for callback in self._callbacks:
+            try:
+                callback(order)
+            except Exception as e:
+                logging.error(f"Error delivering order update: {e}")
+
+    def start(self):
+        """Start receiving updates."""
+
+    def stop(self):
+        """Stop receiving updates."""
+
+
+class FyersOrderSocketSource(OrderUpdateSource):
+    """Order updates from the Fyers order websocket."""
+
+    def __init__(self, app_id, access_token):
+        super().__init__()
+        self.app_id = app_id
+        self.access_token = access_token
+        self._socket = None
+
+    def start(self):
+        from fyers_api.Websocket import ws  # type: ignore
+
+        self._socket = ws.FyersSocket(
+            access_token=f"{self.app_id}:{self.access_token}",
+            run_background=True,
+            log_path=""
+        )
+        self._socket.websocket_data = self._on_message
+        self._socket.subscribe(data_type="orderUpdate")
+
+    def _on_message(self, message):
+        order = message.get("d", message) if isinstance(message, dict) else None
+        if isinstance(order, dict) and order.get("id"):
+            self.emit(order)
+
+    def stop(self):
+        if self._socket is not None:
+            try:
+                self._socket.unsubscribe(data_type="orderUpdate")
+            except Exception as e:
+                logging.error(f"Error stopping order socket: {e}")
+            self._socket = None
+
+
+class OrderTracker:
+    """
+    Resolves order ids to their final orderbook entry.
+
+    Updates pushed by an OrderUpdateSource resolve waiters as soon as they
+    arrive. Orders the feed has not resolved are polled from the orderbook,
+    starting every ``min_poll`` seconds (``fallback_poll`` when a feed is
+    attached) and backing off to ``max_poll`` while nothing changes.
+    """
+
+    # Untracked updates kept in case track() is called after the update lands
+    RECENT_UPDATES = 1024
+
+    def __init__(self, fetch_orders=None, source=None, min_poll=0.05, max_poll=0.5, fallback_poll=0.25):
+        """
+        Args:
+            fetch_orders (callable): Returns the orderbook as a list of orders; None disables polling
+            source (OrderUpdateSource): Push feed of order updates
+            min_poll (float): First polling delay without a feed, in seconds
+            max_poll (float): Longest polling delay, in seconds
+            fallback_poll (float): First polling delay with a feed, in seconds
+        """
+        self.fetch_orders = fetch_orders
+        self.source = source
+        self.min_poll = min_poll
+        self.max_poll = max_poll
+        self.fallback_poll = fallback_poll
+        self._lock = threading.Lock()
+        self._futures = {}
+        self._latest = {}
+        self._recent = OrderedDict()
+        self._poller = None
+        if source is not None:
+            source.subscribe(self.on_update)
+
+    def on_update(self, order):
+        """Record an order update and resolve its waiter once it is final."""
+        order_id = order.get("id")
+        if not order_id:
+            return
+        with self._lock:
+            future = self._futures.get(order_id)
+            if future is None:
+                self._recent[order_id] = order
+                self._recent.move_to_end(order_id)
+                while len(self._recent) > self.RECENT_UPDATES:
+                    self._recent.popitem(last=False)
+                return
+            self._latest[order_id] = order
+        if order.get("status") in TERMINAL_STATUSES and not future.done():
+            future.set_result(order)
+
+    def track(self, order_id):
+        """
+        Start tracking an order.
+
+        Returns:
+            Future: Resolves to the order's final orderbook entry
+        """
+        with self._lock:
+            future = self._futures.get(order_id)
+            if future is None:
+                future = self._futures[order_id] = Future()
+                early = self._recent.pop(order_id, None)
+                if early is not None:
+                    self._latest[order_id] = early
+                    if early.get("status") in TERMINAL_STATUSES:
+                        future.set_result(early)
+            if self.fetch_orders is not None and (self._poller is None or not self._poller.is_alive()):
+                self._poller = threading.Thread(target=self._poll, name="order-tracker", daemon=True)
+                self._poller.start()
+        return future
+
+    def wait(self, order_id, timeout):
+        """
+        Wait for an order to reach a final status.
+
+        Args:
+            order_id (str): Broker order id
+            timeout (float): Seconds to wait
+
+        Returns:
+            dict: The final orderbook entry, else the latest one seen, else None
+        """
+        future = self.track(order_id)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            return self.latest(order_id)
+        finally:
+            self.forget(order_id)
+
+    def latest(self, order_id):
+        """Get the latest update seen for a tracked order, or None."""
+        return self._latest.get(order_id)
+
+    def forget(self, order_id):
+        """Stop tracking an order."""
+        with self._lock:
+            self._futures.pop(order_id, None)
+            self._latest.pop(order_id, None)
+
+    def _pending(self):
+        with self._lock:
+            return [order_id for order_id, future in self._futures.items() if not future.done()]
+
+    def _poll(self):
+        """Poll the orderbook for unresolved orders with adaptive backoff."""
+        delay = self.fallback_poll if self.source is not None else self.min_poll
+        while True:
+            time.sleep(delay)
+            pending = self._pending()
+            if not pending:
+                with self._lock:
+                    if not any(not future.done() for future in self._futures.values()):
+                        self._poller = None
+                        return
+                continue
+            try:
+                orders = self.fetch_orders() or []
+            except Exception as e:
+                logging.error(f"Error polling orderbook: {e}")
+                orders = []
+
+            pending = set(pending)
+            changed = False
+            for order in orders:
+                order_id = order.get("id")
+                if order_id in pending:
+                    changed = changed or self._latest.get(order_id) != order
+                    self.on_update(order)
+            delay = self.min_poll if changed else min(delay * 2, self.max_poll)
+
+    async def poll_async(self, fetch_orders):
+        """
+        Poll the orderbook on the event loop until no tracked order is pending.
+
+        The asyncio counterpart of the polling thread: one task serves every
+        pending order, with the same backoff.
+
+        Args:
+            fetch_orders (callable): Returns an awaitable orderbook list
+        """
+        delay = self.fallback_poll if self.source is not None else self.min_poll
+        while True:
+            await asyncio.sleep(delay)
+            pending = self._pending()
+            if not pending:
+                return
+            try:
+                orders = await fetch_orders() or []
+            except Exception as e:
+                logging.error(f"Error polling orderbook: {e}")
+                orders = []
+
+            pending = set(pending)
+            changed = False
+            for order in orders:
+                order_id = order.get("id")
+                if order_id in pending:
+                    changed = changed or self._latest.get(order_id) != order
+                    self.on_update(order)
+            delay = self.min_poll if changed else min(delay * 2, self.max_poll)
@@ -0,0 +1,220 @@
+# paper.py
+
+import itertools
+import threading
+from collections import deque
+import time
+import uuid
+
+# place_order payload "type" codes
+LIMIT_ORDER = 1
+MARKET_ORDER = 2
+
+
+class PaperOrder:
+    """One simulated order, reported like a Fyers orderbook entry."""
+
+    __slots__ = ("id", "account", "symbol", "qty", "side", "type", "limit_price",
+                 "eligible_at", "status", "traded_price", "message")
+
+    def __init__(self, order_id, account, symbol, qty, side, order_type, limit_price, eligible_at):
+        self.id = order_id
+        self.account = account
+        self.symbol = symbol
+        self.qty = qty
+        self.side = side
+        self.type = order_type
+        self.limit_price = limit_price
+        self.eligible_at = eligible_at
+        self.status = 6  # pending
+        self.traded_price = 0
+        self.message = ""
+
+    def entry(self):
+        """Get the order as an orderbook entry."""
+        return {
+            "id": self.id,
+            "symbol": self.symbol,
+            "qty": self.qty,
+            "side": self.side,
+            "type": self.type,
+            "limitPrice": self.limit_price,
+            "status": self.status,
+            "tradedPrice": self.traded_price,
+            "message": self.message
+        }
+
+
+class PaperExecutionEngine:
+    """
+    In-memory execution of paper orders against a price stream.
+
+    Prices come in through ``on_price`` (from quotes, a tick feed or a
+    replay) or, for symbols it has not seen, from ``price_source``. Market
+    orders fill at the first price available ``latency`` seconds after
+    submission, moved against the trader by ``slippage_bps``; limit orders
+    rest until the price crosses their limit. Positions are kept per account.
+    Filled and cancelled orders beyond the newest ``max_orders`` orders are
+    forgotten. Nothing here calls the broker.
+    """
+
+    def __init__(self, latency=0.0, slippage_bps=0.0, price_source=None, clock=time.monotonic, max_orders=100000):
+        """
+        Args:
+            latency (float): Simulated seconds between submission and earliest fill
+            slippage_bps (float): Fill price penalty in basis points
+            price_source (callable): symbol -> price or None, for symbols without ticks
+            clock (callable): Time source; replays pass their own
+            max_orders (int): Orders kept before the oldest finished ones are dropped
+        """
+        self.latency = latency
+        self.slippage_bps = slippage_bps
+        self.price_source = price_source
+        self.clock = clock
+        self.max_orders = max_orders
+        self._prices = {}
+        self._orders = {}
+        self._finished = deque()  # Ids of filled and cancelled orders, oldest first
+        self._resting = {}  # symbol -> {order id: PaperOrder}
+        self._positions = {}  # account -> symbol -> [qty, average price, realised pnl]
+        self._sequence = itertools.count(1)
+        self._prefix = 'Paper' + uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+
+    def price(self, symbol):
+        """Get the last price of a symbol, or None if none is known."""
+        price = self._prices.get(symbol)
+        if price is None and self.price_source is not None:
+            price = self.price_source(symbol) or None
+        return price
+
+    def on_price(self, symbol, price):
+        """Record a price and fill the symbol's resting orders it allows."""
+        if not price:
+            return
+        with self._lock:
+            self._prices[symbol] = price
+            resting = self._resting.get(symbol)
+            if resting:
+                now = self.clock()
+                for order in list(resting.values()):
+                    self._try_fill(order, price, now)
+
+    def place_order(self, account, order_params):
+        """
+        Submit an order given as a place_order payload (see FyersAPI._order_params).
+
+        Args:
+            account: Key of the account the order belongs to
+            order_params (dict): symbol, qty, side (1/-1), type (1 limit, 2 market), limitPrice
+
+        Returns:
+            dict: Response shaped like FyersModel.place_order
+        """
+        order_type = order_params.get("type", MARKET_ORDER)
+        if order_type not in (LIMIT_ORDER, MARKET_ORDER):
+            return {"s": "error", "code": -50, "message": f"Unsupported paper order type {order_type}"}
+        if order_type == LIMIT_ORDER and not order_params.get("limitPrice"):
+            return {"s": "error", "code": -50, "message": "Limit price is required for limit orders"}
+
+        symbol = order_params["symbol"]
+        price = self.price(symbol)
+        with self._lock:
+            now = self.clock()
+            order = PaperOrder(
+                f"{self._prefix}{next(self._sequence)}", account, symbol, int(order_params["qty"]),
+                order_params.get("side", 1), order_type, order_params.get("limitPrice", 0), now + self.latency
+            )
+            self._orders[order.id] = order
+            while len(self._orders) > self.max_orders and self._finished:
+                self._orders.pop(self._finished.popleft(), None)
+            if price is not None:
+                self._prices.setdefault(symbol, price)
+            if price is None or not self._try_fill(order, price, now):
+                self._resting.setdefault(symbol, {})[order.id] = order
+        return {"s": "ok", "code": 1101, "id": order.id}
+
+    def _try_fill(self, order, price, now):
+        """Fill an order at ``price`` if it is eligible; caller holds the lock."""
+        if now < order.eligible_at:
+            return False
+        if order.type == LIMIT_ORDER and (price - order.limit_price) * order.side > 0:
+            return False
+        fill = price * (1 + order.side * self.slippage_bps / 10000)
+        if order.type == LIMIT_ORDER:
+            fill = min(fill, order.limit_price) if order.side == 1 else max(fill, order.limit_price)
+        order.traded_price = round(fill, 2)
+        order.status = 2
+        self._resting.get(order.symbol, {}).pop(order.id, None)
+        self._finished.append(order.id)
+        self._update_position(order)
+        return True
+
+    def _update_position(self, order):
+        position = self._positions.setdefault(order.account, {}).setdefault(order.symbol, [0, 0.0, 0.0])
+        qty, average, realised = position
+        traded = order.qty * order.side
+        if qty == 0 or (qty > 0) == (traded > 0):
+            average = (average * abs(qty) + order.traded_price * abs(traded)) / (abs(qty) + abs(traded))
+        else:
+            closed = min(abs(qty), abs(traded))
+            realised += closed * (order.traded_price - average) * (1 if qty > 0 else -1)
+            if abs(traded) > abs(qty):
+                average = order.traded_price
+        qty += traded
+        position[:] = [qty, average if qty else 0.0, realised]
+
+    def order(self, order_id):
+        """
+        Get an order as an orderbook entry, or None if it is unknown.
+
+        A market order waiting out ``latency`` is filled here once it is due
+        and a price is known.
+        """
+        with self._lock:
+            order = self._orders.get(order_id)
+            if order is None:
+                return None
+            if order.status == 6:
+                price = self._prices.get(order.symbol)
+                if price is not None:
+                    self._try_fill(order, price, self.clock())
+            return order.entry()
+
+    def cancel_order(self, order_id):
+        """Cancel a pending order; response shaped like FyersModel.cancel_order."""
+        with self._lock:
+            order = self._orders.get(order_id)
+            if order is None or order.status != 6:
+                return {"s": "error", "code": -52, "message": "Order is not pending"}
+            order.status = 1
+            self._resting.get(order.symbol, {}).pop(order_id, None)
+            self._finished.append(order_id)
+        return {"s": "ok", "code": 1103, "id": order_id}
+
+    def orderbook(self, account):
+        """Get every order of an account as orderbook entries."""
+        with self._lock:
+            return [order.entry() for order in self._orders.values() if order.account == account]
+
+    def positions(self, account):
+        """
+        Get an account's positions.
+
+        Returns:
+            dict: symbol -> {"qty", "avg_price", "realised_pnl"}
+        """
+        with self._lock:
+            return {
+                symbol: {"qty": qty, "avg_price": average, "realised_pnl": realised}
+                for symbol, (qty, average, realised) in self._positions.get(account, {}).items()
+            }
+
+    def reset(self):
+        """Drop every order, position and price."""
+        with self._lock:
+            self._prices.clear()
+            self._orders.clear()
+            self._finished.clear()
+            self._resting.clear()
+            self._positions.clear()
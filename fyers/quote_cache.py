@@ -0,0 +1,158 @@
+# quote_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Flight:
+    """A fetch in progress that other callers for the same key wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class QuoteCache:
+    """
+    Short-lived quote cache with LRU eviction and single-flight fetches.
+
+    Concurrent callers that miss on the same key share one in-flight fetch
+    instead of each making a broker call. Values that are None or 0 (how
+    FyersAPI reports a failed LTP) are returned but never cached.
+    """
+
+    def __init__(self, ttl=1.0, maxsize=4096):
+        """
+        Args:
+            ttl (float): Seconds a quote stays fresh
+            maxsize (int): Maximum number of cached keys
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key):
+        """
+        Get a fresh cached value, or None; does not fetch.
+
+        Counts as one lookup (a hit or a miss), for callers that fetch misses
+        themselves, e.g. in batches. Use peek to look without counting.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def lookup(self, key):
+        """
+        Get a fresh cached value and count a hit, or None without counting.
+
+        For callers that resolve misses themselves and count them (as a miss
+        or coalesced) with ``count``; a hit refreshes the key's LRU position
+        as get does.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def peek(self, key):
+        """Get a fresh cached value, or None, without counting a lookup or refreshing its LRU position."""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    def count(self, outcome):
+        """Count a lookup resolved outside get/get_or_fetch: "hits", "misses" or "coalesced"."""
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def put(self, key, value):
+        """Cache a value for ``ttl`` seconds, evicting the least recently used keys."""
+        if not value:
+            return
+        with self._lock:
+            self._store(key, value)
+
+    def _store(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def get_or_fetch(self, key, fetch):
+        """
+        Get a cached value, or fetch it once for every concurrent caller.
+
+        Args:
+            key: Cache key, e.g. a Symbol ticker
+            fetch (callable): Called with no arguments on a miss
+
+        Returns:
+            The cached or fetched value
+
+        Raises:
+            Exception: Whatever ``fetch`` raised, for every caller sharing the fetch
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                self.misses += 1
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = fetch()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+                if flight.error is None and flight.value:
+                    self._store(key, flight.value)
+            flight.done.set()
+        return flight.value
+
+    def stats(self):
+        """Get hit/miss counters and the current size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "size": len(self._entries)
+            }
+
+    def clear(self):
+        """Drop every cached value."""
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,196 @@
+# rate_limit.py
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+
+
+class TokenBucket:
+    """Token bucket allowing ``count`` requests per ``period`` seconds."""
+
+    def __init__(self, count, period):
+        self.capacity = float(count)
+        self.rate = count / period
+        self.tokens = float(count)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        """Seconds until one token is available; 0 if one is available now."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class _AccountLimiter:
+    """Buckets and priority queue of one account."""
+
+    def __init__(self, limits, endpoint_limits):
+        self._buckets = [TokenBucket(count, period) for count, period in limits]
+        self._endpoint_buckets = {
+            endpoint: [TokenBucket(count, period) for count, period in pairs]
+            for endpoint, pairs in endpoint_limits.items()
+        }
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._sequence = itertools.count()
+
+    def _try_take(self, endpoint, priority):
+        """Take tokens if allowed; otherwise return seconds to wait (None: wait for a notify)."""
+        if self._waiting and self._waiting[0][0] < priority:
+            return None
+        now = time.monotonic()
+        buckets = self._buckets + self._endpoint_buckets.get(endpoint, [])
+        wait = max(bucket.wait_time(now) for bucket in buckets)
+        if wait > 0:
+            return wait
+        for bucket in buckets:
+            bucket.take()
+        return 0.0
+
+    def _leave(self, ticket):
+        self._waiting.remove(ticket)
+        heapq.heapify(self._waiting)
+        self._cond.notify_all()
+
+    def acquire(self, endpoint, priority, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            wait = self._try_take(endpoint, priority)
+            if wait == 0:
+                return True
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    wait = self._try_take(endpoint, priority)
+                    if wait == 0:
+                        return True
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            return False
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._cond.wait(wait)
+            finally:
+                self._leave(ticket)
+
+    async def acquire_async(self, endpoint, priority):
+        with self._cond:
+            if self._try_take(endpoint, priority) == 0:
+                return
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(self._waiting, ticket)
+        try:
+            while True:
+                with self._cond:
+                    wait = self._try_take(endpoint, priority)
+                if wait == 0:
+                    return
+                await asyncio.sleep(wait if wait is not None else 0.01)
+        finally:
+            with self._cond:
+                self._leave(ticket)
+
+
+class RequestScheduler:
+    """
+    Process-wide rate limiter for broker calls, with separate budgets per account.
+
+    Fyers limits each app and user, so every account gets its own buckets:
+    each call takes a token from its account's account-wide buckets
+    (``LIMITS``) and endpoint buckets (``ENDPOINT_LIMITS``). When tokens run
+    out, callers wait; within an account a caller never goes ahead of a
+    waiting caller with a higher priority, so status polls and cancellations
+    preempt order placement, which preempts quotes and funds. Accounts never
+    wait on each other.
+    """
+
+    # Fyers API limits per app and user: 10 requests/second, 200/minute
+    LIMITS = [(10, 1.0), (200, 60.0)]
+
+    # Tighter budgets for read endpoints so they cannot use up the shared limit
+    ENDPOINT_LIMITS = {
+        "quotes": [(8, 1.0), (150, 60.0)],
+        "funds": [(2, 1.0), (30, 60.0)],
+        "orderbook": [(5, 1.0), (120, 60.0)]
+    }
+
+    # Lower numbers go first. Status polls (orderbook) resolve orders already
+    # sent, so they go ahead of new orders: starved behind a burst of
+    # place_order calls, they would run past the status wait, and orders that
+    # had filled would be cancelled as timed out.
+    PRIORITIES = {
+        "cancel_order": 0,
+        "orderbook": 0,
+        "place_order": 1,
+        "modify_order": 1,
+        "quotes": 2,
+        "funds": 2
+    }
+    DEFAULT_PRIORITY = 1
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, limits=None, endpoint_limits=None, priorities=None):
+        """
+        Args:
+            limits (list): (count, period) pairs applied to every call of an account
+            endpoint_limits (dict): Endpoint -> (count, period) pairs, per account
+            priorities (dict): Endpoint -> priority, lower first
+        """
+        self.limits = limits or self.LIMITS
+        self.endpoint_limits = endpoint_limits if endpoint_limits is not None else self.ENDPOINT_LIMITS
+        self.priorities = priorities if priorities is not None else self.PRIORITIES
+        self._accounts = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        """Get the scheduler shared by the whole process."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def _limiter(self, account):
+        limiter = self._accounts.get(account)
+        if limiter is None:
+            with self._lock:
+                limiter = self._accounts.get(account)
+                if limiter is None:
+                    limiter = self._accounts[account] = _AccountLimiter(self.limits, self.endpoint_limits)
+        return limiter
+
+    def forget(self, account):
+        """Drop an account's buckets, e.g. when its session is evicted."""
+        with self._lock:
+            self._accounts.pop(account, None)
+
+    def acquire(self, endpoint, timeout=None, account=None):
+        """
+        Block until a call to ``endpoint`` may be made.
+
+        Args:
+            endpoint (str): FyersModel method name, e.g. quotes, place_order
+            timeout (float): Seconds to wait at most; None waits indefinitely
+            account: Key of the account making the call, e.g. its access token
+
+        Returns:
+            bool: True if acquired, False on timeout
+        """
+        priority = self.priorities.get(endpoint, self.DEFAULT_PRIORITY)
+        return self._limiter(account).acquire(endpoint, priority, timeout)
+
+    async def acquire_async(self, endpoint, account=None):
+        """Wait on the event loop until a call to ``endpoint`` may be made; see acquire."""
+        priority = self.priorities.get(endpoint, self.DEFAULT_PRIORITY)
+        await self._limiter(account).acquire_async(endpoint, priority)
@@ -0,0 +1,358 @@
+# recorder.py
+
+import inspect
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+from fake_broker import FakeFyersModel
+
+# Record kinds
+QUOTE = 1
+RESPONSE = 2
+ORDERBOOK = 3
+
+# Column layout of a chunk; each column is one .npy file
+COLUMNS = {
+    "time": np.float64,  # Unix time the record was taken
+    "kind": np.int8,  # QUOTE / RESPONSE / ORDERBOOK
+    "fytoken": np.int64,  # Fytoken of a quote, 0 if unknown
+    "symbol": np.int32,  # Position in the chunk's symbols.json; -1 for none
+    "lp": np.float64,  # Quoted price
+    "volume": np.int64,  # Traded volume
+    "latency": np.float32,  # Broker round trip in seconds of the call a record came from
+    "payload_start": np.int64,  # Byte range of the JSON payload in payloads.bin
+    "payload_end": np.int64
+}
+
+
+class Recorder:
+    """
+    Append-only log of quotes, broker responses and orderbook snapshots.
+
+    Records are buffered and written in chunks of ``chunk_rows`` rows under
+    ``root/chunk-NNNNNN``: one .npy file per column, the JSON payloads of
+    responses and orderbooks in payloads.bin, the chunk's symbols in
+    symbols.json and a Fytoken index (rows sorted by Fytoken) in
+    fytoken_index.npy. Chunks are written to a temporary directory and
+    renamed into place, so readers only ever see complete chunks.
+    """
+
+    CHUNK_ROWS = 65536
+
+    def __init__(self, root, chunk_rows=CHUNK_ROWS, clock=time.time):
+        self.root = root
+        self.chunk_rows = chunk_rows
+        self.clock = clock
+        os.makedirs(root, exist_ok=True)
+        self._chunk = len(Recording.chunk_dirs(root))
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._columns = {column: [] for column in COLUMNS}
+        self._symbols = {}
+        self._payloads = bytearray()
+
+    def _append(self, kind, timestamp, fytoken=0, symbol=None, lp=0.0, volume=0, latency=0.0, payload=None):
+        with self._lock:
+            columns = self._columns
+            start = len(self._payloads)
+            if payload is not None:
+                self._payloads += json.dumps(payload, default=str, separators=(",", ":")).encode()
+            columns["time"].append(self.clock() if timestamp is None else timestamp)
+            columns["kind"].append(kind)
+            columns["fytoken"].append(int(fytoken or 0))
+            columns["symbol"].append(-1 if symbol is None else self._symbols.setdefault(symbol, len(self._symbols)))
+            columns["lp"].append(lp or 0.0)
+            columns["volume"].append(int(volume or 0))
+            columns["latency"].append(latency)
+            columns["payload_start"].append(start)
+            columns["payload_end"].append(len(self._payloads))
+            if len(columns["time"]) >= self.chunk_rows:
+                self._flush()
+
+    def record_quote(self, symbol, lp, volume=0, fytoken=0, timestamp=None, latency=0.0):
+        """Record a price; ``latency`` is the round trip of the quotes call it came from, if any."""
+        self._append(QUOTE, timestamp, fytoken, symbol, lp, volume, latency)
+
+    def record_tick(self, symbol, lp, volume, timestamp, fytoken):
+        """Record a streamed tick; matches MarketDataFeed.tick_listeners."""
+        try:
+            fytoken = int(fytoken or 0)
+        except ValueError:
+            fytoken = 0
+        self.record_quote(symbol, lp, volume, fytoken, timestamp)
+
+    def record_response(self, endpoint, request, response, latency, timestamp=None):
+        """Record a broker call with its request, response and round trip time."""
+        self._append(RESPONSE, timestamp, latency=latency,
+                     payload={"endpoint": endpoint, "request": request, "response": response})
+
+    def record_orderbook(self, orders, timestamp=None, latency=0.0):
+        """Record an orderbook snapshot; ``latency`` is the round trip of the call it came from, if any."""
+        self._append(ORDERBOOK, timestamp, latency=latency, payload=orders)
+
+    def flush(self):
+        """Write buffered records as a chunk."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._columns["time"]:
+            return
+        final_dir = os.path.join(self.root, f"chunk-{self._chunk:06d}")
+        tmp_dir = f"{final_dir}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for column, dtype in COLUMNS.items():
+            np.save(os.path.join(tmp_dir, f"{column}.npy"), np.asarray(self._columns[column], dtype=dtype))
+        fytokens = np.asarray(self._columns["fytoken"], dtype=np.int64)
+        np.save(os.path.join(tmp_dir, "fytoken_index.npy"), np.argsort(fytokens, kind="stable"))
+        with open(os.path.join(tmp_dir, "payloads.bin"), "wb") as f:
+            f.write(self._payloads)
+        with open(os.path.join(tmp_dir, "symbols.json"), "w") as f:
+            json.dump(list(self._symbols), f)
+        os.rename(tmp_dir, final_dir)
+        self._chunk += 1
+        self._reset()
+
+    def close(self):
+        self.flush()
+
+
+class RecordingFyersModel:
+    """
+    Wrap a FyersModel (sync or async) and record every call to a Recorder.
+
+    Use as ``api.obj = RecordingFyersModel(api.obj, recorder)``. Quotes
+    responses are kept as quote rows and orderbook responses as snapshots;
+    other calls as responses. Streamed ticks are recorded by adding
+    ``recorder.record_tick`` to the feed's ``tick_listeners``.
+    """
+
+    def __init__(self, model, recorder):
+        self._model = model
+        self.recorder = recorder
+
+    def __getattr__(self, name):
+        method = getattr(self._model, name)
+        if not callable(method):
+            return method
+
+        def call(*args, **kwargs):
+            start = time.perf_counter()
+            result = method(*args, **kwargs)
+            if inspect.isawaitable(result):
+                async def finish():
+                    response = await result
+                    self._record(name, kwargs.get("data"), response, time.perf_counter() - start)
+                    return response
+                return finish()
+            self._record(name, kwargs.get("data"), result, time.perf_counter() - start)
+            return result
+        return call
+
+    def _record(self, endpoint, request, response, latency):
+        # Quotes and orderbooks, the most frequent calls, are stored once, as
+        # quote rows and an orderbook snapshot, rather than also as responses
+        try:
+            if endpoint == "quotes" and isinstance(response, dict):
+                for quote in response.get("d", []):
+                    values = quote.get("v", {})
+                    self.recorder.record_quote(quote.get("n"), values.get("lp", 0), values.get("volume", 0),
+                                               values.get("fyToken", 0), latency=latency)
+            elif endpoint == "orderbook" and isinstance(response, dict):
+                self.recorder.record_orderbook(response.get("orderBook", []), latency=latency)
+            else:
+                self.recorder.record_response(endpoint, request, response, latency)
+        except Exception as e:
+            logging.error(f"Error recording {endpoint}: {e}")
+
+
+class Recording:
+    """Read-only, memory-mapped view of a Recorder's chunks."""
+
+    def __init__(self, root):
+        self.root = root
+        self.chunks = [self._open(path) for path in self.chunk_dirs(root)]
+
+    @staticmethod
+    def chunk_dirs(root):
+        if not os.path.isdir(root):
+            return []
+        return [
+            os.path.join(root, name) for name in sorted(os.listdir(root))
+            if name.startswith("chunk-") and ".tmp" not in name
+        ]
+
+    @staticmethod
+    def _open(path):
+        chunk = {column: np.load(os.path.join(path, f"{column}.npy"), mmap_mode="r") for column in COLUMNS}
+        chunk["fytoken_index"] = np.load(os.path.join(path, "fytoken_index.npy"), mmap_mode="r")
+        size = os.path.getsize(os.path.join(path, "payloads.bin"))
+        chunk["payloads"] = np.memmap(os.path.join(path, "payloads.bin"), mode="r") if size else b""
+        with open(os.path.join(path, "symbols.json")) as f:
+            chunk["symbols"] = json.load(f)
+        return chunk
+
+    def __len__(self):
+        return sum(len(chunk["time"]) for chunk in self.chunks)
+
+    @staticmethod
+    def _record(chunk, row):
+        start, end = int(chunk["payload_start"][row]), int(chunk["payload_end"][row])
+        symbol = int(chunk["symbol"][row])
+        return {
+            "time": float(chunk["time"][row]),
+            "kind": int(chunk["kind"][row]),
+            "fytoken": int(chunk["fytoken"][row]),
+            "symbol": chunk["symbols"][symbol] if symbol >= 0 else None,
+            "lp": float(chunk["lp"][row]),
+            "volume": int(chunk["volume"][row]),
+            "latency": float(chunk["latency"][row]),
+            "payload": json.loads(bytes(chunk["payloads"][start:end])) if end > start else None
+        }
+
+    def records(self, kinds=None):
+        """Yield every record as a dict, in recording order, optionally only some kinds."""
+        for chunk in self.chunks:
+            rows = np.arange(len(chunk["time"])) if kinds is None else np.flatnonzero(np.isin(chunk["kind"], list(kinds)))
+            for row in rows:
+                yield self._record(chunk, row)
+
+    def for_fytoken(self, fytoken):
+        """Get every record of a Fytoken, in recording order, through the Fytoken index."""
+        found = []
+        for chunk in self.chunks:
+            order = chunk["fytoken_index"]
+            fytokens = chunk["fytoken"][order]
+            start, stop = np.searchsorted(fytokens, [fytoken, fytoken + 1])
+            found.extend(self._record(chunk, row) for row in np.sort(order[start:stop]))
+        return found
+
+    def prices(self, kinds=(QUOTE,)):
+        """Get quote time series per symbol: symbol -> (times, prices) arrays."""
+        series = {}
+        for chunk in self.chunks:
+            rows = np.flatnonzero(np.isin(chunk["kind"], list(kinds)))
+            for symbol_id, symbol in enumerate(chunk["symbols"]):
+                mine = rows[chunk["symbol"][rows] == symbol_id]
+                times, prices = series.setdefault(symbol, ([], []))
+                times.append(np.asarray(chunk["time"][mine]))
+                prices.append(np.asarray(chunk["lp"][mine]))
+        return {symbol: (np.concatenate(times), np.concatenate(prices)) for symbol, (times, prices) in series.items()}
+
+
+class Replayer:
+    """
+    Replay a recording on a clock running ``speed`` times real time.
+
+    ``speed=None`` replays as fast as possible. ``now`` maps wall time onto
+    recording time, for replay models that answer "as of now".
+    """
+
+    def __init__(self, recording, speed=1.0):
+        self.recording = recording
+        self.speed = speed
+        first = next((chunk["time"][0] for chunk in recording.chunks if len(chunk["time"])), 0.0)
+        self.start_time = float(first)
+        self._started_at = None
+
+    def start(self):
+        self._started_at = time.monotonic()
+
+    def now(self):
+        """Current recording time; the end of the recording when replaying unpaced."""
+        if self._started_at is None:
+            self.start()
+        if not self.speed:
+            return float("inf")
+        return self.start_time + (time.monotonic() - self._started_at) * self.speed
+
+    def run(self, on_record, kinds=None):
+        """Call ``on_record`` with every record, paced to the replay clock."""
+        self.start()
+        for record in self.recording.records(kinds):
+            if self.speed:
+                wait = (record["time"] - self.start_time) / self.speed - (time.monotonic() - self._started_at)
+                if wait > 0:
+                    time.sleep(wait)
+            on_record(record)
+
+    def to_transport(self, transport):
+        """Replay quotes as symbolData messages into a LocalTransport."""
+        self.run(
+            lambda record: transport.push({"symbol": record["symbol"], "ltp": record["lp"],
+                                           "vol_traded_today": record["volume"], "timestamp": record["time"]}),
+            kinds=(QUOTE,)
+        )
+
+
+class ReplayFyersModel(FakeFyersModel):
+    """
+    FakeFyersModel answering from a recording.
+
+    quotes returns the last recorded price at the replay clock's time;
+    place_order, cancel_order and funds return the recorded responses in
+    order, after the recorded latency scaled by the replay speed; orderbook
+    returns the last recorded snapshot at the replay clock's time.
+    """
+
+    def __init__(self, recording, speed=1.0, is_async=False):
+        super().__init__(is_async=is_async)
+        self.replayer = Replayer(recording, speed)
+        self._prices = recording.prices()
+        self._responses = {}
+        self._orderbooks = ([], [])
+        for record in recording.records((RESPONSE, ORDERBOOK)):
+            if record["kind"] == ORDERBOOK:
+                self._orderbooks[0].append(record["time"])
+                self._orderbooks[1].append(record["payload"])
+            else:
+                payload = record["payload"]
+                self._responses.setdefault(payload["endpoint"], []).append((record["latency"], payload["response"]))
+        self._cursors = {}
+
+    def _recorded(self, endpoint, fallback):
+        with self._lock:
+            responses = self._responses.get(endpoint, [])
+            cursor = self._cursors.get(endpoint, 0)
+            self._cursors[endpoint] = cursor + 1
+        if cursor >= len(responses):
+            return self._reply(endpoint, fallback)
+        latency, response = responses[cursor]
+        return self._reply(endpoint, lambda: response, latency / self.replayer.speed if self.replayer.speed else 0.0)
+
+    def _price(self, symbol):
+        series = self._prices.get(symbol)
+        if series is None:
+            return 0
+        times, prices = series
+        i = np.searchsorted(times, self.replayer.now(), side="right") - 1
+        return float(prices[max(i, 0)])
+
+    def quotes(self, data):
+        symbols = [symbol for symbol in data["symbols"].split(",") if symbol]
+        return self._reply("quotes", lambda: {
+            "s": "ok",
+            "d": [{"n": symbol, "s": "ok", "v": {"lp": self._price(symbol), "symbol": symbol}} for symbol in symbols]
+        }, 0.0)
+
+    def place_order(self, data):
+        return self._recorded("place_order", lambda: {"s": "error", "code": -50, "message": "Recording exhausted"})
+
+    def cancel_order(self, data):
+        return self._recorded("cancel_order", lambda: {"s": "error", "code": -50, "message": "Recording exhausted"})
+
+    def funds(self):
+        return self._recorded("funds", lambda: {"s": "error", "fund_limit": []})
+
+    def orderbook(self):
+        times, books = self._orderbooks
+        i = int(np.searchsorted(times, self.replayer.now(), side="right")) - 1
+        return self._reply("orderbook", lambda: {"s": "ok", "orderBook": books[i] if i >= 0 else []}, 0.0)
@@ -1,18 +1,51 @@
 import json
 import logging
 import os
+import threading
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 
-import pandas as pd
+from basket import BasketOrder
 from download import FyersInstruments
-from fyers_api import fyersModel  # type: ignore
+from funds import FundsView
+from instrument_index import ExpiryCalendar, InstrumentIndex, InstrumentSnapshot, OptionChain
+from lazy import lazy_import
+from market_data import FyersDataSocketTransport, MarketDataFeed
+from metrics import Metrics
+from order_tracker import TERMINAL_STATUSES, OrderTracker
+from paper import PaperExecutionEngine
+from quote_cache import QuoteCache
+from rate_limit import RequestScheduler
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+fyersModel = lazy_import("fyers_api.fyersModel")
+
+
+class _SnapshotFrame:
+    """Class-level view of the combined DataFrame of the current snapshot."""
+
+    def __get__(self, obj, owner):
+        return owner._current_snapshot().df
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
 class FyersAPI:
-    instruments_df = None
+    instruments_df = _SnapshotFrame()
+    # Current InstrumentSnapshot; replaced as a whole, never mutated
+    snapshot = None
+    _refresh_lock = threading.Lock()
+    # Background instrument loading; see warm
+    _loader = None
+    _loader_lock = threading.Lock()
+    _instruments_ready = threading.Event()
+    # Seconds a lookup waits for instruments that are still loading
+    INSTRUMENTS_TIMEOUT = 300
+    # SharedInstrumentStore to attach to instead of loading the master per process
+    shared_store = None
+    # Seconds between checks for a newer generation in the shared store
+    SHARED_CHECK_INTERVAL = 5
+    _shared_checked_at = 0.0
     # Class constants
     EXCHANGE_CODES = {
         'NSE': 10,
@@ -37,8 +70,47 @@ class FyersAPI:
         "OPTCOM": 32
     }
 
-    def __init__(self, session_token, app_id, app_secret):
-        """Initialize FyersAPI with credentials and load instrument data."""
+    FUTURE_TYPES = ["FUTIDX", "FUTIVX", "FUTSTK", "FUTCUR", "FUTIRT", "FUTIRC", "FUTCOM"]
+
+    # Exchange Instrument types that identify a cash-segment symbol
+    CASH_INSTRUMENT_TYPES = [0, 4, 50]
+
+    # Exchange Instrument type get_ltp picks for a Scrip code on each exchange
+    LTP_INSTRUMENT_TYPES = {
+        "NSE": 0,
+        "NFO": 14,
+        "BFO": 14,
+        "MCX": 11
+    }
+
+    # Symbols the quotes endpoint accepts per request
+    QUOTES_BATCH_SIZE = 50
+    # Quotes requests get_ltp_many keeps in flight at once
+    QUOTES_CONCURRENCY = 4
+    # LTPs shared by every FyersAPI in the process; None disables caching
+    quote_cache = QuoteCache(ttl=1.0, maxsize=4096)
+    # Rate limiter every broker call waits on, budgeted per session token; None sends calls unthrottled
+    scheduler = RequestScheduler.shared()
+    # Stage timings and counters; see Metrics.snapshot / prometheus_text
+    metrics = Metrics.shared()
+    # Simulated fills for is_paper orders; None mints an id and quotes the LTP
+    paper_engine = PaperExecutionEngine()
+    # Streaming MarketDataFeed get_ltp reads subscribed symbols from; None quotes every LTP
+    market_data = None
+    # Cached funds per account for the pre-trade margin check; None sends every order unchecked
+    funds_view = FundsView(ttl=5.0)
+
+    def __init__(self, session_token, app_id, app_secret, order_source=None):
+        """
+        Initialize FyersAPI with credentials and start loading instrument data.
+
+        Instruments load in the background, once per process; the first lookup
+        waits for them. Call warm() to load them before serving traffic.
+
+        Args:
+            order_source (OrderUpdateSource): Push feed of order updates; without
+                one, order status is polled from the orderbook
+        """
         
         self.session_token = session_token
         self.app_id = app_id
@@ -49,21 +121,154 @@ class FyersAPI:
             client_id=self.app_id,
             log_path=""
         )
-        self._load_instruments()
-
-    def _load_instruments(self):
-        """Load instruments data using FyersInstruments class."""
+        self.order_tracker = OrderTracker(self._fetch_orderbook, source=order_source)
+        self.warm(wait=False)
+
+    def _call(self, endpoint, **kwargs):
+        """Call a FyersModel endpoint once the request scheduler allows it."""
+        if self.scheduler is not None:
+            with self.metrics.timer('rate_limit_wait', endpoint=endpoint):
+                self.scheduler.acquire(endpoint, account=self.session_token)
         try:
-            FyersAPI.instruments_df = FyersInstruments.get_instruments()
-
+            with self.metrics.timer('broker_round_trip', endpoint=endpoint):
+                return getattr(self.obj, endpoint)(**kwargs)
+        except Exception:
+            self.metrics.increment('broker_errors', endpoint=endpoint)
+            raise
 
-            if self.instruments_df is None:
+    @classmethod
+    def warm(cls, wait=True):
+        """
+        Load instruments data in the background unless it is loaded or loading.
+
+        Args:
+            wait (bool): Block until the instruments are loaded
+
+        Raises:
+            Exception: If waiting and loading failed or timed out
+        """
+        with FyersAPI._loader_lock:
+            if FyersAPI.snapshot is None and (FyersAPI._loader is None or not FyersAPI._loader.is_alive()):
+                FyersAPI._instruments_ready.clear()
+                FyersAPI._loader = threading.Thread(
+                    target=FyersAPI._load_in_background, name="instrument-loader", daemon=True
+                )
+                FyersAPI._loader.start()
+        if wait and FyersAPI.snapshot is None:
+            FyersAPI._instruments_ready.wait(cls.INSTRUMENTS_TIMEOUT)
+            if FyersAPI.snapshot is None:
                 raise Exception("Failed to load instruments data")
+
+    @classmethod
+    def _load_in_background(cls):
+        try:
+            with FyersAPI._refresh_lock:
+                if FyersAPI.snapshot is None:
+                    FyersAPI._load_instruments()
+        except Exception:
+            pass  # Logged by _load_instruments; the next lookup retries
+        finally:
+            FyersAPI._instruments_ready.set()
+
+    @classmethod
+    def _load_instruments(cls):
+        """Load instruments data using FyersInstruments class."""
+        start = time.perf_counter()
+        try:
+            store = FyersAPI.shared_store
+            if store is not None:
+                # First process on the host loads and publishes for the rest,
+                # which wait for it and attach
+                store.publish_initial(FyersInstruments.load_segments)
+                FyersAPI._attach_shared_instruments()
+            else:
+                segments = FyersInstruments.load_segments()
+                FyersAPI.snapshot = InstrumentSnapshot(
+                    {segment: InstrumentIndex(df) for segment, df in segments.items()}
+                )
+            cls.metrics.observe('snapshot_load', time.perf_counter() - start)
             logging.info("Successfully loaded instruments data")
         except Exception as e:
             logging.error(f"Error loading instruments data: {e}")
             raise Exception("Failed to load instruments data")
 
+    @classmethod
+    def refresh_instruments(cls, file_path="fyers_instruments.csv"):
+        """
+        Pick up changed symbol master segments without a restart.
+
+        Only changed segments are re-read and re-indexed; the new snapshot is
+        swapped in as a whole, so lookups already running finish on the old one.
+
+        Args:
+            file_path (str): Path to the instruments CSV file
+
+        Returns:
+            list: Names of the segments that were refreshed
+        """
+        with cls._refresh_lock:
+            try:
+                changed = FyersInstruments.refresh_segments(file_path)
+                if not changed:
+                    logging.info("Instruments data is up to date")
+                    return []
+
+                if FyersAPI.shared_store is not None:
+                    FyersAPI.shared_store.publish(changed)
+                    FyersAPI._attach_shared_instruments()
+                    return list(changed)
+
+                current = FyersAPI.snapshot
+                indexes = dict(current.indexes) if current is not None else {}
+                for segment, df in changed.items():
+                    previous = indexes.get(segment)
+                    if previous is not None:
+                        old_tokens = previous.df["Fytoken"].astype(str).to_numpy()
+                        new_tokens = df["Fytoken"].astype(str).to_numpy()
+                        added = len(np.setdiff1d(new_tokens, old_tokens))
+                        removed = len(np.setdiff1d(old_tokens, new_tokens))
+                        logging.info(f"{segment}: {added} instruments added, {removed} removed")
+                    indexes[segment] = InstrumentIndex(df)
+
+                # Keep segments in symbol master order
+                order = [FyersInstruments.segment_name(url) for url in FyersInstruments.URLS]
+                ordered = {segment: indexes[segment] for segment in order if segment in indexes}
+                ordered.update(indexes)
+                generation = current.generation + 1 if current is not None else 0
+                FyersAPI.snapshot = InstrumentSnapshot(ordered, generation)
+                logging.info(f"Swapped in instruments snapshot {generation} ({', '.join(changed)} refreshed)")
+                return list(changed)
+
+            except Exception as e:
+                logging.error(f"Error refreshing instruments data: {e}")
+                return []
+
+    @staticmethod
+    def _attach_shared_instruments():
+        """Swap in the current generation of the shared store, with its mapped indexes."""
+        generation, indexes = FyersAPI.shared_store.attach_indexes()
+        if not indexes:
+            raise Exception("No instruments published to the shared store")
+        FyersAPI.snapshot = InstrumentSnapshot(indexes, generation)
+        logging.info(f"Attached shared instruments generation {generation}")
+
+    @classmethod
+    def _current_snapshot(cls):
+        """Get the snapshot to serve a lookup from, following shared store refreshes."""
+        if FyersAPI.snapshot is None:
+            cls.warm()
+        store = FyersAPI.shared_store
+        if store is not None and time.monotonic() - FyersAPI._shared_checked_at >= cls.SHARED_CHECK_INTERVAL:
+            FyersAPI._shared_checked_at = time.monotonic()
+            if store.current_generation() != FyersAPI.snapshot.generation and FyersAPI._refresh_lock.acquire(blocking=False):
+                try:
+                    FyersAPI._attach_shared_instruments()
+                except Exception as e:
+                    logging.error(f"Error attaching shared instruments: {e}")
+                finally:
+                    FyersAPI._refresh_lock.release()
+        return FyersAPI.snapshot
+
     def get_broker_obj(self):
         """Return the Fyers model object."""
         return self.obj
@@ -72,7 +277,11 @@ class FyersAPI:
         """Fetch available funds from the account."""
         try:
             # print(self.obj.funds())
-            funds = self.obj.funds().get('fund_limit', [{}])[0]
+            if self.funds_view is not None:
+                response = self.funds_view.refresh(self.session_token, lambda: self._call('funds'))
+            else:
+                response = self._call('funds')
+            funds = response.get('fund_limit', [{}])[0]
             # print(funds)
             return funds.get('equityAmount', 0)
 
@@ -82,47 +291,176 @@ class FyersAPI:
             logging.error(f"Error in fetching funds: {e}")
             return 0
 
+    def _margin_required(self, order_params, ltp=None):
+        """
+        Estimate the margin of an order from its limit price, or else ``ltp``.
+
+        Returns:
+            float: Estimated margin, or 0 if the order is not checked
+        """
+        if self.funds_view is None:
+            return 0.0
+        price = order_params.get('limitPrice') if order_params.get('type') == 1 else None
+        required = self.funds_view.estimate_margin(
+            order_params['symbol'], order_params['qty'], price or ltp,
+            order_params.get('side'), order_params.get('productType')
+        )
+        if not required and order_params.get('side') == 1 and not (price or ltp):
+            self.metrics.increment('margin_checks_skipped')
+        return required
+
+    def _needs_margin_ltp(self, order_params):
+        """Check whether an order's margin estimate needs the LTP (a buy without a limit price)."""
+        return (self.funds_view is not None and order_params.get('side') == 1
+                and not (order_params.get('type') == 1 and order_params.get('limitPrice')))
+
+    def _known_ltp(self, symbol):
+        """Get an LTP already streamed or cached for a Symbol ticker, or None; never calls the broker."""
+        ltp = self._streamed_ltp(symbol)
+        if ltp is None and self.quote_cache is not None:
+            ltp = self.quote_cache.peek(symbol)
+        return ltp
+
+    def _margin_rejection(self, required, available):
+        """Count a local margin rejection and build its message."""
+        self.metrics.increment('margin_rejections')
+        return (
+            "Order placement failed due to insufficient funds: "
+            f"needs about {required:.2f}, {available:.2f} available."
+        )
+
     def get_details_from_csv(self, token):
         """Get instrument details from loaded CSV data."""
-        token = str(token)
-        df = self.instruments_df.copy()
-        df['Scrip code'] = df['Scrip code'].astype(str)
-        return df[df['Scrip code'] == token]
+        return self._current_snapshot().rows(token)
 
     def get_ltp(self, exchange_code, symbol_token):
         """Get Last Traded Price for a given token."""
         try:
-            row = self.get_details_from_csv(symbol_token)
-            if row.empty:
+            snapshot = self._current_snapshot()
+            if not snapshot.contains(symbol_token):
                 logging.error(f"No data found for token {symbol_token}")
                 return 0
 
-            # Filter by exchange and instrument type
-            if exchange_code == "NSE":
-                row = row[row['Exchange Instrument type'] == 0]
-            elif exchange_code in ["NFO", "BFO"]:
-                row = row[row['Exchange Instrument type'] == 14]
-                print(row)
-            elif exchange_code == "MCX":
-                row = row[row['Exchange Instrument type'] == 11]
-
-            if row.empty:
-                logging.error(f"No matching instrument found for {exchange_code}:{token}")
+            # Pick the row by exchange and instrument type
+            instrument_type = self.LTP_INSTRUMENT_TYPES.get(exchange_code)
+            symbol = snapshot.symbol_ticker(symbol_token, instrument_type)
+            if symbol is None:
+                logging.error(f"No matching instrument found for {exchange_code}:{symbol_token}")
                 return 0
 
-            symbol = row['Symbol ticker'].values[0]
-            data = {"symbols": symbol, "ohlcv_flag": 1}
-            
-            response = self.obj.quotes(data=data)
-            return response.get('d', [{}])[0].get('v', {}).get('lp', 0)
+            ltp = self._streamed_ltp(symbol)
+            if ltp is not None:
+                return ltp
+            if self.quote_cache is None:
+                return self._fetch_ltp(symbol)
+            return self.quote_cache.get_or_fetch(symbol, lambda: self._fetch_ltp(symbol))
         except Exception as e:
             logging.error(f"Error in fetching LTP: {e}")
             return 0
 
+    def _streamed_ltp(self, symbol):
+        """Get a fresh LTP from the market data feed, or None if the symbol is not streamed."""
+        return self.market_data.ltp(symbol) if self.market_data is not None else None
+
+    def subscribe_market_data(self, pairs):
+        """
+        Stream LTPs of tokens into market_data, starting a default feed if none is set.
+
+        Args:
+            pairs (list): (exchange_code, symbol_token) tuples
+
+        Returns:
+            list: Symbol tickers subscribed
+        """
+        if FyersAPI.market_data is None:
+            FyersAPI.market_data = MarketDataFeed(FyersDataSocketTransport(self.app_id, self.session_token))
+        snapshot = self._current_snapshot()
+        symbols, fytokens = [], []
+        for exchange_code, symbol_token in pairs:
+            instrument_type = self.LTP_INSTRUMENT_TYPES.get(exchange_code)
+            symbol = snapshot.symbol_ticker(symbol_token, instrument_type)
+            if symbol is None:
+                logging.error(f"No matching instrument found for {exchange_code}:{symbol_token}")
+                continue
+            symbols.append(symbol)
+            fytokens.append(snapshot.value(symbol_token, 'Fytoken', instrument_type))
+        if self.paper_engine is not None and self.paper_engine.on_price not in self.market_data.listeners:
+            # Resting paper orders fill as ticks arrive
+            self.market_data.listeners.append(self.paper_engine.on_price)
+        self.market_data.subscribe(symbols, fytokens)
+        self.market_data.start()
+        return symbols
+
+    def _fetch_ltp(self, symbol):
+        """Fetch the LTP of a Symbol ticker from the quotes endpoint."""
+        data = {"symbols": symbol, "ohlcv_flag": 1}
+        response = self._call('quotes', data=data)
+        return response.get('d', [{}])[0].get('v', {}).get('lp', 0)
+
+    def get_ltp_many(self, pairs):
+        """
+        Get Last Traded Prices for many tokens with batched quotes calls.
+
+        Tokens are resolved through the instrument index, de-duplicated by
+        symbol, served from market_data or quote_cache where fresh, and the rest are split
+        into QUOTES_BATCH_SIZE chunks that are quoted concurrently.
+
+        Args:
+            pairs (list): (exchange_code, symbol_token) tuples
+
+        Returns:
+            dict: symbol_token -> lp; tokens that cannot be resolved or quoted map to 0
+        """
+        snapshot = self._current_snapshot()
+        ltps = {}
+        tokens_by_symbol = {}
+        for exchange_code, symbol_token in pairs:
+            ltps[symbol_token] = 0
+            symbol = snapshot.symbol_ticker(symbol_token, self.LTP_INSTRUMENT_TYPES.get(exchange_code))
+            if symbol is None:
+                logging.error(f"No matching instrument found for {exchange_code}:{symbol_token}")
+                continue
+            tokens_by_symbol.setdefault(symbol, []).append(symbol_token)
+
+        symbols = []
+        for symbol, symbol_tokens in tokens_by_symbol.items():
+            ltp = self._streamed_ltp(symbol)
+            if ltp is None and self.quote_cache is not None:
+                ltp = self.quote_cache.get(symbol)
+            if ltp is None:
+                symbols.append(symbol)
+                continue
+            for symbol_token in symbol_tokens:
+                ltps[symbol_token] = ltp
+        chunks = [symbols[i:i + self.QUOTES_BATCH_SIZE] for i in range(0, len(symbols), self.QUOTES_BATCH_SIZE)]
+        if not chunks:
+            return ltps
+
+        def fetch(chunk):
+            response = self._call('quotes', data={"symbols": ",".join(chunk), "ohlcv_flag": 1})
+            return response.get('d', [])
+
+        with ThreadPoolExecutor(max_workers=min(self.QUOTES_CONCURRENCY, len(chunks))) as pool:
+            futures = [pool.submit(fetch, chunk) for chunk in chunks]
+            for future in futures:
+                try:
+                    quotes = future.result()
+                except Exception as e:
+                    logging.error(f"Error in fetching LTP batch: {e}")
+                    continue
+                for quote in quotes:
+                    ltp = quote.get('v', {}).get('lp', 0)
+                    if self.quote_cache is not None:
+                        self.quote_cache.put(quote.get('n'), ltp)
+                    for symbol_token in tokens_by_symbol.get(quote.get('n'), []):
+                        ltps[symbol_token] = ltp
+        return ltps
+
     def cancel_order_on_broker(self, order_id):
         try:
             # Cancel the order with the provided order_id using Fyers cancel_order() method
-            cancel_order_response = self.obj.cancel_order(data={"id":order_id})
+            cancel_order_response = self._call('cancel_order', data={"id":order_id})
+            self.metrics.increment('order_cancels')
 
             # Print and return the cancel order response
             return cancel_order_response
@@ -131,28 +469,31 @@ class FyersAPI:
             return None
     @classmethod
     def filter_by_expiry(cls, df, expiry='W'):
-        # Convert Unix timestamp to datetime
-        df = df.copy()
-        df['Expiry date'] = pd.to_datetime(df['Expiry date'], unit='s')
-
-        # Find the last expiry date in each month
-        monthly_expiry_df = df.loc[df.groupby(df['Expiry date'].dt.to_period('M'))['Expiry date'].idxmax()]
-
-        if expiry == 'W':
-            # Weekly expiry, return the first record
-            return df.iloc[0]
-        elif expiry == 'NW':
-            # Next weekly expiry, return the second record
-            return df.iloc[1]
-        elif expiry == 'M':
-            # Monthly expiry, return the first record in monthly_expiry_df
-            return monthly_expiry_df.iloc[0]
-        elif expiry == 'NM':
-            # Next monthly expiry, return the second record in monthly_expiry_df
-            return monthly_expiry_df.iloc[1]
-        elif expiry == 'NNM':
-            # Next-next monthly expiry, return the third record in monthly_expiry_df
-            return monthly_expiry_df.iloc[2]
+        """Pick the row of a W/NW/M/NM/NNM expiry from a frame of contracts."""
+        expiry_dates = pd.to_numeric(df['Expiry date'], errors='coerce').fillna(0).to_numpy('int64')
+        expiry_date = ExpiryCalendar(expiry_dates).resolve(expiry)
+        if expiry_date is None:
+            return None
+        return df.iloc[(expiry_dates == expiry_date).argmax()]
+
+    @classmethod
+    def expiries_for(cls, underlying, segment, instrumenttype='OPTIDX'):
+        """
+        Get the expiry calendar of an underlying.
+
+        Args:
+            underlying (str): Underlying symbol, e.g. NIFTY
+            segment (str): Exchange segment, e.g. NFO, BFO, MCX
+            instrumenttype (str): Instrument type, e.g. OPTIDX, FUTIDX
+
+        Returns:
+            ExpiryCalendar: Expiry calendar, or None if the underlying is unknown
+        """
+        segment_type = cls.SEGMENT_TYPES.get(instrumenttype.upper(), None)
+        chain = cls._current_snapshot().chain(
+            cls.EXCHANGE_CODES.get(segment, 12), underlying.upper(), segment_type
+        )
+        return chain.calendar if chain is not None else None
 
     @classmethod
     def filter_fno_instruments(cls, df, exch_seg, symbol, strike_price, ce_pe, instrumenttype):
@@ -166,85 +507,224 @@ class FyersAPI:
                          (df['Underlying symbol'] == symbol) &
                          (df['Exchange Instrument type'] == segment_type)]
 
-        if instrumenttype.upper() in ["FUTIDX", "FUTIVX", "FUTSTK", "FUTCUR", "FUTIRT", "FUTIRC", "FUTCOM"]:
+        if instrumenttype.upper() in cls.FUTURE_TYPES:
             return df_filtered
-        return df_filtered[(df_filtered['Strike price'] == strike_price) & (df_filtered['Option type'] == ce_pe)]
+        strike_matches = (df_filtered['Strike price'] - strike_price).abs() <= OptionChain.STRIKE_TOLERANCE
+        return df_filtered[strike_matches & (df_filtered['Option type'] == ce_pe)]
 
     @classmethod
     def get_fyers_token_details(cls, exch_seg, symbol, strike_price=None, is_pe=1, expiry='W', instrumenttype=None):
         ce_pe = "PE" if is_pe == 1 else "CE"
         symbol = symbol.upper()
         
-        df = cls.instruments_df.copy()
-        try:
+        with cls.metrics.timer('symbol_resolution'):
+            snapshot = cls._current_snapshot()
+            try:
+                exch_seg_code = cls.EXCHANGE_CODES.get(exch_seg, 12)
+                if exch_seg in ['NFO', 'MCX', 'BFO']:
+                    segment_type = cls.SEGMENT_TYPES.get(instrumenttype.upper(), None)
+                    chain = snapshot.chain(exch_seg_code, symbol, segment_type)
+                    position = None
+                    if chain is not None:
+                        expiry_date = chain.calendar.resolve(expiry)
+                        if instrumenttype.upper() in cls.FUTURE_TYPES:
+                            position = chain.first(expiry_date)
+                        else:
+                            position = chain.find(expiry_date, strike_price, ce_pe)
+                    if position is None:
+                        print(f"No token found for {symbol} {strike_price}{ce_pe} in {exch_seg}")
+                        return None, None
+                    token_info = chain.row(position)
+                else:
+                    token_info = snapshot.first_row(exch_seg_code, symbol, cls.CASH_INSTRUMENT_TYPES)
+                    if token_info is None:
+                        print(f"No token found for {symbol} in {exch_seg}")
+                        return None, None
+
+                if token_info is not None:
+                    return token_info['Scrip code'], token_info['Symbol ticker'],  token_info['Minimum lot size']
+                return None, None, "No token found"
+            except Exception as e:
+                print(f'Error caught in getting Fyers token info: {e}')
+                return None, None, "Error in getting Fyers token info"
+
+    @classmethod
+    def resolve_many(cls, requests):
+        """
+        Resolve many instruments at once; the bulk form of get_fyers_token_details.
+
+        Requests sharing an underlying, instrument type, expiry and option type
+        are resolved together with one binary search over the chain's strikes.
+
+        Args:
+            requests (pd.DataFrame | list): Rows with the get_fyers_token_details
+                arguments as columns: exch_seg, symbol and, for F&O, strike_price,
+                is_pe (default 1), expiry (default 'W') and instrumenttype
+
+        Returns:
+            pd.DataFrame: Scrip code, Symbol ticker and Minimum lot size per
+                request, on the requests' index; None where nothing was found
+        """
+        requests = pd.DataFrame(requests)
+        defaults = {"strike_price": np.nan, "is_pe": 1, "expiry": "W", "instrumenttype": ""}
+        requests = requests.assign(**{
+            column: requests[column].fillna(value) if column in requests else value
+            for column, value in defaults.items()
+        })
+        columns = ['Scrip code', 'Symbol ticker', 'Minimum lot size']
+        resolved = {column: np.full(len(requests), None, dtype=object) for column in columns}
+
+        start = time.perf_counter()
+        snapshot = cls._current_snapshot()
+        groups = requests.groupby(
+            [requests["exch_seg"], requests["symbol"].str.upper(), requests["instrumenttype"].str.upper(),
+             requests["expiry"], requests["is_pe"]],
+            sort=False
+        ).indices
+        strike_prices = requests["strike_price"].to_numpy(np.float64)
+        for (exch_seg, symbol, instrumenttype, expiry, is_pe), rows in groups.items():
+            exch_seg_code = cls.EXCHANGE_CODES.get(exch_seg, 12)
             if exch_seg in ['NFO', 'MCX', 'BFO']:
-                df_filtered = cls.filter_fno_instruments(
-                    df, exch_seg, symbol, strike_price, ce_pe, instrumenttype
-                )
-                if df_filtered.empty:
-                    print(f"No token found for {symbol} {strike_price}{ce_pe} in {exch_seg}")
-                    return None, None
-                token_info = cls.filter_by_expiry(df_filtered, expiry)
+                chain = snapshot.chain(exch_seg_code, symbol, cls.SEGMENT_TYPES.get(instrumenttype))
+                if chain is None:
+                    continue
+                expiry_date = chain.calendar.resolve(expiry)
+                if instrumenttype in cls.FUTURE_TYPES:
+                    position = chain.first(expiry_date)
+                    positions = np.full(len(rows), -1 if position is None else position)
+                else:
+                    positions = chain.find_many(expiry_date, strike_prices[rows], "PE" if is_pe == 1 else "CE")
+                df = chain.index.df
             else:
-                exch_seg_code = cls.EXCHANGE_CODES.get(exch_seg, 12)
-                df_filtered = df[
-                    (df['Exchange'] == exch_seg_code) &
-                    (df['Underlying symbol'] == symbol) &
-                    (df['Exchange Instrument type'].isin([0, 4, 50]))
-                ]
-                if df_filtered.empty:
-                    print(f"No token found for {symbol} in {exch_seg}")
-                    return None, None
-                token_info = df_filtered.iloc[0]
-
-            if token_info is not None:
-                return token_info['Scrip code'], token_info['Symbol ticker'],  token_info['Minimum lot size']
-            return None, None, "No token found"
-        except Exception as e:
-            print(f'Error caught in getting Fyers token info: {e}')
-            return None, None, "Error in getting Fyers token info"
+                token_info = snapshot.first_row(exch_seg_code, symbol, cls.CASH_INSTRUMENT_TYPES)
+                if token_info is None:
+                    continue
+                for column in columns:
+                    resolved[column][rows] = token_info[column]
+                continue
+
+            found = positions >= 0
+            for column in columns:
+                resolved[column][rows[found]] = df[column].iloc[positions[found]].to_numpy()
+
+        cls.metrics.observe('bulk_resolution', time.perf_counter() - start)
+        return pd.DataFrame(resolved, index=requests.index, dtype=object)
+
+    # Columns get_option_chain returns besides Option type and Strike price
+    CHAIN_COLUMNS = ['Scrip code', 'Symbol ticker', 'Minimum lot size']
 
+    @classmethod
+    def get_option_chain(cls, underlying, expiry='W', exch_seg='NFO', instrumenttype='OPTIDX'):
+        """
+        Get every contract of one expiry of an underlying as aligned arrays.
+
+        Args:
+            underlying (str): Underlying symbol, e.g. NIFTY
+            expiry: Expiry code (W/NW/M/NM/NNM) or Unix timestamp
+            exch_seg (str): Exchange segment, e.g. NFO, BFO, MCX
+            instrumenttype (str): Instrument type, e.g. OPTIDX, OPTSTK
+
+        Returns:
+            dict: Column name -> np.ndarray ("Option type", "Strike price" and
+                CHAIN_COLUMNS), sorted by option type then strike; empty if unknown
+        """
+        chain = cls._current_snapshot().chain(
+            cls.EXCHANGE_CODES.get(exch_seg, 12), underlying.upper(), cls.SEGMENT_TYPES.get(instrumenttype.upper())
+        )
+        if chain is None:
+            return {}
+        expiry_date = chain.calendar.resolve(expiry) if expiry in ExpiryCalendar.CODES else expiry
+        if expiry_date is None:
+            return {}
+        return chain.arrays(expiry_date, cls.CHAIN_COLUMNS)
+
+    @classmethod
+    def get_atm_strikes(cls, underlying, spot, n=0, expiry='W', exch_seg='NFO', instrumenttype='OPTIDX'):
+        """
+        Get the at-the-money strike of an expiry and the n strikes either side.
+
+        Args:
+            underlying (str): Underlying symbol, e.g. NIFTY
+            spot (float): Price of the underlying, e.g. from get_ltp
+            n (int): Strikes to include below and above the ATM strike
+            expiry: Expiry code (W/NW/M/NM/NNM) or Unix timestamp
+            exch_seg (str): Exchange segment, e.g. NFO, BFO, MCX
+            instrumenttype (str): Instrument type, e.g. OPTIDX, OPTSTK
+
+        Returns:
+            tuple: (ATM strike, np.ndarray of sorted strikes); (None, empty array)
+                if the underlying or expiry is unknown
+        """
+        chain = cls._current_snapshot().chain(
+            cls.EXCHANGE_CODES.get(exch_seg, 12), underlying.upper(), cls.SEGMENT_TYPES.get(instrumenttype.upper())
+        )
+        if chain is None:
+            return None, np.empty(0)
+        expiry_date = chain.calendar.resolve(expiry) if expiry in ExpiryCalendar.CODES else expiry
+        return chain.nearest_strikes(expiry_date, spot, n)
+
+        
+
+    @classmethod
+    def _order_params(cls, symbol, qty, exchange_code, order_type, price, is_overnight=False, buy_sell='BUY'):
+        """Build the place_order payload for an order."""
+        orderType = 1 if order_type == 'LIMIT' else 2
+        product = 'INTRADAY'  # Intraday default
         
+        if exchange_code in ['NFO', 'CDS', 'MCX', 'BFO', 'BCD'] and is_overnight:
+            product = 'MARGIN'  # Margin for derivatives
+        elif is_overnight:
+            product = 'CASH'  # Carryforward for cash
+        return {
+                    'symbol': symbol, 
+                    'qty': qty,
+                    'type': orderType,
+                    'side': -1 if buy_sell == 'SELL' else 1,
+                    'productType': product,
+                     'limitPrice': price, 
+                    'validity': 'DAY', 
+                    'offlineOrder': False,
+                    'disclosedQty': 0, 
+                    'stopPrice':0,
+                      'orderTag': 'tag1'}
 
     def place_order_on_broker(self, symbol_token, symbol, qty, exchange_code, buy_sell, order_type, price, is_paper=False, is_overnight=False):
         try:
-            orderType = 1 if order_type == 'LIMIT' else 2
-            product = 'INTRADAY'  # Intraday default
-            
-            if exchange_code in ['NFO', 'CDS', 'MCX', 'BFO', 'BCD'] and is_overnight:
-                product = 'MARGIN'  # Margin for derivatives
-            elif is_overnight:
-                product = 'CASH'  # Carryforward for cash
-            order_params = {
-                        'symbol': symbol, 
-                        'qty': qty,
-                        'type': orderType,
-                        'side': 1,
-                        'productType': product,
-                         'limitPrice': price, 
-                        'validity': 'DAY', 
-                        'offlineOrder': False,
-                        'disclosedQty': 0, 
-                        'stopPrice':0,
-                          'orderTag': 'tag1'}
+            order_params = self._order_params(symbol, qty, exchange_code, order_type, price, is_overnight, buy_sell)
 
             average_price = 0
             order_id = None
             if not is_paper:
+                # Reject locally if cached funds cannot cover the order; market
+                # orders are priced from the stream or quote cache only, and
+                # go unchecked when neither has the symbol
+                ltp = self._known_ltp(symbol) if self._needs_margin_ltp(order_params) else None
+                required = self._margin_required(order_params, ltp)
+                if required:
+                    ok, available = self.funds_view.check(self.session_token, required, lambda: self._call('funds'))
+                    if not ok:
+                        return None, None, self._margin_rejection(required, available)
+
                 # Place the order using the Fyers API
-                response = self.obj.place_order(data=order_params)
+                response = self._call('place_order', data=order_params)
                 print(response)
                 if not response or response.get('Success') == 'None':
                     error = response.get('emsg', 'Order placement failed')
                     print(f"Order placement failed: {error}")
+                    self.metrics.increment('order_failures')
                     return None, None, f"Order placement failed: {response.get('emsg', 'Unknown error')}"
                 order_id = response.get('id')
                 if not order_id:
                     return None, None, "Order placement failed - No order ID returned."
                 else:
                      print(f"Order placed successfully with Order ID: {order_id}")
+                     self.metrics.increment('orders_placed')
+                     if required:
+                         self.funds_view.reserve(self.session_token, required)
                 
                 average_price, status, error_message = self.handle_order_status(order_id)
+                if self.funds_view is not None:
+                    self.funds_view.invalidate(self.session_token)
                 if not average_price:
                     return None, None, "Order placement failed - No order ID returned."
                     
@@ -252,13 +732,18 @@ class FyersAPI:
               
                 
                 
-            else:
+            elif self.paper_engine is None:
                 order_id = 'Paper' + str(uuid.uuid4())
                 print(f"Paper trade created with ID: {order_id}")
+            else:
+                order_id, average_price, error = self._place_paper_order(exchange_code, symbol_token, symbol, order_params)
+                if error:
+                    return None, None, f"Order placement failed: {error}"
 
             # Get the last traded price if needed
             if 'average_price' not in locals() or average_price == 0:
-                ltp = self.get_ltp(exchange_code, symbol_token)
+                with self.metrics.timer('ltp_fallback'):
+                    ltp = self.get_ltp(exchange_code, symbol_token)
                 average_price = ltp
 
             order_params['ltp'] = average_price
@@ -274,18 +759,78 @@ class FyersAPI:
                 return None, None, "Order placement failed due to insufficient funds."
             print(f"Order placement failed: {e}")
             return None, None, str(e)
+    def _place_paper_order(self, exchange_code, symbol_token, symbol, order_params):
+        """
+        Execute an order on the paper engine.
+
+        The engine is first given the current price (see _paper_price) so
+        fills follow the market; the quotes endpoint is only called for a
+        symbol that is neither streamed, cached nor known to the engine.
+
+        Returns:
+            tuple: (order_id, fill or reference price, error message or None)
+        """
+        ltp = self._paper_price(symbol)
+        if ltp is None:
+            ltp = self.get_ltp(exchange_code, symbol_token)
+        return self._submit_paper_order(symbol, order_params, ltp)
+
+    def _paper_price(self, symbol):
+        """Get a price for a paper order from the stream, quote cache or paper engine, or None."""
+        ltp = self._known_ltp(symbol)
+        return ltp if ltp is not None else self.paper_engine.price(symbol)
+
+    def _submit_paper_order(self, symbol, order_params, ltp):
+        """Feed ``ltp`` to the paper engine and submit an order; see _place_paper_order."""
+        engine = self.paper_engine
+        engine.on_price(symbol, ltp)
+        response = engine.place_order(self.session_token, order_params)
+        if response.get('s') != 'ok':
+            return None, 0, response.get('message', 'Unknown error')
+        order = engine.order(response['id'])
+        print(f"Paper trade created with ID: {order['id']}")
+        if order['status'] == 2:
+            return order['id'], order['tradedPrice'], None
+        # Resting limit order, or a market order still inside the simulated latency
+        return order['id'], engine.price(symbol) or 0, None
+
+    def _fetch_orderbook(self):
+        """Fetch every order of the account from the orderbook."""
+        response = self._call('orderbook')
+        if not response or 'orderBook' not in response:
+            return []
+        return response.get('orderBook', [])
+
+    def place_basket(self, legs, is_paper=False, is_overnight=False, timeout=1.5, rollback=True):
+        """
+        Place several legs as one basket.
+
+        Args:
+            legs (list): Leg dicts, see BasketOrder
+            is_paper (bool): Place every leg on paper_engine instead of the broker
+            is_overnight (bool): Use the carry-forward product
+            timeout (float): Seconds to wait for fills
+            rollback (bool): Cancel still-open legs if the basket did not fully fill
+
+        Returns:
+            list: One result dict per leg (order_id, status, average_price, message, ...)
+        """
+        return BasketOrder(self, legs, is_paper, is_overnight).execute(timeout, rollback)
+
     def fetch_order_status(self, order_id, retries=3, delay=0.5):
+        """
+        Wait for an order to reach a final status.
+
+        Returns as soon as the order tracker sees the order traded, rejected,
+        cancelled or expired; otherwise, after ``retries * delay`` seconds, the
+        latest orderbook entry seen for it (or None).
+        """
         try:
-            for _ in range(retries):
-                time.sleep(delay)
-                response = self.obj.orderbook(data={"id": order_id})
-                if not response or 'orderBook' not in response:
-                    continue
-                orders = response.get('orderBook', [])
-                for order in orders:
-                    if order.get('id') == order_id:
-                        return order
-            return None
+            with self.metrics.timer('status_polling'):
+                order = self.order_tracker.wait(order_id, timeout=retries * delay)
+            if not order or order.get('status') not in TERMINAL_STATUSES:
+                self.metrics.increment('status_timeouts')
+            return order
         except Exception as e:
             logging.error(f"Error fetching order status: {e}")
             return None
@@ -313,6 +858,7 @@ class FyersAPI:
         try:
             rejection_reason = order.get('message', 'Unknown reason')
             print(f"Order rejected: {rejection_reason}")
+            self.metrics.increment('order_rejections')
             error_message = (
                 "Order placement failed due to insufficient funds."
                 if "insufficient" in rejection_reason.lower()
@@ -323,6 +869,8 @@ class FyersAPI:
             logging.error(f"Error handling rejection: {e}")
             return None, None, "Error handling order rejection"
 if __name__ == "__main__":
+    # Configure logging
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
     # Configuration
     creds = {
         "app_id": "8UJ43NICTL-102",
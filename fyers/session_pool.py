@@ -0,0 +1,200 @@
+# session_pool.py
+
+import base64
+import json
+import logging
+import threading
+import time
+
+from script import FyersAPI
+
+
+def token_expiry(access_token):
+    """
+    Get the expiry of a Fyers access token.
+
+    Args:
+        access_token (str): JWT access token
+
+    Returns:
+        float: Expiry as a Unix timestamp, or None if the token carries none
+    """
+    try:
+        payload = access_token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except Exception:
+        return None
+
+
+class _Session:
+    def __init__(self, api, access_token):
+        self.api = api
+        self.access_token = access_token
+        self.expires_at = token_expiry(access_token)
+        self.used_at = time.monotonic()
+
+    def expired(self, now):
+        return self.expires_at is not None and self.expires_at <= now
+
+
+class FyersSessionPool:
+    """
+    Long-lived FyersAPI sessions keyed by Fyers client id.
+
+    Each account keeps one client for as long as its access token is valid,
+    so repeated requests reuse the client's HTTP connections instead of
+    building a FyersModel per request, and every session shares the
+    process-wide instrument snapshot. Sessions are dropped when their token
+    expires or after ``idle_timeout`` seconds without use; ``get`` sweeps for
+    them at most every ``EVICT_INTERVAL`` seconds, and ``evict`` sweeps now.
+    """
+
+    # Seconds between the sweeps get runs for idle and expired sessions
+    EVICT_INTERVAL = 60.0
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, api_class=FyersAPI, idle_timeout=1800, max_sessions=None):
+        """
+        Args:
+            api_class (type): FyersAPI or AsyncFyersAPI
+            idle_timeout (float): Seconds a session may go unused before eviction
+            max_sessions (int): Sessions kept at most; the least recently used go first
+        """
+        self.api_class = api_class
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self._sessions = {}
+        # Per client id locks, so concurrent first gets build one client
+        self._guards = {}
+        self._evicted_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        """Get the pool shared by the whole process."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def get(self, client_id, access_token, app_id, app_secret=None):
+        """
+        Get the session for an account, creating it if needed.
+
+        A session whose access token differs from ``access_token`` is replaced.
+        An expired ``access_token`` drops the account's session instead: the
+        account has to log in again.
+
+        Args:
+            client_id (str): Fyers client id (fy_id)
+            access_token (str): Current access token of the account
+            app_id (str): Fyers app id
+            app_secret (str): Fyers app secret
+
+        Returns:
+            FyersAPI: The account's session, or None if ``access_token`` has expired
+        """
+        expires_at = token_expiry(access_token)
+        if expires_at is not None and expires_at <= time.time():
+            logging.info(f"Access token of {client_id} has expired; login required")
+            with self._lock:
+                self._drop(client_id)
+            return None
+        with self._lock:
+            api = self._lookup(client_id, access_token)
+            if api is not None:
+                return api
+            guard = self._guards.setdefault(client_id, threading.Lock())
+        with guard:
+            with self._lock:
+                api = self._lookup(client_id, access_token)
+            if api is None:
+                api = self._register(client_id, self.api_class(access_token, app_id, app_secret), access_token)
+            return api
+
+    def _lookup(self, client_id, access_token):
+        """Get a live session's client and mark it used, sweeping when due; caller holds the lock."""
+        now = time.monotonic()
+        if now - self._evicted_at >= self.EVICT_INTERVAL:
+            self._evict(now)
+        session = self._sessions.get(client_id)
+        if session is None or session.access_token != access_token or session.expired(time.time()):
+            return None
+        session.used_at = now
+        return session.api
+
+    def login(self, access_token, app_id, app_secret=None):
+        """
+        Create a session for a freshly issued access token.
+
+        The account's profile is fetched with the new session's client, which
+        is then kept in the pool under the profile's client id.
+
+        Use login_async when the pool holds AsyncFyersAPI sessions.
+
+        Returns:
+            tuple: (client_id, FyersAPI, profile data)
+        """
+        api = self.api_class(access_token, app_id, app_secret)
+        return self._register_profile(api, api._call('get_profile'), access_token)
+
+    async def login_async(self, access_token, app_id, app_secret=None):
+        """Create an AsyncFyersAPI session for a freshly issued access token; see login."""
+        api = self.api_class(access_token, app_id, app_secret)
+        return self._register_profile(api, await api._call('get_profile'), access_token)
+
+    def _register_profile(self, api, response, access_token):
+        profile = response['data']
+        client_id = profile['fy_id']
+        self._register(client_id, api, access_token)
+        return client_id, api, profile
+
+    def _register(self, client_id, api, access_token):
+        with self._lock:
+            previous = self._sessions.get(client_id)
+            if previous is not None and previous.access_token != access_token:
+                self._drop(client_id)
+            self._sessions[client_id] = _Session(api, access_token)
+            self._evict(time.monotonic())
+        return api
+
+    def remove(self, client_id):
+        """Drop an account's session, e.g. on logout."""
+        with self._lock:
+            self._drop(client_id)
+
+    def _drop(self, client_id):
+        """Drop a session and its rate-limit buckets; caller holds the lock."""
+        self._guards.pop(client_id, None)
+        session = self._sessions.pop(client_id, None)
+        if session is not None and session.api.scheduler is not None:
+            session.api.scheduler.forget(session.access_token)
+
+    def evict(self):
+        """Drop idle and expired sessions; returns the client ids dropped."""
+        with self._lock:
+            return self._evict(time.monotonic())
+
+    def _evict(self, now):
+        self._evicted_at = now
+        wall = time.time()
+        dropped = [
+            client_id for client_id, session in self._sessions.items()
+            if session.expired(wall) or now - session.used_at > self.idle_timeout
+        ]
+        for client_id in dropped:
+            self._drop(client_id)
+        if self.max_sessions is not None and len(self._sessions) > self.max_sessions:
+            by_use = sorted(self._sessions, key=lambda client_id: self._sessions[client_id].used_at)
+            for client_id in by_use[:len(self._sessions) - self.max_sessions]:
+                self._drop(client_id)
+                dropped.append(client_id)
+        if dropped:
+            logging.info(f"Evicted {len(dropped)} Fyers sessions")
+        return dropped
+
+    def __len__(self):
+        return len(self._sessions)
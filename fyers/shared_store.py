@@ -0,0 +1,212 @@
+# shared_store.py
+
+import fcntl
+import json
+import logging
+import os
+import shutil
+from contextlib import contextmanager
+
+from download import FyersInstruments
+from instrument_index import InstrumentIndex
+
+
+class SharedInstrumentStore:
+    """
+    Instrument master shared read-only by every worker process on a host.
+
+    A loader publishes the per-segment binary caches into a numbered generation
+    directory under ``root`` and then points ``CURRENT`` at it. Workers attach by
+    memory-mapping that generation, so the OS page cache holds one copy of the
+    column data and of each segment's InstrumentIndex arrays for all of them.
+    Segments a publish does not touch are hard-linked from the previous
+    generation, and attaching again hands back the same indexes for them.
+
+    Lookups, symbol tickers included, read only the mapped arrays. What each
+    process still holds privately is the Python side of the string columns:
+    the category lists read_cache builds from JSON, and the combined
+    InstrumentSnapshot.df if anything asks for it.
+    """
+
+    # Times attach re-reads CURRENT when the generation it read is pruned under it
+    ATTACH_ATTEMPTS = 3
+
+    def __init__(self, root="fyers_instruments.shared", keep=2):
+        """
+        Args:
+            root (str): Directory holding the published generations
+            keep (int): Number of generations to keep on disk
+        """
+        self.root = root
+        self.keep = keep
+        # Segment name -> (meta.json inode, InstrumentIndex) from the last attach
+        self._attached = {}
+
+    def _generation_path(self, generation):
+        return os.path.join(self.root, f"gen-{generation:06d}")
+
+    def current_generation(self):
+        """Get the generation workers should attach to, or None if nothing is published."""
+        try:
+            with open(os.path.join(self.root, "CURRENT")) as f:
+                return int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _segment_names(self, generation):
+        with open(os.path.join(self._generation_path(generation), "segments.json")) as f:
+            return json.load(f)
+
+    def publish(self, segments):
+        """
+        Publish segments as a new generation.
+
+        Args:
+            segments (dict): Segment name -> pd.DataFrame to (re)write; segments of
+                the previous generation not in this dict are carried over as is
+
+        Returns:
+            int: The published generation
+        """
+        with self._publish_lock():
+            return self._publish(segments)
+
+    def publish_initial(self, load_segments):
+        """
+        Publish the first generation unless one exists, checked under the publish lock.
+
+        Workers that start together call this: the first one loads and
+        publishes, the rest wait for it and publish nothing.
+
+        Args:
+            load_segments (callable): Returns segment name -> pd.DataFrame; only
+                called if nothing is published yet
+
+        Returns:
+            int: The current generation
+        """
+        with self._publish_lock():
+            generation = self.current_generation()
+            if generation is not None:
+                return generation
+            return self._publish(load_segments())
+
+    @contextmanager
+    def _publish_lock(self):
+        """Hold the host-wide publish lock; readers never take it."""
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def _publish(self, segments):
+        """Write a new generation and point CURRENT at it; the caller holds the publish lock."""
+        previous = self.current_generation()
+        generation = (previous or 0) + 1
+        gen_dir = self._generation_path(generation)
+        shutil.rmtree(gen_dir, ignore_errors=True)
+        os.makedirs(gen_dir)
+
+        names = []
+        if previous is not None:
+            for name in self._segment_names(previous):
+                names.append(name)
+                if name not in segments:
+                    self._link_segment(os.path.join(self._generation_path(previous), name),
+                                       os.path.join(gen_dir, name))
+        for name, df in segments.items():
+            if name not in names:
+                names.append(name)
+            cache_path = os.path.join(gen_dir, name)
+            if not FyersInstruments.write_cache(df, cache_path):
+                raise Exception(f"Failed to write shared segment {name}")
+            # Index the data as workers will map it (e.g. float32 strikes)
+            InstrumentIndex(FyersInstruments.read_cache(cache_path)).save(cache_path)
+
+        with open(os.path.join(gen_dir, "segments.json"), "w") as f:
+            json.dump(names, f)
+
+        current_tmp = os.path.join(self.root, "CURRENT.tmp")
+        with open(current_tmp, "w") as f:
+            f.write(str(generation))
+        os.replace(current_tmp, os.path.join(self.root, "CURRENT"))
+        logging.info(f"Published shared instruments generation {generation}")
+
+        self._prune(generation)
+        return generation
+
+    @staticmethod
+    def _link_segment(source, target):
+        """Carry a segment cache over to a new generation without copying its data."""
+        os.makedirs(target)
+        for name in os.listdir(source):
+            try:
+                os.link(os.path.join(source, name), os.path.join(target, name))
+            except OSError:
+                shutil.copy2(os.path.join(source, name), os.path.join(target, name))
+
+    def _prune(self, generation):
+        """Remove generations older than the last ``keep``; attached mappings stay valid."""
+        for name in os.listdir(self.root):
+            if not name.startswith("gen-"):
+                continue
+            try:
+                if int(name[4:]) <= generation - self.keep:
+                    shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+            except ValueError:
+                continue
+
+    def attach(self):
+        """
+        Memory-map the current generation read-only.
+
+        Returns:
+            tuple: (generation, dict of segment name -> pd.DataFrame); the dict is
+                empty if nothing has been published yet
+        """
+        generation, indexes = self.attach_indexes()
+        return generation, {name: index.df for name, index in indexes.items()}
+
+    def attach_indexes(self):
+        """
+        Memory-map the current generation read-only, with its lookup indexes.
+
+        Indexes saved at publish time are mapped rather than rebuilt; a segment
+        published without one is indexed here.
+
+        Returns:
+            tuple: (generation, dict of segment name -> InstrumentIndex); the dict
+                is empty if nothing has been published yet
+        """
+        for attempt in range(self.ATTACH_ATTEMPTS):
+            generation = self.current_generation()
+            if generation is None:
+                return None, {}
+            try:
+                attached = self._attach_generation(generation)
+                break
+            except FileNotFoundError:
+                # Pruned by publishes that landed meanwhile; attach the newer one
+                if attempt == self.ATTACH_ATTEMPTS - 1:
+                    raise
+                logging.info(f"Shared instruments generation {generation} was pruned while attaching")
+
+        self._attached = attached
+        return generation, {name: index for name, (_, index) in attached.items()}
+
+    def _attach_generation(self, generation):
+        gen_dir = self._generation_path(generation)
+        attached = {}
+        for name in self._segment_names(generation):
+            cache_path = os.path.join(gen_dir, name)
+            inode = os.stat(os.path.join(cache_path, "meta.json")).st_ino
+            previous = self._attached.get(name)
+            if previous is not None and previous[0] == inode:
+                attached[name] = previous
+            else:
+                df = FyersInstruments.read_cache(cache_path)
+                if df is None:
+                    raise FileNotFoundError(f"Shared segment {name} missing from generation {generation}")
+                index = InstrumentIndex.load(df, cache_path)
+                attached[name] = (inode, index if index is not None else InstrumentIndex(df))
+        return attached
@@ -0,0 +1,35 @@
+# conftest.py
+
+import os
+import sys
+
+import pytest
+
+# The modules under fyers/ import each other by bare name
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fyers"))
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """FyersAPI over a FakeFyersModel and a synthetic symbol master, with fresh shared state."""
+    pytest.importorskip("fyers_api")
+    from download import FyersInstruments
+    from fake_broker import FakeFyersModel, synthetic_instruments
+    from funds import FundsView
+    from instrument_index import InstrumentIndex, InstrumentSnapshot
+    from metrics import Metrics
+    from paper import PaperExecutionEngine
+    from quote_cache import QuoteCache
+    from script import FyersAPI
+
+    segments = FyersInstruments.split_segments(synthetic_instruments(underlyings=2, expiries=2, strikes=4, equities=5))
+    monkeypatch.setattr(FyersAPI, "snapshot", InstrumentSnapshot({name: InstrumentIndex(df) for name, df in segments.items()}))
+    monkeypatch.setattr(FyersAPI, "scheduler", None)
+    monkeypatch.setattr(FyersAPI, "metrics", Metrics())
+    monkeypatch.setattr(FyersAPI, "quote_cache", QuoteCache())
+    monkeypatch.setattr(FyersAPI, "funds_view", FundsView())
+    monkeypatch.setattr(FyersAPI, "paper_engine", PaperExecutionEngine())
+    monkeypatch.setattr(FyersAPI, "market_data", None)
+    fyers_api = FyersAPI("ACCESS-TOKEN", "APP-100", "SECRET")
+    fyers_api.obj = FakeFyersModel()
+    return fyers_api
@@ -0,0 +1,139 @@
+# test_basket.py
+
+import asyncio
+import time
+
+from fake_broker import FakeFyersModel
+
+LEGS = [
+    {"symbol_token": 35004, "symbol": "NSE:NIFTY26OCT22000CE", "qty": 75, "buy_sell": "BUY", "exch_seg": "NFO"},
+    {"symbol_token": 35005, "symbol": "NSE:NIFTY26OCT22000PE", "qty": 75, "buy_sell": "SELL", "exch_seg": "NFO"},
+    {"symbol_token": 35035, "symbol": "NSE:SYN0001-EQ", "qty": 10, "buy_sell": "BUY"}
+]
+
+
+class Broker(FakeFyersModel):
+    """FakeFyersModel that refuses orders for some symbols and can fail or delay cancels."""
+
+    def __init__(self, refuse=(), cancel_error=None, cancel_delay=0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.refuse = set(refuse)
+        self.cancel_error = cancel_error
+        self.cancel_delay = cancel_delay
+
+    def place_order(self, data):
+        if data["symbol"] in self.refuse:
+            return self._reply("place_order", lambda: {"s": "error", "code": -50, "emsg": "Invalid symbol"})
+        return super().place_order(data)
+
+    def cancel_order(self, data):
+        if self.cancel_error is None:
+            return super().cancel_order(data)
+        time.sleep(self.cancel_delay)
+        return self._reply("cancel_order", lambda: {"s": "error", "code": -52, "message": self.cancel_error})
+
+
+def _statuses(results):
+    return [result["status"] for result in results]
+
+
+def test_legs_are_submitted_concurrently_and_fill(api):
+    api.obj = Broker(latency=0.1)
+
+    start = time.monotonic()
+    results = api.place_basket(LEGS)
+
+    assert time.monotonic() - start < 0.1 * len(LEGS)
+    assert _statuses(results) == ["Completed"] * 3
+    assert [result["average_price"] for result in results] == [100.0] * 3
+
+
+def test_sell_legs_are_sent_as_sells(api):
+    api.obj = Broker()
+
+    api.place_basket(LEGS)
+
+    sides = {order["symbol"]: order["side"] for order in api.obj.orderbook()["orderBook"]}
+    assert sides == {"NSE:NIFTY26OCT22000CE": 1, "NSE:NIFTY26OCT22000PE": -1, "NSE:SYN0001-EQ": 1}
+    assert api._order_params("NSE:SYN0001-EQ", 1, "NSE", "MARKET", 0, buy_sell="SELL")["side"] == -1
+
+
+def test_failed_leg_rolls_back_open_legs(api):
+    api.obj = Broker(refuse={"NSE:SYN0001-EQ"}, fill_delay=10)
+
+    results = api.place_basket(LEGS, timeout=0.1)
+
+    assert _statuses(results) == ["Cancelled", "Cancelled", "Failed"]
+    assert results[2]["message"] == "Order placement failed: Invalid symbol"
+    assert api.obj.calls["cancel_order"] == 2
+
+
+def test_unresolved_leg_sends_nothing(api):
+    results = api.place_basket([LEGS[0], {"symbol_token": None, "symbol": "NSE:MISSING-EQ", "qty": 1}])
+
+    assert _statuses(results) == ["Failed", "Failed"]
+    assert "place_order" not in api.obj.calls
+
+
+def test_rejected_leg_rolls_back_without_cancelling_filled_legs(api):
+    api.obj = Broker(reject_rate=1.0)
+
+    results = api.place_basket(LEGS[:1], timeout=1.0)
+
+    assert _statuses(results) == ["Rejected"]
+    assert "cancel_order" not in api.obj.calls
+
+
+def test_failed_rollback_cancel_leaves_the_leg_open(api):
+    api.obj = Broker(refuse={"NSE:SYN0001-EQ"}, fill_delay=10, cancel_error="Exchange not reachable")
+
+    results = api.place_basket(LEGS, timeout=0.1)
+
+    assert _statuses(results)[:2] == ["Open", "Open"]
+    assert results[0]["message"] == "Rollback cancel failed: Exchange not reachable"
+
+
+def test_leg_filled_before_its_cancel_is_reconciled(api):
+    api.obj = Broker(refuse={"NSE:SYN0001-EQ"}, fill_delay=0.3, cancel_delay=0.4, cancel_error="Order already traded")
+
+    results = api.place_basket(LEGS, timeout=0.05)
+
+    assert _statuses(results) == ["Completed", "Completed", "Failed"]
+    assert results[0]["message"] == "Filled before the rollback cancel"
+    assert results[0]["average_price"] == 100.0
+
+
+def test_basket_invalidates_cached_funds(api):
+    api.funds_view.update(api.session_token, {"fund_limit": [{"id": 10, "equityAmount": 1e6}]})
+    api.quote_cache.put("NSE:SYN0001-EQ", 100.0)
+
+    api.place_basket(LEGS[2:])
+
+    entry = api.funds_view.get(api.session_token)
+    assert entry.stale
+    assert entry.available == 1e6 - 200.0
+
+
+def test_paper_basket_goes_through_the_paper_engine(api):
+    results = api.place_basket(LEGS, is_paper=True)
+
+    assert _statuses(results) == ["Completed"] * 3
+    engine = api.paper_engine
+    assert [order["id"] for order in engine.orderbook(api.session_token)] == [result["order_id"] for result in results]
+    assert engine.positions(api.session_token)["NSE:NIFTY26OCT22000PE"]["qty"] == -75
+    # One batched quote for the three unpriced legs, none once the engine knows them
+    assert api.obj.calls == {"quotes": 1}
+    api.place_basket(LEGS, is_paper=True)
+    assert api.obj.calls == {"quotes": 1}
+
+
+def test_async_basket_rolls_back(api):
+    from async_api import AsyncFyersAPI
+
+    async_api = AsyncFyersAPI(api.session_token, api.app_id, api.app_secret)
+    async_api.obj = Broker(refuse={"NSE:SYN0001-EQ"}, fill_delay=10, is_async=True)
+
+    results = asyncio.run(async_api.place_basket(LEGS, timeout=0.1))
+
+    assert _statuses(results) == ["Cancelled", "Cancelled", "Failed"]
+    assert async_api.obj.calls["orderbook"] >= 1
@@ -0,0 +1,128 @@
+# test_download.py
+
+import hashlib
+import os
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from download import FyersInstruments
+from fake_broker import synthetic_instruments
+
+
+class _ETagHandler(SimpleHTTPRequestHandler):
+    """Static files with an ETag, answering 304 to a matching If-None-Match."""
+
+    requests = []
+
+    def do_GET(self):
+        path = self.translate_path(self.path)
+        with open(path, "rb") as f:
+            body = f.read()
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        self.requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def master(tmp_path, monkeypatch):
+    """A local symbol master server with NSE_FO and NSE_CM segments."""
+    served = tmp_path / "served"
+    served.mkdir()
+    df = synthetic_instruments(underlyings=2, expiries=2, strikes=4, equities=20)
+    frames = {
+        "NSE_FO": df[df["Segment"] == 11],
+        "NSE_CM": df[df["Segment"] != 11]
+    }
+
+    def write(segment, frame):
+        frame.to_csv(served / f"{segment}.csv", index=False)
+
+    for segment, frame in frames.items():
+        write(segment, frame)
+
+    _ETagHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_ETagHandler, directory=str(served)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    monkeypatch.setattr(FyersInstruments, "URLS", [f"{base}/{segment}.csv" for segment in frames])
+    yield frames, write, str(tmp_path / "work" / "fyers_instruments.csv")
+    server.shutdown()
+
+
+def test_download_writes_segments_and_validators(master):
+    frames, _, file_path = master
+    os.makedirs(os.path.dirname(file_path))
+
+    df = FyersInstruments.download_instruments(file_path)
+
+    assert len(df) == sum(len(frame) for frame in frames.values())
+    segments_dir = FyersInstruments.segments_path(file_path)
+    assert os.path.exists(os.path.join(segments_dir, "NSE_FO.csv"))
+    assert os.path.exists(os.path.join(segments_dir, "validators.json"))
+
+
+def test_unchanged_segments_are_skipped_with_304(master):
+    _, _, file_path = master
+    os.makedirs(os.path.dirname(file_path))
+    FyersInstruments.download_instruments(file_path)
+    _ETagHandler.requests.clear()
+
+    results = FyersInstruments.download_segments(FyersInstruments.segments_path(file_path))
+
+    assert results == {"NSE_FO": False, "NSE_CM": False}
+    # Both requests were conditional
+    assert all(etag for _, etag in _ETagHandler.requests)
+
+
+def test_only_changed_segment_is_downloaded(master):
+    frames, write, file_path = master
+    os.makedirs(os.path.dirname(file_path))
+    FyersInstruments.download_instruments(file_path)
+    write("NSE_FO", pd.concat([frames["NSE_FO"], frames["NSE_FO"].iloc[:2]]))
+
+    results = FyersInstruments.download_segments(FyersInstruments.segments_path(file_path))
+
+    assert results == {"NSE_FO": True, "NSE_CM": False}
+
+
+def test_refresh_rebuilds_combined_file(master):
+    frames, write, file_path = master
+    os.makedirs(os.path.dirname(file_path))
+    total = len(FyersInstruments.download_instruments(file_path))
+    # mtimes must move past the combined file's
+    time.sleep(0.01)
+    write("NSE_FO", pd.concat([frames["NSE_FO"], frames["NSE_FO"].iloc[:2]]))
+
+    changed = FyersInstruments.refresh_segments(file_path)
+
+    assert list(changed) == ["NSE_FO"]
+    assert len(FyersInstruments.download_instruments(file_path)) == total + 2
+    assert len(FyersInstruments.load_instruments(file_path)) == total + 2
+
+
+def test_cache_round_trip(tmp_path):
+    df = synthetic_instruments(underlyings=1, expiries=1, strikes=2, equities=5)
+    cache_path = str(tmp_path / "cache")
+
+    assert FyersInstruments.write_cache(df, cache_path)
+    cached = FyersInstruments.read_cache(cache_path)
+
+    assert list(cached.columns) == list(FyersInstruments.CACHE_COLUMNS)
+    assert cached["Scrip code"].tolist() == df["Scrip code"].tolist()
+    assert cached["Symbol ticker"].astype(str).tolist() == df["Symbol ticker"].tolist()
@@ -0,0 +1,161 @@
+# test_funds.py
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from fake_broker import FakeFyersModel
+from funds import FundsView
+
+
+def _response(available):
+    return {"s": "ok", "fund_limit": [{"id": 10, "equityAmount": available}]}
+
+
+class Funds:
+    """Counting funds fetch, like FyersAPI._call('funds')."""
+
+    def __init__(self, available=10000.0, delay=0.0):
+        self.available = available
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return _response(self.available)
+
+    async def fetch_async(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return _response(self.available)
+
+
+@pytest.mark.parametrize("symbol, product, side, expected", [
+    ("NSE:NIFTY24JUN23000CE", "INTRADAY", 1, 1000.0),
+    ("NSE:NIFTY24JUNFUT", "MARGIN", 1, 100.0),
+    ("NSE:SBIN-EQ", "INTRADAY", 1, 200.0),
+    ("NSE:SBIN-EQ", "CASH", 1, 1000.0),
+    ("NSE:SBIN-EQ", "CASH", -1, 0.0)
+])
+def test_estimate_margin(symbol, product, side, expected):
+    assert FundsView.estimate_margin(symbol, 10, 100.0, side, product) == expected
+
+
+def test_check_fetches_once_and_reserves():
+    view = FundsView()
+    fetch = Funds(1000.0)
+
+    assert view.check("A", 600.0, fetch) == (True, 1000.0)
+    view.reserve("A", 600.0)
+
+    assert view.check("A", 600.0, fetch) == (False, 400.0)
+    assert fetch.calls == 1
+
+
+def test_update_drops_reservations_the_fetch_covers():
+    view = FundsView()
+    view.update("A", _response(1000.0))
+    view.reserve("A", 300.0)
+    requested_at = time.monotonic()
+    view.reserve("A", 200.0)
+
+    view.update("A", _response(700.0), requested_at)
+
+    assert view.get("A").available == 500.0
+
+
+def test_stale_funds_are_used_and_refreshed_in_background():
+    view = FundsView(ttl=60)
+    fetch = Funds(1000.0)
+    view.check("A", 1.0, fetch)
+    fetch.available = 50.0
+    view.invalidate("A")
+
+    # Answered from the cached entry while the refresh runs
+    assert view.check("A", 100.0, fetch) == (True, 1000.0)
+    deadline = time.monotonic() + 2
+    while view.get("A").available != 50.0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert view.check("A", 100.0, fetch) == (False, 50.0)
+    assert fetch.calls == 2
+
+
+def test_unknown_funds_do_not_block_orders():
+    view = FundsView()
+
+    def fail():
+        raise RuntimeError("funds down")
+
+    assert view.check("A", 1e9, fail) == (True, None)
+
+
+def test_concurrent_first_checks_share_one_fetch():
+    view = FundsView()
+    fetch = Funds(1000.0, delay=0.05)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(view.check("A", 10.0, fetch))) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert fetch.calls == 1
+    assert results == [(True, 1000.0)] * 20
+
+
+def test_concurrent_first_async_checks_share_one_fetch():
+    view = FundsView()
+    fetch = Funds(1000.0, delay=0.05)
+
+    async def run():
+        return await asyncio.gather(*(view.check_async("A", 10.0, fetch.fetch_async) for _ in range(50)))
+
+    assert asyncio.run(run()) == [(True, 1000.0)] * 50
+    assert fetch.calls == 1
+
+
+def test_pre_check_rejects_locally(api):
+    api.obj = FakeFyersModel(funds=1000.0)
+
+    order_id, _, message = api.place_order_on_broker(35035, "NSE:SYN0001-EQ", 100, "NSE", "BUY", "LIMIT", 100.0)
+
+    assert order_id is None
+    assert message == "Order placement failed due to insufficient funds: needs about 2000.00, 1000.00 available."
+    assert "place_order" not in api.obj.calls
+    assert api.metrics.snapshot()["counters"]["margin_rejections"] == 1
+
+
+def test_pre_check_prices_market_orders_from_the_cache_only(api):
+    api.obj = FakeFyersModel(funds=1000.0, price=100.0)
+
+    # Nothing cached: sent unchecked, without a quotes call first
+    order_id, _, _ = api.place_order_on_broker(35035, "NSE:SYN0001-EQ", 100, "NSE", "BUY", "MARKET", 0)
+    assert order_id is not None
+    assert api.metrics.snapshot()["counters"]["margin_checks_skipped"] == 1
+    assert api.obj.calls.get("quotes", 0) == 0
+
+    api.quote_cache.put("NSE:SYN0001-EQ", 100.0)
+    order_id, _, message = api.place_order_on_broker(35035, "NSE:SYN0001-EQ", 100, "NSE", "BUY", "MARKET", 0)
+    assert order_id is None
+    assert "insufficient funds" in message
+
+
+def test_burst_of_orders_fetches_funds_once(api):
+    api.obj = FakeFyersModel(latency=0.01, funds=1e9)
+    results = []
+
+    def place():
+        results.append(api.place_order_on_broker(35035, "NSE:SYN0001-EQ", 1, "NSE", "BUY", "LIMIT", 100.0))
+
+    threads = [threading.Thread(target=place) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(order_id for order_id, _, _ in results)
+    assert api.obj.calls["funds"] == 1
+    assert api.funds_view.get(api.session_token).stale
@@ -0,0 +1,160 @@
+# test_instrument_index.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from download import FyersInstruments
+from fake_broker import synthetic_instruments
+from instrument_index import ExpiryCalendar, InstrumentIndex, InstrumentSnapshot
+from shared_store import SharedInstrumentStore
+
+
+def _timestamps(*dates):
+    return [int(pd.Timestamp(f"{date} 15:30", tz="Asia/Kolkata").timestamp()) for date in dates]
+
+
+# Thursdays, January to March 2030
+WEEKLY = _timestamps(
+    "2030-01-03", "2030-01-10", "2030-01-17", "2030-01-24", "2030-01-31",
+    "2030-02-07", "2030-02-14", "2030-02-21", "2030-02-28",
+    "2030-03-07", "2030-03-14", "2030-03-21", "2030-03-28"
+)
+
+
+@pytest.mark.parametrize("code, expected", [
+    ("W", "2030-01-03"),
+    ("NW", "2030-01-10"),
+    ("M", "2030-01-31"),
+    ("NM", "2030-02-28"),
+    ("NNM", "2030-03-28")
+])
+def test_expiry_codes(code, expected):
+    # Unsorted, duplicated and missing (0) dates are tolerated
+    calendar = ExpiryCalendar(WEEKLY[::-1] + WEEKLY[:3] + [0])
+
+    assert calendar.resolve(code) == _timestamps(expected)[0]
+
+
+def test_expiry_codes_past_the_end():
+    calendar = ExpiryCalendar(_timestamps("2030-01-03", "2030-01-10"))
+
+    assert calendar.resolve("NNM") is None
+    assert calendar.resolve("X") is None
+    assert calendar.next(5) is None
+
+
+@pytest.fixture(scope="module")
+def df():
+    return synthetic_instruments(underlyings=3, expiries=4, strikes=6, equities=10)
+
+
+def test_scrip_code_lookups(df):
+    index = InstrumentIndex(df)
+    row = df.iloc[7]
+
+    assert index.positions(row["Scrip code"]).tolist() == [7]
+    assert index.positions(str(row["Scrip code"])).tolist() == [7]
+    assert index.position(row["Scrip code"], row["Exchange Instrument type"]) == 7
+    assert index.position(row["Scrip code"], 99) is None
+    assert len(index.positions("unknown")) == 0
+
+
+def test_option_chain_find(df):
+    index = InstrumentIndex(df)
+    options = df[df["Exchange Instrument type"] == 14]
+    row = options.iloc[5]
+    chain = index.chain(10, row["Underlying symbol"], 14)
+    expiry = chain.calendar.resolve("W")
+
+    position = chain.find(row["Expiry date"], row["Strike price"], row["Option type"])
+    assert position == df.index.get_loc(row.name)
+    assert chain.find(row["Expiry date"], row["Strike price"] + 1, row["Option type"]) is None
+    atm, strikes = chain.nearest_strikes(expiry, row["Strike price"] + 1, n=1)
+    assert atm == row["Strike price"]
+    assert len(strikes) == 3
+
+
+def test_saved_index_is_mapped_and_matches(df, tmp_path):
+    built = InstrumentIndex(df)
+    built.save(str(tmp_path))
+
+    loaded = InstrumentIndex.load(df, str(tmp_path))
+
+    assert not loaded.arrays["scrip_positions"].flags.owndata
+    assert not loaded.symbol_tickers.flags.owndata
+    assert set(loaded.chains) == set(built.chains)
+    for code in df["Scrip code"].iloc[::7]:
+        assert loaded.positions(code).tolist() == built.positions(code).tolist()
+    for key, chain in built.chains.items():
+        assert np.array_equal(loaded.chains[key].strikes, chain.strikes)
+        assert np.array_equal(loaded.chains[key].positions, chain.positions)
+
+
+def test_load_without_saved_index(df, tmp_path):
+    assert InstrumentIndex.load(df, str(tmp_path)) is None
+
+
+def test_snapshot_swap_leaves_old_snapshot_intact(df):
+    segments = FyersInstruments.split_segments(df)
+    old = InstrumentSnapshot({name: InstrumentIndex(frame) for name, frame in segments.items()})
+    fo = segments["NSE_FO"]
+    added = fo.iloc[:1].assign(**{"Scrip code": 999999})
+    refreshed = dict(old.indexes, NSE_FO=InstrumentIndex(pd.concat([fo, added], ignore_index=True)))
+
+    new = InstrumentSnapshot(refreshed, old.generation + 1)
+
+    assert new.contains(999999)
+    assert not old.contains(999999)
+    assert new.indexes["NSE_CM"] is old.indexes["NSE_CM"]
+
+
+def test_shared_store_hot_swap(df, tmp_path):
+    segments = FyersInstruments.split_segments(df)
+    publisher = SharedInstrumentStore(str(tmp_path))
+    worker = SharedInstrumentStore(str(tmp_path))
+    publisher.publish(segments)
+
+    generation, first = worker.attach_indexes()
+    assert generation == 1
+    assert not first["NSE_FO"].arrays["scrip_keys"].flags.owndata
+
+    fo = segments["NSE_FO"]
+    publisher.publish({"NSE_FO": pd.concat([fo, fo.iloc[:1].assign(**{"Scrip code": 999999})], ignore_index=True)})
+    generation, second = worker.attach_indexes()
+
+    assert generation == 2
+    assert len(second["NSE_FO"].positions(999999)) == 1
+    assert len(first["NSE_FO"].positions(999999)) == 0
+    # The unchanged segment keeps its mapped index
+    assert second["NSE_CM"] is first["NSE_CM"]
+
+
+def test_publish_initial_publishes_once(df, tmp_path):
+    segments = FyersInstruments.split_segments(df)
+    loads = []
+
+    def load_segments():
+        loads.append(1)
+        return segments
+
+    first = SharedInstrumentStore(str(tmp_path)).publish_initial(load_segments)
+    second = SharedInstrumentStore(str(tmp_path)).publish_initial(load_segments)
+
+    assert first == second == 1
+    assert len(loads) == 1
+
+
+def test_attach_follows_a_pruned_generation(df, tmp_path):
+    segments = FyersInstruments.split_segments(df)
+    store = SharedInstrumentStore(str(tmp_path), keep=1)
+    store.publish(segments)
+    worker = SharedInstrumentStore(str(tmp_path))
+    generations = iter([1, 2])
+    worker.current_generation = lambda: next(generations)
+    store.publish({"NSE_CM": segments["NSE_CM"]})
+
+    generation, indexes = worker.attach_indexes()
+
+    assert generation == 2
+    assert set(indexes) == set(segments)
@@ -0,0 +1,103 @@
+# test_market_data.py
+
+import time
+
+from fake_broker import FakeFyersModel
+from market_data import LocalTransport, MarketDataFeed, TickTable
+from recorder import ORDERBOOK, QUOTE, RESPONSE, Recorder, RecordingFyersModel, Recording, Replayer
+
+
+def test_tick_table_reads_latest_tick():
+    table = TickTable(capacity=2)
+    table.add("NSE:SBIN-EQ", fytoken=101)
+
+    assert table.get("NSE:SBIN-EQ") is None
+    assert table.update("NSE:SBIN-EQ", 500.5, 10, timestamp=time.time())
+    assert table.update("NSE:SBIN-EQ", 501.0, 12, timestamp=time.time())
+
+    assert table.get("NSE:SBIN-EQ")[:2] == (501.0, 12)
+    assert table.get_by_fytoken(101)[0] == 501.0
+
+
+def test_tick_table_drops_unsubscribed_and_stale_ticks():
+    table = TickTable()
+    table.add("NSE:SBIN-EQ")
+
+    assert not table.update("NSE:TCS-EQ", 3000.0)
+    table.update("NSE:SBIN-EQ", 500.0, timestamp=time.time() - 60)
+
+    assert table.get("NSE:TCS-EQ") is None
+    assert table.get("NSE:SBIN-EQ", max_age=5) is None
+    assert table.get("NSE:SBIN-EQ")[0] == 500.0
+
+
+def test_tick_table_grows_and_keeps_values():
+    table = TickTable(capacity=2)
+    for i in range(5):
+        table.add(f"S{i}")
+        table.update(f"S{i}", float(i + 1))
+
+    assert [table.get(f"S{i}")[0] for i in range(5)] == [1.0, 2.0, 3.0, 4.0, 5.0]
+
+
+def test_feed_decodes_messages_and_notifies_listeners():
+    transport = LocalTransport()
+    feed = MarketDataFeed(transport)
+    seen = []
+    feed.listeners.append(lambda symbol, lp: seen.append((symbol, lp)))
+    feed.subscribe(["NSE:SBIN-EQ"])
+    feed.start()
+
+    transport.push({"d": [{"symbol": "NSE:SBIN-EQ", "ltp": 500.0, "vol_traded_today": 7},
+                          {"symbol": "NSE:TCS-EQ", "ltp": 3000.0}]})
+    transport.push({"symbol": "NSE:SBIN-EQ"})  # no ltp
+
+    assert transport.subscribed == {"NSE:SBIN-EQ"}
+    assert feed.ltp("NSE:SBIN-EQ") == 500.0
+    assert feed.ltp("NSE:TCS-EQ") is None
+    assert seen == [("NSE:SBIN-EQ", 500.0)]
+
+
+def test_replay_feeds_recorded_quotes(tmp_path):
+    recorder = Recorder(str(tmp_path))
+    now = time.time()
+    for i, lp in enumerate([100.0, 101.0, 102.5]):
+        recorder.record_quote("NSE:SBIN-EQ", lp, volume=i, timestamp=now + i * 0.001)
+    recorder.close()
+    transport = LocalTransport()
+    feed = MarketDataFeed(transport)
+    feed.subscribe(["NSE:SBIN-EQ"])
+    feed.start()
+
+    Replayer(Recording(str(tmp_path)), speed=None).to_transport(transport)
+
+    assert feed.ticks == 3
+    assert feed.ltp("NSE:SBIN-EQ") == 102.5
+
+
+def test_streamed_ticks_are_recorded_with_their_fytoken(tmp_path):
+    recorder = Recorder(str(tmp_path))
+    transport = LocalTransport()
+    feed = MarketDataFeed(transport)
+    feed.tick_listeners.append(recorder.record_tick)
+    feed.subscribe(["NSE:SBIN-EQ"], ["10100000003045"])
+    feed.start()
+
+    transport.push({"symbol": "NSE:SBIN-EQ", "ltp": 500.0, "vol_traded_today": 7})
+    recorder.close()
+
+    [record] = Recording(str(tmp_path)).for_fytoken(10100000003045)
+    assert (record["symbol"], record["lp"], record["volume"]) == ("NSE:SBIN-EQ", 500.0, 7)
+
+
+def test_recording_model_stores_quotes_and_orderbooks_once(tmp_path):
+    recorder = Recorder(str(tmp_path))
+    model = RecordingFyersModel(FakeFyersModel(), recorder)
+
+    model.quotes(data={"symbols": "NSE:SBIN-EQ,NSE:TCS-EQ"})
+    model.place_order(data={"symbol": "NSE:SBIN-EQ", "qty": 1, "side": 1})
+    model.orderbook()
+    recorder.close()
+
+    kinds = [record["kind"] for record in Recording(str(tmp_path)).records()]
+    assert kinds == [QUOTE, QUOTE, RESPONSE, ORDERBOOK]
@@ -0,0 +1,87 @@
+# test_order_tracker.py
+
+import asyncio
+
+from fake_broker import FakeFyersModel
+from order_tracker import OrderTracker, OrderUpdateSource
+
+
+def _orderbook(model):
+    return lambda: model.orderbook()["orderBook"]
+
+
+def test_push_update_resolves_without_polling():
+    source = OrderUpdateSource()
+    tracker = OrderTracker(source=source)
+    future = tracker.track("A1")
+
+    source.emit({"id": "A1", "status": 6})
+    assert not future.done()
+    source.emit({"id": "A1", "status": 2, "tradedPrice": 101.5})
+
+    assert future.result(timeout=0)["tradedPrice"] == 101.5
+
+
+def test_update_before_track_is_kept():
+    source = OrderUpdateSource()
+    tracker = OrderTracker(source=source)
+    source.emit({"id": "A1", "status": 5, "message": "RMS"})
+
+    assert tracker.wait("A1", timeout=0)["status"] == 5
+
+
+def test_poll_resolves_pending_orders_with_one_orderbook_call_per_round():
+    model = FakeFyersModel(fill_delay=0.05)
+    order_ids = [model.place_order({"symbol": "NSE:SBIN-EQ", "qty": 1, "side": 1})["id"] for _ in range(10)]
+    tracker = OrderTracker(_orderbook(model), min_poll=0.01, max_poll=0.05)
+
+    futures = [tracker.track(order_id) for order_id in order_ids]
+    orders = [future.result(timeout=2) for future in futures]
+
+    assert [order["status"] for order in orders] == [2] * 10
+    # All ten share each poll
+    assert model.calls["orderbook"] < 10
+
+
+def test_wait_times_out_with_latest_entry():
+    model = FakeFyersModel(fill_delay=60)
+    order_id = model.place_order({"symbol": "NSE:SBIN-EQ", "qty": 1, "side": 1})["id"]
+    tracker = OrderTracker(_orderbook(model), min_poll=0.01)
+
+    order = tracker.wait(order_id, timeout=0.1)
+
+    assert order["status"] == 6
+    assert tracker.latest(order_id) is None
+
+
+def test_push_wins_over_slow_poll():
+    model = FakeFyersModel(fill_delay=60)
+    source = OrderUpdateSource()
+    tracker = OrderTracker(_orderbook(model), source=source, fallback_poll=10)
+    future = tracker.track("A1")
+
+    source.emit({"id": "A1", "status": 2, "tradedPrice": 99.0})
+
+    assert future.result(timeout=0.5)["status"] == 2
+    assert "orderbook" not in model.calls
+
+
+def test_poll_async_serves_every_pending_order():
+    model = FakeFyersModel(fill_delay=0.05, is_async=True)
+
+    async def run():
+        order_ids = [(await model.place_order({"symbol": "NSE:SBIN-EQ", "qty": 1, "side": 1}))["id"]
+                     for _ in range(20)]
+        tracker = OrderTracker(min_poll=0.01, max_poll=0.05)
+        futures = [asyncio.wrap_future(tracker.track(order_id)) for order_id in order_ids]
+
+        async def fetch():
+            return (await model.orderbook())["orderBook"]
+
+        await asyncio.wait_for(asyncio.gather(tracker.poll_async(fetch), *futures), timeout=2)
+        return [future.result() for future in futures]
+
+    orders = asyncio.run(run())
+
+    assert [order["status"] for order in orders] == [2] * 20
+    assert model.calls["orderbook"] < 20
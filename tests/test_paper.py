@@ -0,0 +1,140 @@
+# test_paper.py
+
+import pytest
+
+from paper import LIMIT_ORDER, MARKET_ORDER, PaperExecutionEngine
+
+SYMBOL = "NSE:SBIN-EQ"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _order(side=1, qty=10, order_type=MARKET_ORDER, limit_price=0, symbol=SYMBOL):
+    return {"symbol": symbol, "qty": qty, "side": side, "type": order_type, "limitPrice": limit_price}
+
+
+def _place(engine, account="A", **kwargs):
+    response = engine.place_order(account, _order(**kwargs))
+    assert response["s"] == "ok"
+    return response["id"]
+
+
+@pytest.mark.parametrize("side, expected", [(1, 100.1), (-1, 99.9)])
+def test_market_order_fills_with_slippage_against_the_trader(side, expected):
+    engine = PaperExecutionEngine(slippage_bps=10)
+    engine.on_price(SYMBOL, 100.0)
+
+    order = engine.order(_place(engine, side=side))
+
+    assert order["status"] == 2
+    assert order["tradedPrice"] == expected
+
+
+def test_market_order_without_a_price_waits_for_one():
+    engine = PaperExecutionEngine()
+    order_id = _place(engine)
+
+    assert engine.order(order_id)["status"] == 6
+    engine.on_price(SYMBOL, 101.0)
+    assert engine.order(order_id)["tradedPrice"] == 101.0
+
+
+def test_limit_order_rests_until_the_price_crosses():
+    engine = PaperExecutionEngine()
+    engine.on_price(SYMBOL, 100.0)
+    buy = _place(engine, order_type=LIMIT_ORDER, limit_price=95.0)
+    sell = _place(engine, side=-1, order_type=LIMIT_ORDER, limit_price=105.0)
+
+    engine.on_price(SYMBOL, 96.0)
+    assert engine.order(buy)["status"] == 6
+    engine.on_price(SYMBOL, 94.0)
+    assert engine.order(buy)["status"] == 2
+    assert engine.order(buy)["tradedPrice"] == 94.0
+    assert engine.order(sell)["status"] == 6
+    engine.on_price(SYMBOL, 106.0)
+    assert engine.order(sell)["tradedPrice"] == 106.0
+
+
+def test_limit_fill_never_worse_than_the_limit():
+    engine = PaperExecutionEngine(slippage_bps=100)
+    engine.on_price(SYMBOL, 100.0)
+
+    order = engine.order(_place(engine, order_type=LIMIT_ORDER, limit_price=100.5))
+
+    assert order["tradedPrice"] == 100.5
+
+
+def test_limit_order_needs_a_price():
+    engine = PaperExecutionEngine()
+
+    assert engine.place_order("A", _order(order_type=LIMIT_ORDER))["s"] == "error"
+
+
+def test_latency_delays_the_fill():
+    clock = Clock()
+    engine = PaperExecutionEngine(latency=0.5, clock=clock)
+    engine.on_price(SYMBOL, 100.0)
+    order_id = _place(engine)
+
+    assert engine.order(order_id)["status"] == 6
+    clock.now = 0.4
+    engine.on_price(SYMBOL, 102.0)
+    assert engine.order(order_id)["status"] == 6
+    clock.now = 0.5
+    order = engine.order(order_id)
+    assert order["status"] == 2
+    # First price seen once the order is due
+    assert order["tradedPrice"] == 102.0
+
+
+def test_cancel_only_pending_orders():
+    engine = PaperExecutionEngine()
+    engine.on_price(SYMBOL, 100.0)
+    resting = _place(engine, order_type=LIMIT_ORDER, limit_price=90.0)
+    filled = _place(engine)
+
+    assert engine.cancel_order(resting)["s"] == "ok"
+    assert engine.cancel_order(resting)["s"] == "error"
+    assert engine.cancel_order(filled)["s"] == "error"
+    engine.on_price(SYMBOL, 80.0)
+    assert engine.order(resting)["status"] == 1
+
+
+def test_positions_track_average_price_and_realised_pnl():
+    engine = PaperExecutionEngine()
+    for price, side, qty in [(100.0, 1, 10), (110.0, 1, 10), (120.0, -1, 15), (100.0, -1, 10)]:
+        engine.on_price(SYMBOL, price)
+        _place(engine, side=side, qty=qty)
+
+    position = engine.positions("A")[SYMBOL]
+
+    # Long 20 at 105; 15 sold at 120 (+225); 5 closed at 100 (-25), 5 left short at 100
+    assert position == {"qty": -5, "avg_price": 100.0, "realised_pnl": 200.0}
+    assert engine.positions("B") == {}
+
+
+def test_orderbook_is_per_account():
+    engine = PaperExecutionEngine()
+    engine.on_price(SYMBOL, 100.0)
+    _place(engine, account="A")
+    _place(engine, account="B")
+
+    assert len(engine.orderbook("A")) == 1
+
+
+def test_max_orders_drops_oldest_finished_orders_only():
+    engine = PaperExecutionEngine(max_orders=3)
+    engine.on_price(SYMBOL, 100.0)
+    resting = _place(engine, order_type=LIMIT_ORDER, limit_price=90.0)
+    filled = [_place(engine) for _ in range(4)]
+
+    assert [order["id"] for order in engine.orderbook("A")] == [resting] + filled[-2:]
+    assert engine.order(filled[0]) is None
+    engine.on_price(SYMBOL, 89.0)
+    assert engine.order(resting)["status"] == 2
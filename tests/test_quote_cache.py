@@ -0,0 +1,98 @@
+# test_quote_cache.py
+
+import threading
+import time
+
+import pytest
+
+from quote_cache import QuoteCache
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = QuoteCache(ttl=1.0)
+    calls = []
+    release = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        release.wait(1)
+        return 101.0
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch("S", fetch))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == [101.0] * 8
+    assert len(calls) == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["coalesced"] == 7
+
+
+def test_fetch_error_reaches_every_waiter_and_is_not_cached():
+    cache = QuoteCache()
+
+    def fail():
+        raise RuntimeError("quotes down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_fetch("S", fail)
+    assert cache.get_or_fetch("S", lambda: 5.0) == 5.0
+
+
+def test_values_expire_after_ttl():
+    cache = QuoteCache(ttl=0.05)
+    cache.put("S", 100.0)
+
+    assert cache.get("S") == 100.0
+    time.sleep(0.06)
+    assert cache.get("S") is None
+    assert cache.get_or_fetch("S", lambda: 101.0) == 101.0
+
+
+def test_failed_ltps_are_not_cached():
+    cache = QuoteCache()
+
+    assert cache.get_or_fetch("S", lambda: 0) == 0
+    assert cache.peek("S") is None
+
+
+def test_lru_eviction():
+    cache = QuoteCache(maxsize=2)
+    cache.put("A", 1.0)
+    cache.put("B", 2.0)
+    cache.get("A")
+    cache.put("C", 3.0)
+
+    assert cache.peek("A") == 1.0
+    assert cache.peek("B") is None
+
+
+def test_peek_does_not_count():
+    cache = QuoteCache()
+    cache.put("S", 100.0)
+
+    cache.peek("S")
+    cache.peek("missing")
+
+    assert cache.stats()["hits"] == 0
+    assert cache.stats()["misses"] == 0
+
+
+def test_lookup_counts_hits_and_refreshes_lru():
+    cache = QuoteCache(maxsize=2)
+    cache.put("A", 1.0)
+    cache.put("B", 2.0)
+
+    assert cache.lookup("A") == 1.0
+    assert cache.lookup("missing") is None
+    cache.put("C", 3.0)
+
+    assert cache.peek("A") == 1.0
+    assert cache.peek("B") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 0
@@ -0,0 +1,71 @@
+# test_rate_limit.py
+
+import asyncio
+import threading
+import time
+
+from rate_limit import RequestScheduler, TokenBucket
+
+
+def test_token_bucket_refills_at_rate():
+    bucket = TokenBucket(2, 1.0)
+    now = bucket.updated
+    bucket.take()
+    bucket.take()
+
+    assert bucket.wait_time(now) > 0
+    assert bucket.wait_time(now + 0.5) == 0
+
+
+def test_higher_priority_waiters_go_first():
+    scheduler = RequestScheduler(limits=[(1, 0.1)], endpoint_limits={})
+    scheduler.acquire("quotes")
+    order = []
+
+    def call(endpoint):
+        scheduler.acquire(endpoint)
+        order.append(endpoint)
+
+    threads = []
+    for endpoint in ["quotes", "funds", "place_order", "orderbook"]:
+        threads.append(threading.Thread(target=call, args=(endpoint,)))
+        threads[-1].start()
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join()
+
+    # Equal priorities (quotes, funds) may go in either order
+    assert order[:2] == ["orderbook", "place_order"]
+    assert set(order[2:]) == {"quotes", "funds"}
+
+
+def test_endpoint_budget_is_separate_from_account_budget():
+    scheduler = RequestScheduler(limits=[(10, 1.0)], endpoint_limits={"quotes": [(1, 1.0)]})
+
+    assert scheduler.acquire("quotes", timeout=0)
+    assert not scheduler.acquire("quotes", timeout=0.01)
+    assert scheduler.acquire("place_order", timeout=0)
+
+
+def test_accounts_have_separate_budgets():
+    scheduler = RequestScheduler(limits=[(2, 1.0)], endpoint_limits={})
+    for _ in range(2):
+        assert scheduler.acquire("quotes", timeout=0, account="A")
+
+    assert not scheduler.acquire("quotes", timeout=0.01, account="A")
+    assert scheduler.acquire("quotes", timeout=0, account="B")
+
+    scheduler.forget("A")
+    assert scheduler.acquire("quotes", timeout=0, account="A")
+
+
+def test_acquire_async_waits_for_a_token():
+    scheduler = RequestScheduler(limits=[(1, 0.1)], endpoint_limits={})
+
+    async def run():
+        start = time.monotonic()
+        await scheduler.acquire_async("quotes", account="A")
+        await scheduler.acquire_async("quotes", account="A")
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) >= 0.05